@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the markdown renderers in graph_render.
+
+Renders a synthetic systems overview and interface analysis at 10k and 100k items and
+prints the time taken by the chunked renderers, next to appending the same chunks to a
+string with += (how the formatters used to build responses).
+
+Usage:
+    python bench_render.py [item counts...]
+"""
+
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List
+
+import graph_render
+from graph_model import INTERFACES, SYSTEM_UNITS, MetricsIndex, MetricsRecord
+
+DEFAULT_SIZES = [10_000, 100_000]
+REPEATS = 3
+
+
+def _metrics(i: int) -> Dict[str, Any]:
+    return {
+        "t": {"qpm": 100 + i % 5000},
+        "e": {"total": i % 3, "404": i % 2, "503": i % 2},
+        "l": {"0.5": 12.5 + i % 40, "0.9": 40.0, "0.95": 80.0, "0.99": 250.0 + i % 100},
+    }
+
+
+def build_systems_data(count: int):
+    """Synthetic systems overview with count interfaces (and count / 10 system units)."""
+    units = [f"Svc-{i}::App" for i in range(max(1, count // 10))]
+    interfaces = [f"{units[i % len(units)]}::GET::/api/v1/resource/{i}" for i in range(count)]
+    categories = {
+        SYSTEM_UNITS: {unit: MetricsRecord.from_metrics(_metrics(i)) for i, unit in enumerate(units)},
+        INTERFACES: {name: MetricsRecord.from_metrics(_metrics(i)) for i, name in enumerate(interfaces)},
+    }
+    systems_data = {
+        "version": "bench--1",
+        "timestamp": "2025-09-20T12:00:00",
+        "system_units": units,
+        "interfaces": interfaces,
+    }
+    return systems_data, MetricsIndex("bench--1", categories)
+
+
+def build_analysis_data(count: int) -> Dict[str, Any]:
+    """Synthetic interface analysis with count edges."""
+    focus = "Svc-0::App::GET::/api/v1/focus"
+    edges = []
+    for i in range(count):
+        source, target = (f"Svc-{i}::App::GET::/up/{i}", focus) if i % 2 else (focus, f"Svc-{i}::App::GET::/down/{i}")
+        edges.append({
+            "edge_display": f"{source}->{target}",
+            "source": source,
+            "target": target,
+            "relationship": "UPSTREAM" if i % 2 else "DOWNSTREAM",
+            "sync_type": "SYNC",
+            "metrics": MetricsRecord.from_metrics(_metrics(i)) if i % 7 else None,
+        })
+    return {
+        "interface_id": focus,
+        "version": "bench--1",
+        "time_range": {"start": "2025-09-20T11:30:00", "end": "2025-09-20T12:00:00", "duration_minutes": 30.0},
+        "edges": edges,
+    }
+
+
+def concatenate(chunks: Iterator[str]) -> str:
+    """Reference: build the response with += like the old formatters did."""
+    response = ""
+    for chunk in chunks:
+        response += chunk
+    return response
+
+
+def best_time(fn: Callable[[], str]) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(sizes: List[int]):
+    print(f"{'items':>8}  {'response':<18} {'chars':>11}  {'render (ms)':>12}  {'+= (ms)':>10}")
+    for count in sizes:
+        systems_data, metrics_index = build_systems_data(count)
+        analysis_data = build_analysis_data(count)
+        cases = [
+            ("systems", lambda: graph_render.iter_systems_response(systems_data, metrics_index)),
+            ("interface_details", lambda: graph_render.iter_interface_details_response(analysis_data, True, True)),
+        ]
+        for name, chunks in cases:
+            chars = len("".join(chunks()))
+            rendered = best_time(lambda: "".join(chunks()))
+            concatenated = best_time(lambda: concatenate(chunks()))
+            print(f"{count:>8}  {name:<18} {chars:>11}  {rendered * 1000:>12.1f}  {concatenated * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
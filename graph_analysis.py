@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Graph Analysis
+Local traversals over a cached GraphSnapshot, joined with one overlay's MetricsIndex.
+
+These answer multi-hop questions (call chains, dependency trees) without a details/pinned
+round trip per hop.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from graph_model import EDGES, SYNC, GraphSnapshot, MetricsIndex
+
+DOWNSTREAM = "downstream"
+UPSTREAM = "upstream"
+BOTH = "both"
+DIRECTIONS = (DOWNSTREAM, UPSTREAM, BOTH)
+
+DEFAULT_TREE_DEPTH = 3
+MAX_TREE_DEPTH = 10
+DEFAULT_TREE_MAX_NODES = 200
+
+# Latency percentiles a critical path can be weighted by (MetricsRecord fields)
+LATENCY_PERCENTILES = ("p50", "p90", "p95", "p99")
+DEFAULT_CRITICAL_PATH_PERCENTILE = "p99"
+DEFAULT_CRITICAL_PATH_TOP = 5
+DEFAULT_BLAST_RADIUS_TOP = 10
+DEFAULT_DIFF_TOP = 25
+
+# MetricsRecord fields compared by snapshot_diff
+DIFF_METRICS = ("qpm", "errors_total", "p99")
+
+# Prefix of external entry points (e.g. "External::INBOUND::APP_ANDROID_USER")
+ENTRY_POINT_PREFIX = "External::INBOUND"
+
+
+def dependency_tree(graph: GraphSnapshot, root_id: str, direction: str = DOWNSTREAM,
+                    max_depth: int = DEFAULT_TREE_DEPTH, max_nodes: int = DEFAULT_TREE_MAX_NODES,
+                    metrics_index: Optional[MetricsIndex] = None, prefix: str = "in_in") -> Dict[str, Any]:
+    """
+    Build a depth-bounded dependency tree around one interface.
+
+    The tree is expanded breadth-first, so every node is expanded once, at its shortest
+    distance from the root; later occurrences (diamonds, cycles) are listed as repeats
+    without children.
+
+    Args:
+        graph: Snapshot to traverse
+        root_id: Interface at the root of the tree
+        direction: DOWNSTREAM (calls the root makes) or UPSTREAM (calls it receives)
+        max_depth: Number of hops to expand
+        max_nodes: Stop expanding once this many distinct nodes are in the tree
+        metrics_index: Overlay metrics joined onto each edge (optional)
+        prefix: Edge kind to follow
+
+    Returns:
+        Root node dict. Every node has:
+        - node: Node ID
+        - edge_display / sync_type / metrics: The edge linking it to its parent (None at the root)
+        - children: Child node dicts
+        - repeat: True if the node was already expanded elsewhere in the tree
+        - unexpanded: Number of edges not followed because of max_depth or max_nodes
+        The root also carries node_count and truncated (max_nodes was hit).
+    """
+    if direction == DOWNSTREAM:
+        adjacent, far_end = graph.downstream_edges, graph.target_id
+    elif direction == UPSTREAM:
+        adjacent, far_end = graph.upstream_edges, graph.source_id
+    else:
+        raise ValueError(f"Invalid direction: {direction}. Expected '{DOWNSTREAM}' or '{UPSTREAM}'")
+
+    root = _tree_node(root_id)
+    visited = {root_id}
+    frontier = [root]
+    truncated = False
+
+    for _ in range(max_depth):
+        next_frontier = []
+        for tree_node in frontier:
+            for edge in adjacent(tree_node["node"], prefix):
+                if len(visited) >= max_nodes:
+                    tree_node["unexpanded"] += 1
+                    truncated = True
+                    continue
+
+                node_id = far_end(edge)
+                edge_display = graph.edge_display(edge)
+                child = _tree_node(node_id, edge_display, graph.sync_type(edge),
+                                   metrics_index.get(edge_display, EDGES) if metrics_index else None)
+                tree_node["children"].append(child)
+                if node_id in visited:
+                    child["repeat"] = True
+                else:
+                    visited.add(node_id)
+                    next_frontier.append(child)
+        frontier = next_frontier
+        if not frontier:
+            break
+
+    # Leaves at the depth limit may have further hops
+    for tree_node in frontier:
+        tree_node["unexpanded"] += len(adjacent(tree_node["node"], prefix))
+
+    root["node_count"] = len(visited)
+    root["truncated"] = truncated
+    return root
+
+
+def _tree_node(node_id: str, edge_display: Optional[str] = None, sync_type: Optional[str] = None,
+               metrics: Any = None) -> Dict[str, Any]:
+    return {
+        "node": node_id,
+        "edge_display": edge_display,
+        "sync_type": sync_type,
+        "metrics": metrics,
+        "children": [],
+        "repeat": False,
+        "unexpanded": 0,
+    }
+
+
+def tree_directions(direction: str) -> List[str]:
+    """Expand a requested direction ("both" included) into the tree directions to build."""
+    if direction == BOTH:
+        return [DOWNSTREAM, UPSTREAM]
+    if direction in (DOWNSTREAM, UPSTREAM):
+        return [direction]
+    raise ValueError(f"Invalid direction: {direction}. Expected one of: {', '.join(DIRECTIONS)}")
+
+
+def entry_points(graph: GraphSnapshot) -> List[str]:
+    """External inbound interfaces of a snapshot, in response order."""
+    return [interface for interface in graph.interfaces if interface.startswith(ENTRY_POINT_PREFIX)]
+
+
+def critical_paths(graph: GraphSnapshot, roots: List[str], metrics_index: Optional[MetricsIndex],
+                   percentile: str = DEFAULT_CRITICAL_PATH_PERCENTILE, sync_only: bool = True,
+                   prefix: str = "in_in") -> Dict[str, Any]:
+    """
+    Find, for each root, the call chain that accounts for its highest latency.
+
+    An edge's latency is inclusive: it already contains the calls nested below its target.
+    So the chain starts with the root's slowest call and, at every hop, descends into the
+    slowest call made by that hop's target; the chain's total is its first hop's latency
+    (equivalently, the sum of each hop's own latency). Summing the hops instead would count
+    nested time once per level and favour the deepest chain over the slowest one.
+
+    Args:
+        graph: Snapshot to traverse
+        roots: Interfaces to start from (unknown IDs are reported with an empty path)
+        metrics_index: Overlay metrics supplying edge latencies; edges without a latency are
+            not followed
+        percentile: Latency percentile to follow ("p50", "p90", "p95" or "p99")
+        sync_only: Follow only EDGE_SYNC edges (async hops do not add to caller latency)
+        prefix: Edge kind to follow
+
+    Returns:
+        Dict containing:
+        - paths: One dict per root, sorted by total latency (highest first), with
+          root, total_latency and hops (edge_display, source, target, sync_type, latency, metrics)
+        - nodes_visited: Distinct nodes on the chains
+        - edges_considered: Edges examined along the chains
+        - cycle_edges: Edges skipped because they lead back into their own chain
+    """
+    if percentile not in LATENCY_PERCENTILES:
+        raise ValueError(f"Invalid percentile: {percentile}. Expected one of: {', '.join(LATENCY_PERCENTILES)}")
+
+    edge_sync = graph.edge_sync
+
+    def edges_from(node: int) -> List[int]:
+        edges = graph.downstream_edges(graph.node_ids[node], prefix)
+        return [edge for edge in edges if edge_sync[edge] == SYNC] if sync_only else edges
+
+    def weight(edge: int) -> float:
+        if not metrics_index:
+            return 0.0
+        metrics = metrics_index.get(graph.edge_display(edge), EDGES)
+        value = getattr(metrics, percentile) if metrics else None
+        return float(value) if isinstance(value, (int, float)) else 0.0
+
+    visited = set()
+    edges_considered = 0
+    cycle_edges = 0
+    paths = []
+    for root_id in roots:
+        root = graph.node_index.get(root_id)
+        hops = []
+        node = root
+        # Nodes on this chain; an edge back into one of them would close a cycle
+        on_chain = set()
+        while node is not None:
+            on_chain.add(node)
+            visited.add(node)
+            chosen, latency = None, 0.0
+            for edge in edges_from(node):
+                edges_considered += 1
+                if graph.edge_target[edge] in on_chain:
+                    cycle_edges += 1
+                    continue
+                candidate = weight(edge)
+                if candidate > latency:
+                    chosen, latency = edge, candidate
+            if chosen is None:
+                break
+            edge_display = graph.edge_display(chosen)
+            hops.append({
+                "edge_display": edge_display,
+                "source": graph.source_id(chosen),
+                "target": graph.target_id(chosen),
+                "sync_type": graph.sync_type(chosen),
+                "latency": latency,
+                "metrics": metrics_index.get(edge_display, EDGES),
+            })
+            node = graph.edge_target[chosen]
+        paths.append({
+            "root": root_id,
+            "found": root is not None,
+            "total_latency": hops[0]["latency"] if hops else 0.0,
+            "hops": hops,
+        })
+
+    paths.sort(key=lambda path: path["total_latency"], reverse=True)
+    return {
+        "paths": paths,
+        "nodes_visited": len(visited),
+        "edges_considered": edges_considered,
+        "cycle_edges": cycle_edges,
+    }
+
+
+def blast_radius(graph: GraphSnapshot, targets: List[str], metrics_index: Optional[MetricsIndex],
+                 sync_only: bool = False, prefix: str = "in_in") -> Dict[str, Any]:
+    """
+    Find everything that (transitively) calls the target interfaces and the traffic at stake.
+
+    Reverse breadth-first reachability over the snapshot's precomputed inbound adjacency,
+    so the cost is O(V + E) of the affected region only. Each External::INBOUND caller
+    reached is weighted by the QPM of its edges into the affected region.
+
+    Args:
+        graph: Snapshot to traverse
+        targets: Degraded interfaces (unknown IDs are ignored and reported as missing)
+        metrics_index: Overlay metrics supplying edge QPM (optional)
+        sync_only: Follow only EDGE_SYNC edges (callers that would block on the targets)
+        prefix: Edge kind to follow
+
+    Returns:
+        Dict containing:
+        - targets / missing_targets: Target IDs found / not found in the snapshot
+        - distances: Affected node ID -> hops to the nearest target (targets are 0)
+        - entry_points: Affected External::INBOUND callers, ranked by affected_qpm, each with
+          entry, affected_qpm, hops and edges (edge_display, target, sync_type, qpm)
+        - direct_callers: Edges into the targets (caller, target, edge_display, sync_type, qpm),
+          highest QPM first
+        - edges_traversed: Inbound edges examined
+    """
+    found = [target for target in targets if graph.has_node(target)]
+    missing = [target for target in targets if not graph.has_node(target)]
+
+    def edge_qpm(edge: int) -> float:
+        metrics = metrics_index.get(graph.edge_display(edge), EDGES) if metrics_index else None
+        value = metrics.qpm if metrics else None
+        return float(value) if isinstance(value, (int, float)) else 0.0
+
+    def inbound(node_id: str) -> List[int]:
+        edges = graph.upstream_edges(node_id, prefix)
+        return [edge for edge in edges if graph.edge_sync[edge] == SYNC] if sync_only else edges
+
+    distances: Dict[str, int] = {target: 0 for target in found}
+    frontier = list(distances)
+    edges_traversed = 0
+    while frontier:
+        next_frontier = []
+        for node_id in frontier:
+            distance = distances[node_id] + 1
+            for edge in inbound(node_id):
+                edges_traversed += 1
+                caller = graph.source_id(edge)
+                if caller not in distances:
+                    distances[caller] = distance
+                    next_frontier.append(caller)
+        frontier = next_frontier
+
+    entry_points = []
+    for node_id, distance in distances.items():
+        if not node_id.startswith(ENTRY_POINT_PREFIX):
+            continue
+        edges = []
+        for edge in graph.downstream_edges(node_id, prefix):
+            if sync_only and graph.edge_sync[edge] != SYNC:
+                continue
+            target = graph.target_id(edge)
+            if target in distances:
+                edges.append({
+                    "edge_display": graph.edge_display(edge),
+                    "target": target,
+                    "sync_type": graph.sync_type(edge),
+                    "qpm": edge_qpm(edge),
+                })
+        entry_points.append({
+            "entry": node_id,
+            "hops": distance,
+            "affected_qpm": sum(edge["qpm"] for edge in edges),
+            "edges": edges,
+        })
+    entry_points.sort(key=lambda entry: (-entry["affected_qpm"], entry["hops"], entry["entry"]))
+
+    direct_callers = []
+    for target in found:
+        for edge in inbound(target):
+            direct_callers.append({
+                "caller": graph.source_id(edge),
+                "target": target,
+                "edge_display": graph.edge_display(edge),
+                "sync_type": graph.sync_type(edge),
+                "qpm": edge_qpm(edge),
+            })
+    direct_callers.sort(key=lambda caller: -caller["qpm"])
+
+    return {
+        "targets": found,
+        "missing_targets": missing,
+        "distances": distances,
+        "entry_points": entry_points,
+        "direct_callers": direct_callers,
+        "edges_traversed": edges_traversed,
+    }
+
+
+def _metric_value(record: Any, field: str) -> Optional[float]:
+    value = getattr(record, field, None) if record is not None else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def snapshot_diff(before: GraphSnapshot, after: GraphSnapshot, before_metrics: Optional[MetricsIndex] = None,
+                  after_metrics: Optional[MetricsIndex] = None, top: int = DEFAULT_DIFF_TOP,
+                  prefix: str = "in_in") -> Dict[str, Any]:
+    """
+    Topology and metric changes between two snapshots.
+
+    Node and edge IDs are interned when a snapshot is built, so the set operations below
+    hash and compare shared string objects.
+
+    Args:
+        before: Older snapshot
+        after: Newer snapshot
+        before_metrics: Overlay of the older snapshot, for metric deltas (optional)
+        after_metrics: Overlay of the newer snapshot, for metric deltas (optional)
+        top: Maximum number of IDs listed per added/removed section, and of changed edges
+        prefix: Edge kind compared
+
+    Returns:
+        Dict with:
+        - system_units / interfaces / edges: {"added": [...], "removed": [...], "added_count",
+          "removed_count", "unchanged_count"}; lists are sorted and cut to top
+        - changed_edges: Edges present in both snapshots whose metrics moved most, as dicts
+          with edge, score (largest relative change) and per-metric {"before", "after", "delta"}
+        - changed_edge_count: Number of common edges with any metric change
+    """
+    def compare(old: Iterable[str], new: Iterable[str]) -> Dict[str, Any]:
+        old_ids, new_ids = set(old), set(new)
+        added, removed = new_ids - old_ids, old_ids - new_ids
+        return {
+            "added": sorted(added)[:top],
+            "removed": sorted(removed)[:top],
+            "added_count": len(added),
+            "removed_count": len(removed),
+            "unchanged_count": len(old_ids & new_ids),
+        }
+
+    before_edges = {before.edge_display(edge) for edge in before.edges_of_kind(prefix)}
+    after_edges = {after.edge_display(edge) for edge in after.edges_of_kind(prefix)}
+    diff = {
+        "system_units": compare(before.system_units, after.system_units),
+        "interfaces": compare(before.interfaces, after.interfaces),
+        "edges": compare(before_edges, after_edges),
+        "changed_edges": [],
+        "changed_edge_count": 0,
+    }
+    if before_metrics is None or after_metrics is None:
+        return diff
+
+    changed = []
+    for edge_display in before_edges & after_edges:
+        old_record = before_metrics.get(edge_display, EDGES)
+        new_record = after_metrics.get(edge_display, EDGES)
+        if old_record is None and new_record is None:
+            continue
+        metrics = {}
+        score = 0.0
+        for field in DIFF_METRICS:
+            old_value, new_value = _metric_value(old_record, field), _metric_value(new_record, field)
+            delta = None if old_value is None or new_value is None else new_value - old_value
+            metrics[field] = {"before": old_value, "after": new_value, "delta": delta}
+            if delta:
+                score = max(score, abs(delta) / max(abs(old_value), 1.0))
+            elif (old_value is None) != (new_value is None):
+                # Reported in only one of the overlays (e.g. traffic started or stopped)
+                score = max(score, 1.0)
+        if score > 0:
+            changed.append({"edge": edge_display, "score": score, "metrics": metrics})
+
+    changed.sort(key=lambda change: (-change["score"], change["edge"]))
+    diff["changed_edges"] = changed[:top]
+    diff["changed_edge_count"] = len(changed)
+    return diff
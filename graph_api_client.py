@@ -4,13 +4,32 @@ Graph API Client
 Fetches graph data from the backend service and extracts in_in edges as triplets.
 """
 
+import asyncio
 import requests
+import httpx
 import json
+import logging
 import time
 import urllib.parse
 import os
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable, Hashable
+
+from graph_analysis import (
+    blast_radius, critical_paths, dependency_tree, entry_points, snapshot_diff, tree_directions,
+    DEFAULT_BLAST_RADIUS_TOP, DEFAULT_DIFF_TOP, DEFAULT_CRITICAL_PATH_PERCENTILE, DEFAULT_CRITICAL_PATH_TOP, DEFAULT_TREE_DEPTH, DEFAULT_TREE_MAX_NODES,
+    MAX_TREE_DEPTH
+)
+from graph_cache import MetricsCache, SnapshotCache
+from graph_model import OVERLAY_CATEGORIES, GraphSnapshot, MetricsIndex, aggregate_errors
+from graph_resilience import CircuitBreaker, call_with_resilience, requests_timeout, timeout_for
+from graph_scheduler import TenantScheduler
+from graph_store import SnapshotStore, open_default_store
+from graph_stream import GraphSnapshotParser
+from graph_table import DEFAULT_RANKING_TOP, MAX_RANKING_TOP
+from graph_trend import DEFAULT_TREND_TOP, MAX_TREND_WINDOWS, detect_regressions
+from graph_telemetry import parse_span, record_parse, track_upstream
 
 # Default configuration
 DEFAULT_BASE_URL = "http://ac9248ac6be104c95987a0356fbd9ad6-d76d2f43834084df.elb.us-east-2.amazonaws.com:8081"
@@ -20,6 +39,76 @@ DEFAULT_DOMAIN = "demo"
 BASE_URL = os.getenv("CK_NEXUS_ENDPOINT", DEFAULT_BASE_URL)
 DOMAIN = os.getenv("CK_DOMAIN", DEFAULT_DOMAIN)
 
+# Connection pool limits for the async client (one pool per upstream base URL)
+HTTP_MAX_CONNECTIONS = int(os.getenv("CK_HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("CK_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("CK_HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+# Upstream calls in flight at once, overall and per tenant (base URL + domain); see graph_scheduler
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("CK_UPSTREAM_MAX_CONCURRENCY", str(HTTP_MAX_CONNECTIONS)))
+TENANT_MAX_CONCURRENCY = int(os.getenv("CK_TENANT_MAX_CONCURRENCY", "16"))
+
+# Interface drill-downs request the overlay scoped to the pinned node (falling back to the
+# whole-version overlay when the scoped one is empty)
+SCOPED_METRICS_ENABLED = os.getenv("CK_SCOPED_METRICS", "true").lower() in ("1", "true", "yes")
+
+# Chunk size used when streaming graph-paths/all into a snapshot
+GRAPH_STREAM_CHUNK_BYTES = int(os.getenv("CK_GRAPH_STREAM_CHUNK_BYTES", str(64 * 1024)))
+
+# Batched interface drill-downs: details/pinned requests in flight at once, and batch size limit
+DETAILS_BATCH_CONCURRENCY = int(os.getenv("CK_DETAILS_BATCH_CONCURRENCY", "8"))
+MAX_DETAILS_BATCH_INTERFACES = int(os.getenv("CK_MAX_DETAILS_BATCH_INTERFACES", "50"))
+
+logger = logging.getLogger(__name__)
+
+# Progress listener of the current request, set by streaming transports (see report_progress)
+progress_listener: ContextVar[Optional[Callable[[str], None]]] = ContextVar("progress_listener", default=None)
+
+
+def report_progress(message: str):
+    """Tell the current request's progress listener, if any, that an upstream step finished."""
+    listener = progress_listener.get()
+    if listener is not None:
+        listener(message)
+
+
+def _resolve_domain(domain: Optional[str], headers: Optional[Dict[str, str]]) -> str:
+    """Resolve the domain from the explicit argument, the 'ck-domain' header or the DOMAIN env var."""
+    if domain is not None:
+        return domain
+    if headers and 'ck-domain' in headers:
+        return headers.get('ck-domain')
+    return DOMAIN
+
+
+def scoped_version(version: str, node_id: str) -> str:
+    """Overlay version scoped to one node, e.g. "demo--595--Tix-Winterfell::App::POST::/review/edit"."""
+    return f"{version}--{node_id}"
+
+
+def _parse_iso_timestamp(timestamp: str) -> datetime:
+    """Parse an ISO 8601 timestamp, accepting a trailing 'Z' for UTC."""
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def _graph_empty_response_message(time_epoch: Optional[int]) -> str:
+    if time_epoch is not None:
+        return (
+            f"API returned empty response for timestamp {time_epoch}. "
+            "This might indicate no data is available for the specified time. "
+            "Try without a timestamp or with a different time."
+        )
+    return "API returned empty response"
+
+
+def _graph_invalid_json_message(time_epoch: Optional[int], error: Exception) -> str:
+    if time_epoch is not None:
+        return (
+            f"Invalid JSON response for timestamp {time_epoch}. "
+            "The API might not have data for this specific time."
+        )
+    return f"Invalid JSON response: {error}"
+
 
 def fetch_graph_data(base_url: str = None, domain: str = None, time_epoch: Optional[int] = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
     """
@@ -43,11 +132,7 @@ def fetch_graph_data(base_url: str = None, domain: str = None, time_epoch: Optio
             base_url = BASE_URL
         
         # Extract domain from headers if not provided
-        if domain is None:
-            if headers and 'ck-domain' in headers:
-                domain = headers.get('ck-domain')
-            else:
-                domain = DOMAIN
+        domain = _resolve_domain(domain, headers)
         
         # Construct full API URL
         api_url = f"{base_url}/{domain}/ui/graph-paths/all"
@@ -56,29 +141,63 @@ def fetch_graph_data(base_url: str = None, domain: str = None, time_epoch: Optio
         if time_epoch is not None:
             params['time'] = time_epoch
             
-        response = requests.get(api_url, headers={'accept': '*/*'}, params=params)
+        response = requests.get(api_url, headers={'accept': '*/*'}, params=params,
+                                timeout=requests_timeout("graph-paths/all"))
         response.raise_for_status()
         
         # Check for empty response
         if not response.text.strip():
-            if time_epoch is not None:
-                raise requests.RequestException(
-                    f"API returned empty response for timestamp {time_epoch}. "
-                    "This might indicate no data is available for the specified time. "
-                    "Try without a timestamp or with a different time."
-                )
-            else:
-                raise requests.RequestException("API returned empty response")
+            raise requests.RequestException(_graph_empty_response_message(time_epoch))
         
         return response.json()
     except requests.JSONDecodeError as e:
-        if time_epoch is not None:
-            raise requests.RequestException(
-                f"Invalid JSON response for timestamp {time_epoch}. "
-                "The API might not have data for this specific time."
-            ) from e
-        else:
-            raise requests.RequestException(f"Invalid JSON response: {e}") from e
+        raise requests.RequestException(_graph_invalid_json_message(time_epoch, e)) from e
+    except requests.RequestException as e:
+        print(f"Error fetching data from API: {e}")
+        raise
+
+
+def fetch_graph_snapshot(base_url: str = None, domain: str = None, time_epoch: Optional[int] = None,
+                         headers: Optional[Dict[str, str]] = None) -> GraphSnapshot:
+    """
+    Fetch graph-paths/all and build its GraphSnapshot while the body streams in.
+    
+    Unlike fetch_graph_data, the response is never held in full: only the sections a
+    snapshot needs are materialized (see graph_stream).
+    
+    Args:
+        See fetch_graph_data
+        
+    Returns:
+        The indexed graph snapshot
+        
+    Raises:
+        requests.RequestException: If the API call fails
+    """
+    if base_url is None:
+        base_url = BASE_URL
+    domain = _resolve_domain(domain, headers)
+    api_url = f"{base_url}/{domain}/ui/graph-paths/all"
+    
+    params = {}
+    if time_epoch is not None:
+        params['time'] = time_epoch
+    
+    try:
+        with requests.get(api_url, headers={'accept': '*/*'}, params=params, stream=True,
+                          timeout=requests_timeout("graph-paths/all")) as response:
+            response.raise_for_status()
+            parser = GraphSnapshotParser()
+            try:
+                for chunk in response.iter_content(chunk_size=GRAPH_STREAM_CHUNK_BYTES):
+                    parser.feed(chunk)
+                graph = parser.close()
+            except ValueError as e:
+                raise requests.RequestException(_graph_invalid_json_message(time_epoch, e)) from e
+        
+        if parser.empty:
+            raise requests.RequestException(_graph_empty_response_message(time_epoch))
+        return graph
     except requests.RequestException as e:
         print(f"Error fetching data from API: {e}")
         raise
@@ -109,11 +228,7 @@ def fetch_metrics_data(version: str, start_time: Optional[int] = None, end_time:
             base_url = BASE_URL
         
         # Extract domain from headers if not provided
-        if domain is None:
-            if headers and 'ck-domain' in headers:
-                domain = headers.get('ck-domain')
-            else:
-                domain = DOMAIN
+        domain = _resolve_domain(domain, headers)
         
         # Use default time range if not provided (last hour)
         if end_time is None:
@@ -125,7 +240,7 @@ def fetch_metrics_data(version: str, start_time: Optional[int] = None, end_time:
         encoded_version = urllib.parse.quote(version, safe='')
         api_url = f"{base_url}/{domain}/ui/graph-paths/overlays/v2?version={encoded_version}&epochStartTime={start_time}&epochEndTime={end_time}&uom=qpm"
         
-        response = requests.get(api_url, headers={'accept': '*/*'})
+        response = requests.get(api_url, headers={'accept': '*/*'}, timeout=requests_timeout("overlays/v2"))
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
@@ -156,17 +271,14 @@ def fetch_interface_details(version: str, interface_id: str, base_url: str = Non
             base_url = BASE_URL
         
         # Extract domain from headers if not provided
-        if domain is None:
-            if headers and 'ck-domain' in headers:
-                domain = headers.get('ck-domain')
-            else:
-                domain = DOMAIN
+        domain = _resolve_domain(domain, headers)
         
         # URL encode the interface ID
         encoded_node_id = urllib.parse.quote(interface_id, safe='')
         api_url = f"{base_url}/{domain}/ui/graph-paths/details/pinned?version={version}&nodeId={encoded_node_id}"
         
-        response = requests.post(api_url, headers={'accept': '*/*'}, data='')
+        response = requests.post(api_url, headers={'accept': '*/*'}, data='',
+                                 timeout=requests_timeout("details/pinned"))
         response.raise_for_status()
         
         # Check if response is empty
@@ -279,27 +391,34 @@ def get_systems_overview(timestamp: Optional[str] = None, base_url: str = None,
         - system_units: List of system unit names
         - interfaces: List of interface names
     """
-    # Parse timestamp or use current time
-    if timestamp:
-        analysis_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-        # Convert to epoch time in milliseconds for API call
-        time_epoch = int(analysis_time.timestamp() * 1000)
-    else:
-        analysis_time = datetime.now()
-        time_epoch = None  # Use current time (API default)
+    analysis_time, time_epoch = _resolve_snapshot_time(timestamp)
     
     # Fetch graph data with optional time parameter
-    graph_data = fetch_graph_data(base_url=base_url, domain=domain, time_epoch=time_epoch, headers=headers)
-    version = graph_data.get("version", "unknown")
+    graph = fetch_graph_snapshot(base_url=base_url, domain=domain, time_epoch=time_epoch, headers=headers)
     
-    # Extract system units and interfaces
-    system_units, interfaces = extract_system_units_and_interfaces(graph_data)
+    return _build_systems_overview(graph, analysis_time)
+
+
+def _resolve_snapshot_time(timestamp: Optional[str]) -> Tuple[datetime, Optional[int]]:
+    """
+    Resolve the analysis time and the epoch (milliseconds) to pass to graph-paths/all.
     
+    The epoch is None when no timestamp is given so the API serves the latest snapshot.
+    """
+    if timestamp:
+        analysis_time = _parse_iso_timestamp(timestamp)
+        # Convert to epoch time in milliseconds for API call
+        return analysis_time, int(analysis_time.timestamp() * 1000)
+    return datetime.now(), None
+
+
+def _build_systems_overview(graph: GraphSnapshot, analysis_time: datetime) -> Dict[str, Any]:
+    """Build the systems overview dict from a graph-paths/all snapshot."""
     return {
-        "version": version,
+        "version": graph.version,
         "timestamp": analysis_time.isoformat(),
-        "system_units": system_units,
-        "interfaces": interfaces
+        "system_units": graph.system_units,
+        "interfaces": graph.interfaces
     }
 
 
@@ -322,74 +441,100 @@ def get_interface_analysis(interface_id: str, version: str, start_time: Optional
         - interface_id: Analyzed interface
         - version: Version used
         - time_range: Analysis time range
-        - edges: List of edge dictionaries with metrics and sync type
-        - raw_data: Original API responses for advanced processing
+        - edges: List of edge dictionaries with metrics (MetricsRecord or None) and sync type
+        - raw_data: Pinned API response and the metrics index for advanced processing
     """
-    # Parse time range
+    start_dt, end_dt = _resolve_analysis_window(start_time, end_time)
+    
+    # Fetch interface details and metrics
+    interface_data = fetch_interface_details(version, interface_id, base_url=base_url, domain=domain, headers=headers)
+    
+    start_epoch = int(start_dt.timestamp() * 1000)  # Convert to milliseconds
+    end_epoch = int(end_dt.timestamp() * 1000)  # Convert to milliseconds
+    metrics_index = None
+    if SCOPED_METRICS_ENABLED:
+        # Only the pinned node's neighborhood is needed; fall back to the full overlay if it is empty
+        request_version = scoped_version(version, interface_id)
+        metrics_data = fetch_metrics_data(request_version, start_epoch, end_epoch, base_url=base_url, domain=domain, headers=headers)
+        metrics_index = MetricsIndex.from_metrics_data(metrics_data, version, request_version)
+    if not metrics_index:
+        metrics_data = fetch_metrics_data(version, start_epoch, end_epoch, base_url=base_url, domain=domain, headers=headers)
+        metrics_index = MetricsIndex.from_metrics_data(metrics_data, version)
+    
+    return _build_interface_analysis(interface_id, version, start_dt, end_dt, interface_data, metrics_index)
+
+
+def _resolve_analysis_window(start_time: Optional[str], end_time: Optional[str]) -> Tuple[datetime, datetime]:
+    """Parse the metrics window for interface analysis (default: the last 30 minutes)."""
     if end_time:
-        end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
+        end_dt = _parse_iso_timestamp(end_time)
     else:
         end_dt = datetime.now()
         
     if start_time:
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+        start_dt = _parse_iso_timestamp(start_time)
     else:
         start_dt = end_dt - timedelta(minutes=30)
     
-    # Fetch interface details and metrics
-    interface_data = fetch_interface_details(version, interface_id, base_url=base_url, domain=domain, headers=headers)
-    
-    start_epoch = int(start_dt.timestamp() * 1000)  # Convert to milliseconds
-    end_epoch = int(end_dt.timestamp() * 1000)  # Convert to milliseconds
-    metrics_data = fetch_metrics_data(version, start_epoch, end_epoch, base_url=base_url, domain=domain, headers=headers)
+    return start_dt, end_dt
+
+
+def _time_range(start_dt: datetime, end_dt: datetime) -> Dict[str, Any]:
+    """Time range dict included in analysis results."""
+    return {
+        "start": start_dt.isoformat(),
+        "end": end_dt.isoformat(),
+        "duration_minutes": (end_dt - start_dt).total_seconds() / 60
+    }
+
+
+def _build_interface_analysis(interface_id: str, version: str, start_dt: datetime, end_dt: datetime,
+                              interface_data: Dict[str, Any], metrics_index: MetricsIndex,
+                              interface_graph: Optional[GraphSnapshot] = None) -> Dict[str, Any]:
+    """
+    Join the pinned details and overlay metrics into the interface analysis dict.
     
-    # Extract and process edges
-    base_timeline_graph = interface_data.get("baseTimelineGraph", {})
-    all_edges = base_timeline_graph.get("edges", [])
-    in_in_edges = [edge for edge in all_edges if edge.startswith("in_in:")]
+    Args:
+        interface_graph: Pre-built snapshot of interface_data (built here if not given)
+    """
+    if interface_graph is None:
+        interface_graph = GraphSnapshot.from_graph_data(interface_data)
     
-    # Process each edge with metrics and sync type
+    # Process each in_in edge with metrics and sync type
     processed_edges = []
-    for edge in in_in_edges:
-        edge_display = edge[6:] if edge.startswith("in_in:") else edge
-        
-        # Get sync/async type
-        sync_type = get_edge_sync_type(edge, interface_data)
+    for edge in interface_graph.edges_of_kind("in_in"):
+        edge_display = interface_graph.edge_display(edge)
+        source = interface_graph.source_id(edge) or None
+        target = interface_graph.target_id(edge) or None
         
         # Get metrics
-        metrics = get_metrics_for_item(edge_display, metrics_data, version, "edges")
+        metrics = metrics_index.get(edge_display, "edges")
         
         # Determine relationship to analyzed interface
         relationship = "RELATED"
-        if "->" in edge_display:
-            source, target = edge_display.split("->", 1)
-            if target == interface_id:
-                relationship = "UPSTREAM"
-            elif source == interface_id:
-                relationship = "DOWNSTREAM"
+        if target == interface_id:
+            relationship = "UPSTREAM"
+        elif source == interface_id:
+            relationship = "DOWNSTREAM"
         
         processed_edges.append({
             "edge_display": edge_display,
-            "full_edge_id": edge,
-            "sync_type": sync_type,
+            "full_edge_id": interface_graph.edge_ids[edge],
+            "sync_type": interface_graph.sync_type(edge),
             "relationship": relationship,
             "metrics": metrics,
-            "source": source if "->" in edge_display else None,
-            "target": target if "->" in edge_display else None
+            "source": source,
+            "target": target
         })
     
     return {
         "interface_id": interface_id,
         "version": version,
-        "time_range": {
-            "start": start_dt.isoformat(),
-            "end": end_dt.isoformat(),
-            "duration_minutes": (end_dt - start_dt).total_seconds() / 60
-        },
+        "time_range": _time_range(start_dt, end_dt),
         "edges": processed_edges,
         "raw_data": {
             "interface_data": interface_data,
-            "metrics_data": metrics_data
+            "metrics_index": metrics_index
         }
     }
 
@@ -431,64 +576,6 @@ def get_metrics_for_item(item_id: str, metrics_data: Dict[str, Any], version: st
         return None
 
 
-def aggregate_errors(errors: Dict[str, Any]) -> Tuple[int, int, int]:
-    """
-    Aggregate error codes from overlays v2 API into 4xx and 5xx buckets.
-    
-    Args:
-        errors: Error dictionary from metrics (e.g., {"400": 10, "401": 5, "500": 3, "total": 18})
-        
-    Returns:
-        Tuple of (total_errors, error_4xx, error_5xx)
-    """
-    # Check if pre-aggregated 4xx/5xx exist (backward compatibility)
-    # If keys exist, use them (even if 0, as that means no errors in that category)
-    has_4xx_pre = "4xx" in errors
-    has_5xx_pre = "5xx" in errors
-    
-    # Aggregate from individual error codes
-    error_4xx_agg = 0
-    error_5xx_agg = 0
-    
-    for error_code_str, error_count in errors.items():
-        # Skip non-numeric keys like "total", "4xx", "5xx"
-        if error_code_str in ("total", "4xx", "5xx"):
-            continue
-        try:
-            error_code = int(error_code_str)
-            # Aggregate 4xx errors (400-499)
-            if 400 <= error_code < 500:
-                error_4xx_agg += error_count
-            # Aggregate 5xx errors (500-599)
-            elif 500 <= error_code < 600:
-                error_5xx_agg += error_count
-        except (ValueError, TypeError):
-            # Skip non-numeric keys
-            continue
-    
-    # Use pre-aggregated values if available, otherwise use aggregated values
-    error_4xx = errors.get("4xx", 0) if has_4xx_pre else error_4xx_agg
-    error_5xx = errors.get("5xx", 0) if has_5xx_pre else error_5xx_agg
-    
-    # Calculate total errors
-    total_errors = errors.get("total", 0)
-    if total_errors == 0:
-        # If total not provided, sum all error counts (including aggregated 4xx/5xx if used)
-        total_errors = error_4xx + error_5xx
-        # Add any other error codes that aren't 4xx or 5xx
-        for error_code_str, error_count in errors.items():
-            if error_code_str in ("total", "4xx", "5xx"):
-                continue
-            try:
-                error_code = int(error_code_str)
-                if not (400 <= error_code < 600):
-                    total_errors += error_count
-            except (ValueError, TypeError):
-                continue
-    
-    return total_errors, error_4xx, error_5xx
-
-
 def fetch_code_details_for_api(domain_name: Optional[str], service_name: str, http_method: str, 
                                http_api_signature: str, base_url: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
     """
@@ -521,11 +608,7 @@ def fetch_code_details_for_api(domain_name: Optional[str], service_name: str, ht
             base_url = BASE_URL
         
         # Extract domain from headers if not provided
-        if domain_name is None:
-            if headers and 'ck-domain' in headers:
-                domain_name = headers.get('ck-domain')
-            else:
-                domain_name = DOMAIN
+        domain_name = _resolve_domain(domain_name, headers)
         
         # Construct API URL
         api_url = f"{base_url}/{domain_name}/api/method-graph-paths/code-details-for-api"
@@ -545,7 +628,8 @@ def fetch_code_details_for_api(domain_name: Optional[str], service_name: str, ht
             api_url,
             headers={'accept': '*/*', 'Content-Type': 'application/json'},
             params=params,
-            json=request_body
+            json=request_body,
+            timeout=requests_timeout("code-details-for-api")
         )
         response.raise_for_status()
         
@@ -560,23 +644,9 @@ def fetch_code_details_for_api(domain_name: Optional[str], service_name: str, ht
         result = response.json()
         
         # Validate response structure
-        if not isinstance(result, list):
-            raise requests.RequestException(
-                f"Unexpected response format. Expected a list of CodeDetailsForApiResponse objects, "
-                f"but got {type(result).__name__}."
-            )
-        
-        # Validate each item has className and methodName
-        for i, item in enumerate(result):
-            if not isinstance(item, dict):
-                raise requests.RequestException(
-                    f"Invalid response item at index {i}. Expected a dictionary with className and methodName, "
-                    f"but got {type(item).__name__}."
-                )
-            if "className" not in item or "methodName" not in item:
-                raise requests.RequestException(
-                    f"Invalid response item at index {i}. Missing className or methodName field."
-                )
+        format_error = _code_details_format_error(result)
+        if format_error:
+            raise requests.RequestException(format_error)
         
         return result
     except requests.JSONDecodeError as e:
@@ -590,6 +660,1091 @@ def fetch_code_details_for_api(domain_name: Optional[str], service_name: str, ht
         raise
 
 
+def _code_details_format_error(result: Any) -> Optional[str]:
+    """
+    Validate a code-details-for-api response.
+    
+    Returns:
+        An error message if the response is not a list of {className, methodName} dicts, else None
+    """
+    if not isinstance(result, list):
+        return (
+            f"Unexpected response format. Expected a list of CodeDetailsForApiResponse objects, "
+            f"but got {type(result).__name__}."
+        )
+    
+    # Validate each item has className and methodName
+    for i, item in enumerate(result):
+        if not isinstance(item, dict):
+            return (
+                f"Invalid response item at index {i}. Expected a dictionary with className and methodName, "
+                f"but got {type(item).__name__}."
+            )
+        if "className" not in item or "methodName" not in item:
+            return f"Invalid response item at index {i}. Missing className or methodName field."
+    
+    return None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical upstream requests into one shared call.
+    
+    The first caller for a key starts the call as a task; callers arriving while it is
+    in flight await the same task. Each waiter is shielded, so cancelling one caller
+    does not cancel the call for the others; the call itself is cancelled only when
+    every waiter has gone away.
+    """
+    
+    class _Call:
+        __slots__ = ("task", "waiters")
+        
+        def __init__(self, task: "asyncio.Future"):
+            self.task = task
+            self.waiters = 0
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, "SingleFlight._Call"] = {}
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() for key, or join the call already in flight for the same key.
+        
+        Args:
+            key: Identity of the request, e.g. (base_url, domain, endpoint, params...)
+            fn: Zero-argument factory returning the awaitable that performs the request
+            
+        Returns:
+            The shared result (the same object for every waiter; treat it as read-only)
+        """
+        call = self._calls.get(key)
+        if call is None or call.task.cancelled():
+            call = SingleFlight._Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task: self._forget(key, call))
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every waiter was cancelled; nobody needs the result any more. Forget the
+                # call right away, so a caller arriving before the task has finished
+                # cancelling starts a fresh call instead of joining the cancelled one
+                call.task.cancel()
+                self._forget(key, call)
+    
+    def _forget(self, key: Hashable, call: "SingleFlight._Call"):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+    
+    def waiters(self, key: Hashable) -> int:
+        """Number of callers currently waiting on the in-flight call for key."""
+        call = self._calls.get(key)
+        return call.waiters if call else 0
+    
+    def in_flight(self) -> int:
+        """Number of distinct upstream calls currently in flight."""
+        return len(self._calls)
+
+
+class AsyncGraphAPIClient:
+    """
+    Async client for the graph APIs, used by the remote MCP server.
+    
+    Keeps one pooled httpx.AsyncClient per upstream base URL, so repeated tool calls
+    reuse keep-alive connections instead of paying a fresh TCP/DNS handshake each time,
+    and one circuit breaker per base URL (see graph_resilience). Every upstream call also
+    takes a slot of its tenant (base URL + domain) from the scheduler, so one tenant's burst
+    queues behind its own per-tenant limit instead of starving the others.
+    The fetchers mirror the module-level sync functions (same arguments, same payloads)
+    but raise httpx.HTTPError instead of requests.RequestException.
+    """
+    
+    def __init__(self, limits: Optional[httpx.Limits] = None, snapshot_cache: Optional[SnapshotCache] = None,
+                 metrics_cache: Optional[MetricsCache] = None, scheduler: Optional[TenantScheduler] = None,
+                 snapshot_store: Optional[SnapshotStore] = None):
+        self.limits = limits or httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS
+        )
+        self.snapshot_cache = snapshot_cache or SnapshotCache()
+        self.metrics_cache = metrics_cache or MetricsCache()
+        # On-disk store of immutable snapshots and closed-window overlays (None when not configured)
+        self.snapshot_store = snapshot_store if snapshot_store is not None else open_default_store()
+        self.single_flight = SingleFlight()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.scheduler = scheduler or TenantScheduler(UPSTREAM_MAX_CONCURRENCY, TENANT_MAX_CONCURRENCY)
+    
+    def _get_client(self, base_url: str) -> httpx.AsyncClient:
+        """Get (or lazily create) the pooled client for an upstream base URL."""
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                headers={'accept': '*/*'},
+                limits=self.limits,
+                timeout=None
+            )
+            self._clients[base_url] = client
+        return client
+    
+    def _get_breaker(self, base_url: str) -> CircuitBreaker:
+        """Get (or lazily create) the circuit breaker for an upstream base URL."""
+        breaker = self._breakers.get(base_url)
+        if breaker is None:
+            breaker = self._breakers[base_url] = CircuitBreaker(base_url)
+        return breaker
+    
+    def breaker_states(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit breaker state of every upstream base URL called so far, for /health."""
+        return {base_url: breaker.snapshot() for base_url, breaker in self._breakers.items()}
+    
+    async def _request(self, endpoint: str, base_url: str, domain: str, method: str, path: str,
+                       **kwargs) -> httpx.Response:
+        """
+        Send one upstream request with the endpoint's timeouts, through the base URL's breaker.
+        
+        GETs are retried on transport errors and 502/503/504 (see graph_resilience).
+        
+        Raises:
+            httpx.HTTPError: If the request fails, has an error status or the breaker is open
+        """
+        async def attempt() -> httpx.Response:
+            async with self.scheduler.slot((base_url, domain), domain):
+                with track_upstream(endpoint, domain) as call:
+                    response = await self._get_client(base_url).request(
+                        method, path, timeout=timeout_for(endpoint), **kwargs
+                    )
+                    call.status, call.size = response.status_code, len(response.content)
+            response.raise_for_status()
+            return response
+        
+        return await call_with_resilience(self._get_breaker(base_url), endpoint, attempt, idempotent=method == "GET")
+    
+    async def aclose(self):
+        """Close every pooled upstream client, after the pending snapshot store writes."""
+        if self.snapshot_store is not None:
+            await self.snapshot_store.flush()
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+    
+    async def fetch_graph_data(self, base_url: str = None, domain: str = None, time_epoch: Optional[int] = None,
+                               headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Fetch graph data from the graph-paths/all endpoint.
+        
+        See fetch_graph_data for argument semantics.
+        
+        Raises:
+            httpx.HTTPError: If the API call fails
+        """
+        base_url = base_url or BASE_URL
+        domain = _resolve_domain(domain, headers)
+        
+        params = {}
+        if time_epoch is not None:
+            params['time'] = time_epoch
+        
+        try:
+            response = await self._request("graph-paths/all", base_url, domain, "GET",
+                                           f"/{domain}/ui/graph-paths/all", params=params)
+            
+            # Check for empty response
+            if not response.content.strip():
+                raise httpx.HTTPError(_graph_empty_response_message(time_epoch))
+            
+            return response.json()
+        except ValueError as e:
+            raise httpx.HTTPError(_graph_invalid_json_message(time_epoch, e)) from e
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching data from API: {e}")
+            raise
+    
+    async def fetch_graph_snapshot(self, base_url: str = None, domain: str = None, time_epoch: Optional[int] = None,
+                                   headers: Optional[Dict[str, str]] = None) -> GraphSnapshot:
+        """
+        Fetch graph-paths/all and build its GraphSnapshot while the body streams in.
+        
+        Bypasses the snapshot cache; see fetch_graph_snapshot for details.
+        
+        Raises:
+            httpx.HTTPError: If the API call fails
+        """
+        base_url = base_url or BASE_URL
+        domain = _resolve_domain(domain, headers)
+        
+        params = {}
+        if time_epoch is not None:
+            params['time'] = time_epoch
+        
+        async def attempt() -> Tuple[GraphSnapshotParser, float]:
+            # A retry restarts the stream, so each attempt parses into a fresh parser
+            client = self._get_client(base_url)
+            async with self.scheduler.slot((base_url, domain), domain):
+                with track_upstream("graph-paths/all", domain) as call:
+                    async with client.stream("GET", f"/{domain}/ui/graph-paths/all", params=params,
+                                             timeout=timeout_for("graph-paths/all")) as response:
+                        call.status = response.status_code
+                        response.raise_for_status()
+                        parser = GraphSnapshotParser()
+                        try:
+                            async for chunk in response.aiter_bytes(GRAPH_STREAM_CHUNK_BYTES):
+                                started = time.perf_counter()
+                                parser.feed(chunk)
+                                call.local_seconds += time.perf_counter() - started
+                        except ValueError as e:
+                            raise httpx.HTTPError(_graph_invalid_json_message(time_epoch, e)) from e
+                        finally:
+                            call.size = parser.bytes_received
+            return parser, call.local_seconds
+        
+        try:
+            parser, decode_seconds = await call_with_resilience(
+                self._get_breaker(base_url), "graph-paths/all", attempt, idempotent=True
+            )
+            record_parse("graph-paths/all", "decode", decode_seconds)
+            
+            try:
+                with parse_span("graph-paths/all", "index"):
+                    graph = parser.close()
+            except ValueError as e:
+                raise httpx.HTTPError(_graph_invalid_json_message(time_epoch, e)) from e
+            
+            if parser.empty:
+                raise httpx.HTTPError(_graph_empty_response_message(time_epoch))
+            return graph
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching data from API: {e}")
+            raise
+    
+    async def fetch_metrics_data(self, version: str, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                                 base_url: str = None, domain: str = None,
+                                 headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Fetch metrics data (latency, throughput, errors) from the overlays/v2 endpoint.
+        
+        See fetch_metrics_data for argument semantics.
+        
+        Raises:
+            httpx.HTTPError: If the API call fails
+        """
+        base_url = base_url or BASE_URL
+        domain = _resolve_domain(domain, headers)
+        
+        # Use default time range if not provided (last hour)
+        if end_time is None:
+            end_time = int(time.time() * 1000)
+        if start_time is None:
+            start_time = end_time - 3600000
+        
+        metrics_data, _ = await self._fetch_metrics(version, start_time, end_time, base_url, domain)
+        return metrics_data
+    
+    async def _fetch_metrics(self, version: str, start_time: int, end_time: int, base_url: str,
+                             domain: str) -> Tuple[Dict[str, Any], int]:
+        """Fetch an overlays/v2 response; returns (metrics_data, payload size in bytes)."""
+        params = {
+            'version': version,
+            'epochStartTime': start_time,
+            'epochEndTime': end_time,
+            'uom': 'qpm'
+        }
+        
+        try:
+            response = await self._request("overlays/v2", base_url, domain, "GET",
+                                           f"/{domain}/ui/graph-paths/overlays/v2", params=params)
+            with parse_span("overlays/v2", "decode"):
+                return response.json(), len(response.content)
+        except ValueError as e:
+            raise httpx.HTTPError(f"Invalid JSON response from metrics API: {e}") from e
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching metrics data from API: {e}")
+            raise
+    
+    async def get_metrics_index(self, version: str, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                                base_url: str = None, domain: str = None,
+                                headers: Optional[Dict[str, str]] = None,
+                                node_id: Optional[str] = None) -> MetricsIndex:
+        """
+        Get the indexed overlays/v2 metrics, reading through the metrics cache.
+        
+        The index is built once per fetched overlay response.
+        The window is aligned to the cache bucket (see MetricsCache.align_window) before
+        it is sent upstream, so nearby calls for the same version share one fetch.
+        
+        Args:
+            node_id: Request only the overlay scoped to this node (see scoped_version);
+                the returned index is still keyed by version
+        """
+        base_url = base_url or BASE_URL
+        domain = _resolve_domain(domain, headers)
+        
+        if end_time is None:
+            end_time = int(time.time() * 1000)
+        if start_time is None:
+            start_time = end_time - 3600000
+        start_time, end_time = self.metrics_cache.align_window(start_time, end_time)
+        request_version = version if node_id is None else scoped_version(version, node_id)
+        
+        metrics_index = self.metrics_cache.get(base_url, domain, request_version, start_time, end_time)
+        if metrics_index is None:
+            metrics_index = await self.single_flight.do(
+                (base_url, domain, "overlays/v2", request_version, start_time, end_time),
+                lambda: self._load_metrics_index(version, start_time, end_time, base_url, domain, request_version)
+            )
+        report_progress(f"Metrics overlay {request_version} ready ({len(metrics_index)} records)")
+        return metrics_index
+    
+    async def _load_metrics_index(self, version: str, start_time: int, end_time: int, base_url: str,
+                                  domain: str, request_version: Optional[str] = None) -> MetricsIndex:
+        """
+        Fetch an aligned overlays/v2 window, index it and store it in the metrics cache.
+        
+        A closed window is read from (or saved to) the snapshot store when one is configured.
+        """
+        request_version = request_version or version
+        store = self.snapshot_store
+        if store is not None and self.metrics_cache.is_open_window(end_time):
+            store = None
+        
+        if store is not None:
+            stored = await store.load_overlay(base_url, domain, request_version, start_time, end_time)
+            if stored is not None:
+                metrics_index, size = stored
+                self.metrics_cache.put(base_url, domain, request_version, start_time, end_time, metrics_index, size)
+                return metrics_index
+        
+        metrics_data, size = await self._fetch_metrics(request_version, start_time, end_time, base_url, domain)
+        with parse_span("overlays/v2", "index"):
+            metrics_index = MetricsIndex.from_metrics_data(metrics_data, version, request_version)
+        self.metrics_cache.put(base_url, domain, request_version, start_time, end_time, metrics_index, size)
+        if store is not None:
+            store.save_overlay(base_url, domain, request_version, start_time, end_time, metrics_index, size)
+        return metrics_index
+    
+    async def get_interface_metrics_index(self, version: str, interface_id: str, start_time: Optional[int] = None,
+                                          end_time: Optional[int] = None, base_url: str = None, domain: str = None,
+                                          headers: Optional[Dict[str, str]] = None) -> MetricsIndex:
+        """
+        Get the metrics needed for an interface drill-down.
+        
+        Asks Nexus only for the overlay scoped to the interface, which is sized by the node's
+        neighborhood rather than the whole domain, and falls back to the full overlay when
+        the scoped one is empty (or when CK_SCOPED_METRICS is disabled).
+        """
+        if SCOPED_METRICS_ENABLED:
+            metrics_index = await self.get_metrics_index(version, start_time, end_time, base_url=base_url,
+                                                         domain=domain, headers=headers, node_id=interface_id)
+            if metrics_index:
+                return metrics_index
+            logger.debug(f"Scoped overlay for {interface_id} is empty; using the full overlay")
+        return await self.get_metrics_index(version, start_time, end_time, base_url=base_url, domain=domain,
+                                            headers=headers)
+    
+    async def fetch_interface_details(self, version: str, interface_id: str, base_url: str = None, domain: str = None,
+                                      headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Fetch detailed view of a specific interface using the details/pinned endpoint.
+        
+        See fetch_interface_details for argument semantics.
+        
+        Raises:
+            httpx.HTTPError: If the API call fails
+        """
+        base_url = base_url or BASE_URL
+        domain = _resolve_domain(domain, headers)
+        
+        interface_data = await self.single_flight.do(
+            (base_url, domain, "details/pinned", version, interface_id),
+            lambda: self._fetch_interface_details(version, interface_id, base_url, domain)
+        )
+        report_progress(f"Details for {interface_id} fetched")
+        return interface_data
+    
+    async def _fetch_interface_details(self, version: str, interface_id: str, base_url: str,
+                                       domain: str) -> Dict[str, Any]:
+        params = {
+            'version': version,
+            'nodeId': interface_id
+        }
+        
+        try:
+            response = await self._request("details/pinned", base_url, domain, "POST",
+                                           f"/{domain}/ui/graph-paths/details/pinned", params=params, content=b'')
+            
+            # Check if response is empty
+            if not response.content.strip():
+                raise httpx.HTTPError(
+                    f"API returned empty response for interface '{interface_id}'. "
+                    f"This might indicate that the node is a system unit (not an interface) "
+                    f"or the interface has no edges/connections. "
+                    f"Please use an actual interface ID from the interfaces list, not a system unit."
+                )
+            
+            with parse_span("details/pinned", "decode"):
+                return response.json()
+        except ValueError as e:
+            raise httpx.HTTPError(
+                f"Invalid JSON response for interface '{interface_id}'. "
+                f"The API might have returned an empty or malformed response. "
+                f"Please ensure you're using a valid interface ID."
+            ) from e
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching interface details from API: {e}")
+            raise
+    
+    async def fetch_code_details_for_api(self, domain_name: Optional[str], service_name: str, http_method: str,
+                                         http_api_signature: str, base_url: Optional[str] = None,
+                                         headers: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch code details (className and methodName) by HTTP method and API signature.
+        
+        See fetch_code_details_for_api for argument semantics.
+        
+        Raises:
+            httpx.HTTPError: If the API call fails or response format is invalid
+        """
+        base_url = base_url or BASE_URL
+        domain_name = _resolve_domain(domain_name, headers)
+        
+        request_body = {
+            "httpMethod": http_method,
+            "httpApiSignature": http_api_signature
+        }
+        
+        try:
+            response = await self._request(
+                "code-details-for-api", base_url, domain_name, "POST",
+                f"/{domain_name}/api/method-graph-paths/code-details-for-api",
+                params={"serviceName": service_name},
+                json=request_body
+            )
+            
+            # Check for empty response
+            if not response.content.strip():
+                raise httpx.HTTPError(
+                    f"API returned empty response for service '{service_name}' with method '{http_method}' and signature '{http_api_signature}'. "
+                    "This might indicate no code details are available for the specified parameters."
+                )
+            
+            with parse_span("code-details-for-api", "decode"):
+                result = response.json()
+            
+            format_error = _code_details_format_error(result)
+            if format_error:
+                raise httpx.HTTPError(format_error)
+            
+            return result
+        except ValueError as e:
+            raise httpx.HTTPError(
+                f"Invalid JSON response for code details request. "
+                f"The API might have returned an empty or malformed response. "
+                f"Error: {e}"
+            ) from e
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching code details from API: {e}")
+            raise
+    
+    async def get_graph_snapshot(self, base_url: str = None, domain: str = None, time_epoch: Optional[int] = None,
+                                 headers: Optional[Dict[str, str]] = None) -> GraphSnapshot:
+        """
+        Get the indexed graph-paths/all snapshot, reading through the snapshot cache.
+        
+        The snapshot is built once per fetched version. The latest snapshot is re-fetched
+        once its TTL expires; historical snapshots are served from the cache until evicted.
+        """
+        base_url = base_url or BASE_URL
+        domain = _resolve_domain(domain, headers)
+        
+        graph = self.snapshot_cache.get(base_url, domain, time_epoch)
+        if graph is None:
+            graph = await self.single_flight.do(
+                (base_url, domain, "graph-paths/all", time_epoch),
+                lambda: self._load_graph_snapshot(base_url, domain, time_epoch)
+            )
+        report_progress(f"Graph snapshot {graph.version} ready ({len(graph.node_ids)} nodes)")
+        return graph
+    
+    async def _load_graph_snapshot(self, base_url: str, domain: str, time_epoch: Optional[int]) -> GraphSnapshot:
+        """
+        Stream graph-paths/all into a snapshot and store it in the snapshot cache.
+        
+        With a snapshot store, a historical time already seen is loaded from disk instead,
+        and every newly fetched version is saved to it.
+        """
+        store = self.snapshot_store
+        bucket = None if time_epoch is None else time_epoch // self.snapshot_cache.time_bucket_ms
+        if store is not None and bucket is not None:
+            graph = await store.load_snapshot(base_url, domain, bucket=bucket)
+            if graph is not None:
+                return self.snapshot_cache.put(base_url, domain, time_epoch, graph.version, graph)
+        
+        graph = await self.fetch_graph_snapshot(base_url=base_url, domain=domain, time_epoch=time_epoch)
+        graph = self.snapshot_cache.put(base_url, domain, time_epoch, graph.version, graph)
+        if store is not None:
+            store.save_snapshot(base_url, domain, graph.version, graph, bucket)
+        return graph
+    
+    async def _cached_version(self, base_url: str, domain: str, version: str) -> Optional[GraphSnapshot]:
+        """Snapshot of a version from the snapshot cache or, failing that, the snapshot store."""
+        graph = self.snapshot_cache.get_version(base_url, domain, version)
+        if graph is None and self.snapshot_store is not None:
+            graph = await self.snapshot_store.load_snapshot(base_url, domain, version=version)
+            if graph is not None:
+                graph = self.snapshot_cache.put_version(base_url, domain, version, graph)
+        return graph
+    
+    async def get_systems_overview(self, timestamp: Optional[str] = None, base_url: str = None, domain: str = None,
+                                   headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Async counterpart of get_systems_overview, served from the snapshot cache when possible."""
+        analysis_time, time_epoch = _resolve_snapshot_time(timestamp)
+        graph = await self.get_graph_snapshot(base_url=base_url, domain=domain, time_epoch=time_epoch, headers=headers)
+        return _build_systems_overview(graph, analysis_time)
+    
+    async def get_systems_overview_with_metrics(self, timestamp: Optional[str] = None, window_minutes: int = 30,
+                                                base_url: str = None, domain: str = None,
+                                                headers: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, Any], MetricsIndex]:
+        """
+        Get the systems overview together with metrics for the window ending at the snapshot time.
+        
+        The overlay is requested by the snapshot's version, so it is fetched once the snapshot
+        is loaded (both usually come from the caches).
+        
+        Returns:
+            Tuple of (systems_data, metrics_index)
+        """
+        analysis_time, time_epoch = _resolve_snapshot_time(timestamp)
+        graph = await self.get_graph_snapshot(base_url=base_url, domain=domain, time_epoch=time_epoch, headers=headers)
+        systems_data = _build_systems_overview(graph, analysis_time)
+        
+        end_epoch = int(analysis_time.timestamp() * 1000)
+        start_epoch = end_epoch - window_minutes * 60000
+        metrics_index = await self.get_metrics_index(graph.version, start_epoch, end_epoch,
+                                                     base_url=base_url, domain=domain, headers=headers)
+        return systems_data, metrics_index
+    
+    async def get_interface_analysis(self, interface_id: str, version: str, start_time: Optional[str] = None,
+                                     end_time: Optional[str] = None, base_url: str = None, domain: str = None,
+                                     headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Async counterpart of get_interface_analysis.
+        
+        The pinned details and the overlay metrics do not depend on each other, so both
+        upstream requests are issued concurrently.
+        """
+        start_dt, end_dt = _resolve_analysis_window(start_time, end_time)
+        
+        start_epoch = int(start_dt.timestamp() * 1000)
+        end_epoch = int(end_dt.timestamp() * 1000)
+        interface_data, metrics_index = await _gather_or_cancel(
+            self.fetch_interface_details(version, interface_id, base_url=base_url, domain=domain, headers=headers),
+            self.get_interface_metrics_index(version, interface_id, start_epoch, end_epoch, base_url=base_url,
+                                             domain=domain, headers=headers)
+        )
+        
+        return _build_interface_analysis(interface_id, version, start_dt, end_dt, interface_data, metrics_index)
+    
+    async def get_interface_trend(self, interface_id: str, version: str, windows: int, start_time: Optional[str] = None,
+                                  end_time: Optional[str] = None, base_url: str = None, domain: str = None,
+                                  headers: Optional[Dict[str, str]] = None,
+                                  top: int = DEFAULT_TREND_TOP) -> Dict[str, Any]:
+        """
+        Interface analysis of the latest window, plus a regression check against the windows before it.
+        
+        The requested window is the latest of windows consecutive windows of the same length;
+        their overlays are fetched concurrently (closed windows stay in the metrics cache), and
+        every edge's QPM, errors and p99 are compared with the earlier windows in one pass
+        (see graph_trend.detect_regressions).
+        
+        Args:
+            interface_id: Interface to analyze
+            version: Version ID from systems overview
+            windows: Number of windows, including the requested one (2 to MAX_TREND_WINDOWS)
+            start_time: Start of the latest window (default: 30 minutes before end_time)
+            end_time: End of the latest window (default: now)
+            top: Maximum number of regressions reported
+            
+        Returns:
+            The get_interface_analysis dict with an extra "trend" key holding:
+            - windows: Time range dict of every window, oldest first
+            - flags, flag_count, edges_compared: See detect_regressions
+            
+        Raises:
+            ValueError: If windows is out of range
+        """
+        windows = int(windows)
+        if not 2 <= windows <= MAX_TREND_WINDOWS:
+            raise ValueError(f"trend_windows must be between 2 and {MAX_TREND_WINDOWS}, got {windows}")
+        
+        start_dt, end_dt = _resolve_analysis_window(start_time, end_time)
+        length = end_dt - start_dt
+        if length.total_seconds() <= 0:
+            raise ValueError("start_time must be before end_time")
+        ranges = [(start_dt - length * back, end_dt - length * back) for back in range(windows - 1, -1, -1)]
+        
+        interface_data, *metrics_indexes = await _gather_or_cancel(
+            self.fetch_interface_details(version, interface_id, base_url=base_url, domain=domain, headers=headers),
+            *(self.get_interface_metrics_index(version, interface_id, int(window_start.timestamp() * 1000),
+                                               int(window_end.timestamp() * 1000), base_url=base_url,
+                                               domain=domain, headers=headers)
+              for window_start, window_end in ranges)
+        )
+        
+        analysis = _build_interface_analysis(interface_id, version, start_dt, end_dt, interface_data,
+                                             metrics_indexes[-1])
+        edge_ids = [edge["edge_display"] for edge in analysis["edges"]]
+        trend = detect_regressions(edge_ids, metrics_indexes, top=top)
+        trend["windows"] = [_time_range(window_start, window_end) for window_start, window_end in ranges]
+        analysis["trend"] = trend
+        return analysis
+    
+    async def get_interfaces_analysis_batch(self, interface_ids: List[str], version: str,
+                                            start_time: Optional[str] = None, end_time: Optional[str] = None,
+                                            base_url: str = None, domain: str = None,
+                                            headers: Optional[Dict[str, str]] = None,
+                                            concurrency: int = DETAILS_BATCH_CONCURRENCY) -> Dict[str, Any]:
+        """
+        Interface analysis for several interfaces of one version.
+        
+        The whole-version overlay is fetched once and shared by every interface, while the
+        details/pinned requests run concurrently, at most concurrency at a time. A failing
+        interface (e.g. a system unit ID) is reported in its result instead of failing the batch.
+        
+        Args:
+            interface_ids: Interfaces to analyze (duplicates are analyzed once)
+            version: Version ID from systems overview
+            start_time: Start timestamp for metrics (default: 30 minutes ago)
+            end_time: End timestamp for metrics (default: now)
+            concurrency: Maximum details/pinned requests in flight
+            
+        Returns:
+            Dict containing:
+            - version, time_range
+            - results: One dict per interface, in request order, with interface_id and either
+              analysis (see get_interface_analysis) or error (message string)
+            
+        Raises:
+            ValueError: If no interface is given or the batch exceeds MAX_DETAILS_BATCH_INTERFACES
+            httpx.HTTPError: If the shared overlay cannot be fetched
+        """
+        interface_ids = list(dict.fromkeys(interface_ids or []))
+        if not interface_ids:
+            raise ValueError("At least one interface ID is required")
+        if len(interface_ids) > MAX_DETAILS_BATCH_INTERFACES:
+            raise ValueError(
+                f"Too many interfaces in one batch ({len(interface_ids)}); "
+                f"the limit is {MAX_DETAILS_BATCH_INTERFACES}"
+            )
+        
+        start_dt, end_dt = _resolve_analysis_window(start_time, end_time)
+        start_epoch = int(start_dt.timestamp() * 1000)
+        end_epoch = int(end_dt.timestamp() * 1000)
+        semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+        
+        async def fetch_details(interface_id: str) -> Any:
+            async with semaphore:
+                try:
+                    return await self.fetch_interface_details(version, interface_id, base_url=base_url,
+                                                              domain=domain, headers=headers)
+                except Exception as e:
+                    return e
+        
+        metrics_index, *details = await _gather_or_cancel(
+            self.get_metrics_index(version, start_epoch, end_epoch, base_url=base_url, domain=domain,
+                                   headers=headers),
+            *(fetch_details(interface_id) for interface_id in interface_ids)
+        )
+        
+        results = []
+        for interface_id, interface_data in zip(interface_ids, details):
+            result = {"interface_id": interface_id, "analysis": None, "error": None}
+            try:
+                if isinstance(interface_data, Exception):
+                    raise interface_data
+                result["analysis"] = _build_interface_analysis(interface_id, version, start_dt, end_dt,
+                                                               interface_data, metrics_index)
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+            results.append(result)
+        
+        return {
+            "version": version,
+            "time_range": _time_range(start_dt, end_dt),
+            "results": results
+        }
+    
+    async def get_snapshot_for_version(self, version: Optional[str] = None, base_url: str = None, domain: str = None,
+                                       headers: Optional[Dict[str, str]] = None) -> GraphSnapshot:
+        """
+        Get the cached snapshot for a version, or the latest snapshot.
+        
+        graph-paths/all can only be queried by time, so a version that is neither cached nor
+        in the snapshot store resolves to the latest snapshot; callers should compare
+        graph.version with version.
+        """
+        base_url = base_url or BASE_URL
+        domain = _resolve_domain(domain, headers)
+        
+        graph = await self._cached_version(base_url, domain, version) if version else None
+        if graph is None:
+            graph = await self.get_graph_snapshot(base_url=base_url, domain=domain)
+        return graph
+    
+    async def _snapshot_with_metrics(self, version: Optional[str], start_dt: datetime, end_dt: datetime,
+                                     base_url: Optional[str], domain: Optional[str],
+                                     headers: Optional[Dict[str, str]]) -> Tuple[GraphSnapshot, MetricsIndex]:
+        """Snapshot for a version (see get_snapshot_for_version) plus its overlay metrics for a window."""
+        start_epoch = int(start_dt.timestamp() * 1000)
+        end_epoch = int(end_dt.timestamp() * 1000)
+        
+        if version:
+            # The overlay only needs the version, so fetch it alongside the snapshot
+            return await _gather_or_cancel(
+                self.get_snapshot_for_version(version, base_url=base_url, domain=domain, headers=headers),
+                self.get_metrics_index(version, start_epoch, end_epoch, base_url=base_url, domain=domain,
+                                       headers=headers)
+            )
+        
+        graph = await self.get_snapshot_for_version(base_url=base_url, domain=domain, headers=headers)
+        metrics_index = await self.get_metrics_index(graph.version, start_epoch, end_epoch, base_url=base_url,
+                                                     domain=domain, headers=headers)
+        return graph, metrics_index
+    
+    async def get_dependency_tree(self, interface_id: str, version: Optional[str] = None, direction: str = "both",
+                                  depth: int = DEFAULT_TREE_DEPTH, start_time: Optional[str] = None,
+                                  end_time: Optional[str] = None, base_url: str = None, domain: str = None,
+                                  headers: Optional[Dict[str, str]] = None,
+                                  max_nodes: int = DEFAULT_TREE_MAX_NODES) -> Dict[str, Any]:
+        """
+        Get k-hop upstream and/or downstream dependency trees of an interface.
+        
+        The trees are computed locally from the cached graph-paths/all snapshot (in_in edges)
+        and joined with a single overlays/v2 fetch, instead of one details/pinned call per hop.
+        
+        Args:
+            interface_id: Interface at the root of the trees
+            version: Version ID from the systems overview (default: latest snapshot)
+            direction: "downstream", "upstream" or "both"
+            depth: Number of hops to expand (capped at MAX_TREE_DEPTH)
+            start_time: Start timestamp for metrics (default: 30 minutes before end_time)
+            end_time: End timestamp for metrics (default: now)
+            max_nodes: Maximum number of distinct nodes per tree
+            
+        Returns:
+            Dict containing:
+            - interface_id, version, requested_version, direction, depth
+            - time_range: Metrics time range
+            - trees: Direction -> root node dict (see graph_analysis.dependency_tree)
+            
+        Raises:
+            ValueError: If the interface is not in the snapshot or the direction is invalid
+        """
+        directions = tree_directions(direction)
+        depth = max(1, min(int(depth), MAX_TREE_DEPTH))
+        start_dt, end_dt = _resolve_analysis_window(start_time, end_time)
+        graph, metrics_index = await self._snapshot_with_metrics(version, start_dt, end_dt, base_url, domain, headers)
+        _require_node(graph, interface_id)
+        
+        return {
+            "interface_id": interface_id,
+            "version": graph.version,
+            "requested_version": version,
+            "direction": direction,
+            "depth": depth,
+            "time_range": _time_range(start_dt, end_dt),
+            "trees": {
+                tree_direction: dependency_tree(graph, interface_id, tree_direction, depth, max_nodes, metrics_index)
+                for tree_direction in directions
+            }
+        }
+    
+    async def get_critical_path(self, interface_id: Optional[str] = None, version: Optional[str] = None,
+                                percentile: str = DEFAULT_CRITICAL_PATH_PERCENTILE, start_time: Optional[str] = None,
+                                end_time: Optional[str] = None, base_url: str = None, domain: str = None,
+                                headers: Optional[Dict[str, str]] = None,
+                                top: int = DEFAULT_CRITICAL_PATH_TOP) -> Dict[str, Any]:
+        """
+        Find the synchronous call chain(s) behind the highest latency.
+        
+        Follows the slowest EDGE_SYNC in_in edge of the cached snapshot at every hop,
+        using overlay latencies (see graph_analysis.critical_paths).
+        
+        Args:
+            interface_id: Entry interface (default: every External::INBOUND interface)
+            version: Version ID from the systems overview (default: latest snapshot)
+            percentile: Latency percentile to follow ("p50", "p90", "p95" or "p99")
+            start_time: Start timestamp for metrics (default: 30 minutes before end_time)
+            end_time: End timestamp for metrics (default: now)
+            top: Number of entry points to report when interface_id is not given
+            
+        Returns:
+            Dict containing:
+            - interface_id, version, requested_version, percentile, time_range
+            - paths: Critical paths, highest total latency first (at most top)
+            - entry_point_count, nodes_visited, edges_considered, cycle_edges
+            
+        Raises:
+            ValueError: If the interface is not in the snapshot or the percentile is invalid
+        """
+        start_dt, end_dt = _resolve_analysis_window(start_time, end_time)
+        graph, metrics_index = await self._snapshot_with_metrics(version, start_dt, end_dt, base_url, domain, headers)
+        
+        if interface_id:
+            _require_node(graph, interface_id)
+            roots = [interface_id]
+        else:
+            roots = entry_points(graph)
+        
+        result = critical_paths(graph, roots, metrics_index, percentile)
+        return {
+            "interface_id": interface_id,
+            "version": graph.version,
+            "requested_version": version,
+            "percentile": percentile,
+            "time_range": _time_range(start_dt, end_dt),
+            "paths": result["paths"][:max(1, int(top))],
+            "entry_point_count": len(roots),
+            "nodes_visited": result["nodes_visited"],
+            "edges_considered": result["edges_considered"],
+            "cycle_edges": result["cycle_edges"]
+        }
+
+    async def get_blast_radius(self, interface_ids: List[str], version: Optional[str] = None,
+                               start_time: Optional[str] = None, end_time: Optional[str] = None,
+                               base_url: str = None, domain: str = None,
+                               headers: Optional[Dict[str, str]] = None, sync_only: bool = False,
+                               top: int = DEFAULT_BLAST_RADIUS_TOP) -> Dict[str, Any]:
+        """
+        Find every caller that (transitively) depends on the given interfaces.
+        
+        Walks in_in edges of the cached snapshot backwards from the targets and ranks the
+        External::INBOUND callers reached by the overlay QPM they send into the affected
+        region (see graph_analysis.blast_radius).
+        
+        Args:
+            interface_ids: Degraded interfaces (e.g. ["Tix-Tyrion::Mongo::find"])
+            version: Version ID from the systems overview (default: latest snapshot)
+            start_time: Start timestamp for metrics (default: 30 minutes before end_time)
+            end_time: End timestamp for metrics (default: now)
+            sync_only: Follow only EDGE_SYNC edges
+            top: Number of entry points and direct callers to report
+            
+        Returns:
+            Dict containing:
+            - interface_ids, version, requested_version, time_range, sync_only
+            - affected_count: Interfaces affected, excluding the targets
+            - max_hops: Longest caller chain to a target
+            - entry_points: Affected External::INBOUND callers, highest affected QPM first (at most top)
+            - entry_point_count, total_entry_qpm: All affected entry points and their summed QPM
+            - direct_callers: Edges into the targets, highest QPM first (at most top)
+            - edges_traversed
+            
+        Raises:
+            ValueError: If none of the interfaces is in the snapshot
+        """
+        if isinstance(interface_ids, str):
+            interface_ids = [interface_ids]
+        interface_ids = list(dict.fromkeys(interface_ids or []))
+        if not interface_ids:
+            raise ValueError("At least one interface ID is required")
+        
+        start_dt, end_dt = _resolve_analysis_window(start_time, end_time)
+        graph, metrics_index = await self._snapshot_with_metrics(version, start_dt, end_dt, base_url, domain, headers)
+        
+        missing = [interface_id for interface_id in interface_ids if not graph.has_node(interface_id)]
+        if len(missing) == len(interface_ids):
+            _require_node(graph, missing[0])
+        
+        result = blast_radius(graph, interface_ids, metrics_index, sync_only=sync_only)
+        top = max(1, int(top))
+        return {
+            "interface_ids": result["targets"],
+            "missing_interface_ids": result["missing_targets"],
+            "version": graph.version,
+            "requested_version": version,
+            "time_range": _time_range(start_dt, end_dt),
+            "sync_only": sync_only,
+            "affected_count": len(result["distances"]) - len(result["targets"]),
+            "max_hops": max(result["distances"].values(), default=0),
+            "entry_points": result["entry_points"][:top],
+            "entry_point_count": len(result["entry_points"]),
+            "total_entry_qpm": sum(entry["affected_qpm"] for entry in result["entry_points"]),
+            "direct_callers": result["direct_callers"][:top],
+            "direct_caller_count": len(result["direct_callers"]),
+            "edges_traversed": result["edges_traversed"]
+        }
+    
+    async def _diff_side(self, version: Optional[str], timestamp: Optional[str], window_minutes: int,
+                         with_metrics: bool, base_url: Optional[str], domain: Optional[str],
+                         headers: Optional[Dict[str, str]]
+                         ) -> Tuple[GraphSnapshot, Optional[MetricsIndex], Optional[datetime]]:
+        """
+        One side of a snapshot diff: its snapshot, its overlay (if with_metrics) and its time.
+        
+        A side given by version alone has no known time (None): a metrics window ending "now"
+        would not describe that snapshot.
+        """
+        if version:
+            graph = await self._cached_version(base_url or BASE_URL, _resolve_domain(domain, headers), version)
+            if graph is None:
+                raise ValueError(
+                    f"Snapshot {version} is neither cached nor stored; graph-paths/all can only be queried by time. "
+                    "Pass a timestamp for this side instead."
+                )
+            analysis_time = _parse_iso_timestamp(timestamp) if timestamp else None
+        else:
+            analysis_time, time_epoch = _resolve_snapshot_time(timestamp)
+            graph = await self.get_graph_snapshot(base_url=base_url, domain=domain, time_epoch=time_epoch,
+                                                  headers=headers)
+        if not with_metrics:
+            return graph, None, analysis_time
+        end_epoch = int(analysis_time.timestamp() * 1000)
+        metrics_index = await self.get_metrics_index(graph.version, end_epoch - window_minutes * 60000, end_epoch,
+                                                     base_url=base_url, domain=domain, headers=headers)
+        return graph, metrics_index, analysis_time
+    
+    async def get_snapshot_diff(self, from_timestamp: Optional[str] = None, to_timestamp: Optional[str] = None,
+                                from_version: Optional[str] = None, to_version: Optional[str] = None,
+                                window_minutes: int = 30, base_url: str = None, domain: str = None,
+                                headers: Optional[Dict[str, str]] = None,
+                                top: int = DEFAULT_DIFF_TOP) -> Dict[str, Any]:
+        """
+        What changed between two snapshots: topology, plus metric deltas of the common edges.
+        
+        Both snapshots and their overlays are loaded concurrently through the caches
+        (see graph_analysis.snapshot_diff).
+        
+        Args:
+            from_timestamp: Time of the older snapshot
+            to_timestamp: Time of the newer snapshot (default: latest)
+            from_version: Older snapshot by version ID instead (must still be cached); metrics
+                are only compared if from_timestamp is given as well
+            to_version: Newer snapshot by version ID instead (must still be cached); metrics
+                are only compared if to_timestamp is given as well
+            window_minutes: Length of the overlay window ending at each side's time
+            top: Maximum number of IDs per added/removed list, and of changed edges
+            
+        Returns:
+            Dict containing:
+            - from / to: {"version", "timestamp"} of each side (timestamp None for a version-only side)
+            - window_minutes
+            - metrics_compared: False if a side was given by version alone, so no overlay was compared
+            - system_units, interfaces, edges, changed_edges, changed_edge_count: See snapshot_diff
+            
+        Raises:
+            ValueError: If the older side is missing, or a version is not cached
+        """
+        if not from_timestamp and not from_version:
+            raise ValueError("Either from_timestamp or from_version is required")
+        window_minutes = max(1, int(window_minutes))
+        # Overlays are only comparable when both sides have a time
+        with_metrics = not (from_version and not from_timestamp) and not (to_version and not to_timestamp)
+        
+        (before, before_metrics, before_time), (after, after_metrics, after_time) = await _gather_or_cancel(
+            self._diff_side(from_version, from_timestamp, window_minutes, with_metrics, base_url, domain, headers),
+            self._diff_side(to_version, to_timestamp, window_minutes, with_metrics, base_url, domain, headers)
+        )
+        
+        diff = snapshot_diff(before, after, before_metrics, after_metrics, top=max(1, int(top)))
+        return {
+            "from": {"version": before.version, "timestamp": before_time.isoformat() if before_time else None},
+            "to": {"version": after.version, "timestamp": after_time.isoformat() if after_time else None},
+            "window_minutes": window_minutes,
+            "metrics_compared": with_metrics,
+            **diff
+        }
+    
+    async def get_metric_ranking(self, item_type: str = "edges", sort_by: str = "p99", descending: bool = True,
+                                 where: Optional[Dict[str, Dict[str, float]]] = None,
+                                 id_contains: Optional[str] = None, version: Optional[str] = None,
+                                 start_time: Optional[str] = None, end_time: Optional[str] = None,
+                                 base_url: str = None, domain: str = None, headers: Optional[Dict[str, str]] = None,
+                                 top: int = DEFAULT_RANKING_TOP) -> Dict[str, Any]:
+        """
+        Rank the items of an overlay by one metric, after optional filters.
+        
+        Filtering and top-K run on the overlay's columnar table (see graph_table.MetricsTable),
+        which is built once per cached overlay.
+        
+        Args:
+            item_type: Overlay category ('edges', 'interfaces' or 'system_units')
+            sort_by: Metric to rank by (qpm, errors_total, errors_4xx, errors_5xx, p50, p90, p95, p99)
+            descending: Highest values first (default) or lowest first
+            where: Metric -> {"min": value, "max": value} filters, both bounds inclusive
+            id_contains: Substring the item ID must contain
+            version: Version ID from the systems overview (default: latest snapshot)
+            start_time: Start timestamp for metrics (default: 30 minutes before end_time)
+            end_time: End timestamp for metrics (default: now)
+            top: Maximum number of items returned
+            
+        Returns:
+            Dict containing:
+            - version, time_range, item_type, sort_by, descending, where, id_contains
+            - total: Number of items in the overlay category
+            - matched: Number of items passing the filters with a value for sort_by
+            - items: Ranked rows with id and every metric
+            
+        Raises:
+            ValueError: If the item type, a metric or a filter bound is unknown
+        """
+        if item_type not in OVERLAY_CATEGORIES:
+            raise ValueError(f"Unknown item_type '{item_type}'. Valid types: {', '.join(OVERLAY_CATEGORIES)}")
+        start_dt, end_dt = _resolve_analysis_window(start_time, end_time)
+        if not version:
+            graph = await self.get_snapshot_for_version(base_url=base_url, domain=domain, headers=headers)
+            version = graph.version
+        metrics_index = await self.get_metrics_index(version, int(start_dt.timestamp() * 1000),
+                                                     int(end_dt.timestamp() * 1000), base_url=base_url,
+                                                     domain=domain, headers=headers)
+        
+        table = metrics_index.table(item_type)
+        mask = table.filter(where, id_contains, require=(sort_by,))
+        ranked = table.top_k(sort_by, min(max(1, int(top)), MAX_RANKING_TOP), descending=descending, mask=mask)
+        return {
+            "version": version,
+            "time_range": _time_range(start_dt, end_dt),
+            "item_type": item_type,
+            "sort_by": sort_by,
+            "descending": descending,
+            "where": where,
+            "id_contains": id_contains,
+            "total": len(table),
+            "matched": int(mask.sum()),
+            "items": table.rows(ranked)
+        }
+
+
+def _require_node(graph: GraphSnapshot, interface_id: str):
+    """Raise ValueError if an interface is not part of a snapshot."""
+    if not graph.has_node(interface_id):
+        raise ValueError(
+            f"Interface '{interface_id}' not found in snapshot {graph.version}. "
+            "Use get_systems_and_interfaces to list valid interface names."
+        )
+
+
+async def _gather_or_cancel(*aws) -> List[Any]:
+    """
+    Run awaitables concurrently and return their results in order.
+    
+    Unlike a bare asyncio.gather, the siblings are cancelled as soon as one of them fails,
+    so a failed details call does not leave an orphaned overlay request running.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
 def format_metrics(metrics: Optional[Dict[str, Any]], 
                   latency_percentiles: List[str] = ["0.5", "0.9", "0.95", "0.99"]) -> str:
     """
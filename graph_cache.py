@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Graph Cache
+In-process caches for graph API payloads used by the remote MCP server.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+# Snapshot cache configuration
+SNAPSHOT_LATEST_TTL_SECONDS = float(os.getenv("CK_SNAPSHOT_LATEST_TTL_SECONDS", "60"))
+SNAPSHOT_CACHE_MAX_VERSIONS = int(os.getenv("CK_SNAPSHOT_CACHE_MAX_VERSIONS", "4"))
+SNAPSHOT_TIME_BUCKET_SECONDS = int(os.getenv("CK_SNAPSHOT_TIME_BUCKET_SECONDS", "60"))
+
+# Metrics overlay cache configuration
+METRICS_BUCKET_SECONDS = int(os.getenv("CK_METRICS_BUCKET_SECONDS", "60"))
+METRICS_OPEN_WINDOW_TTL_SECONDS = float(os.getenv("CK_METRICS_OPEN_WINDOW_TTL_SECONDS", "60"))
+METRICS_CACHE_MAX_BYTES = int(os.getenv("CK_METRICS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Rendered response cache configuration
+RENDERED_CACHE_MAX_ENTRIES = int(os.getenv("CK_RENDERED_CACHE_MAX_ENTRIES", "32"))
+
+LATEST = "latest"
+
+
+class SnapshotCache:
+    """
+    Cache of parsed graph-paths/all snapshots.
+
+    A snapshot is immutable once Nexus has assigned it a version (e.g. "demo--595"), so
+    snapshots are stored by (base_url, domain, version) with LRU eviction. Requests are
+    resolved to a version through a pointer:
+    - "latest" (no timestamp) points at the newest version and expires after a TTL
+    - a historical timestamp is aligned to a time bucket and never expires
+
+    Not thread-safe: it is meant to be used from the server's event loop.
+    """
+
+    def __init__(self, latest_ttl_seconds: float = SNAPSHOT_LATEST_TTL_SECONDS,
+                 max_versions: int = SNAPSHOT_CACHE_MAX_VERSIONS,
+                 time_bucket_seconds: int = SNAPSHOT_TIME_BUCKET_SECONDS):
+        self.latest_ttl_seconds = latest_ttl_seconds
+        self.max_versions = max_versions
+        self.time_bucket_ms = max(1, time_bucket_seconds) * 1000
+        # (base_url, domain, pointer) -> (version, expires_at or None)
+        self._pointers: "OrderedDict[Tuple[str, str, Any], Tuple[str, Optional[float]]]" = OrderedDict()
+        # (base_url, domain, version) -> snapshot
+        self._snapshots: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        # Lookup outcomes since startup (exported on /metrics)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def _pointer_key(self, base_url: str, domain: str, time_epoch: Optional[int]) -> Tuple[str, str, Any]:
+        if time_epoch is None:
+            return (base_url, domain, LATEST)
+        return (base_url, domain, time_epoch // self.time_bucket_ms)
+
+    def get(self, base_url: str, domain: str, time_epoch: Optional[int] = None) -> Optional[Any]:
+        """
+        Look up the snapshot for a point in time.
+
+        Args:
+            base_url: Upstream graph API base URL
+            domain: Domain of the snapshot
+            time_epoch: Epoch milliseconds of the requested snapshot, or None for the latest one
+
+        Returns:
+            The cached snapshot, or None on a miss or an expired "latest" pointer
+        """
+        pointer_key = self._pointer_key(base_url, domain, time_epoch)
+        pointer = self._pointers.get(pointer_key)
+        if pointer is None:
+            self.misses += 1
+            return None
+
+        version, expires_at = pointer
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._pointers[pointer_key]
+            self.misses += 1
+            return None
+
+        self._pointers.move_to_end(pointer_key)
+        return self.get_version(base_url, domain, version)
+
+    def get_version(self, base_url: str, domain: str, version: str) -> Optional[Any]:
+        """Look up a snapshot by its version ID."""
+        key = (base_url, domain, version)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._snapshots.move_to_end(key)
+        return snapshot
+
+    def put(self, base_url: str, domain: str, time_epoch: Optional[int], version: str, snapshot: Any) -> Any:
+        """
+        Store a snapshot and point the requested time (or "latest") at its version.
+
+        Returns:
+            The cached snapshot of that version; a snapshot already cached for it is kept,
+            so objects derived from it (e.g. rendered responses) stay valid
+        """
+        expires_at = None
+        if time_epoch is None:
+            expires_at = time.monotonic() + self.latest_ttl_seconds
+
+        pointer_key = self._pointer_key(base_url, domain, time_epoch)
+        self._pointers[pointer_key] = (version, expires_at)
+        self._pointers.move_to_end(pointer_key)
+
+        # Pointers are tiny, but keep them bounded as well; dangling ones simply miss
+        while len(self._pointers) > self.max_versions * 16:
+            self._pointers.popitem(last=False)
+        return self.put_version(base_url, domain, version, snapshot)
+
+    def put_version(self, base_url: str, domain: str, version: str, snapshot: Any) -> Any:
+        """
+        Store a snapshot by version only, without pointing any time at it.
+
+        Returns:
+            The cached snapshot of that version (see put)
+        """
+        key = (base_url, domain, version)
+        snapshot = self._snapshots.setdefault(key, snapshot)
+        self._snapshots.move_to_end(key)
+
+        while len(self._snapshots) > self.max_versions:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def clear(self):
+        """Drop every cached snapshot and pointer."""
+        self._pointers.clear()
+        self._snapshots.clear()
+
+
+class MetricsCache:
+    """
+    Cache of overlays/v2 metrics responses (stored as built MetricsIndex objects).
+
+    Metric windows are aligned to a fixed bucket (e.g. 1 minute) so that calls made a few
+    seconds apart share the same key: (base_url, domain, version, aligned_start, aligned_end).
+    Entries are evicted least-recently-used once the total payload size exceeds max_bytes.
+    A window that ends within the last bucket is still "open" (Nexus keeps aggregating it),
+    so it is only served for open_window_ttl_seconds; closed windows never go stale.
+
+    Not thread-safe: it is meant to be used from the server's event loop.
+    """
+
+    def __init__(self, bucket_seconds: int = METRICS_BUCKET_SECONDS,
+                 open_window_ttl_seconds: float = METRICS_OPEN_WINDOW_TTL_SECONDS,
+                 max_bytes: int = METRICS_CACHE_MAX_BYTES):
+        self.bucket_ms = max(1, bucket_seconds) * 1000
+        self.open_window_ttl_seconds = open_window_ttl_seconds
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        # key -> (metrics, response size in bytes, expires_at or None)
+        self._entries: "OrderedDict[Tuple[str, str, str, int, int], Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        # Lookup outcomes since startup (exported on /metrics)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def align_window(self, start_time: int, end_time: int) -> Tuple[int, int]:
+        """
+        Align an epoch-millisecond window down to bucket boundaries.
+
+        Returns:
+            Tuple of (aligned_start, aligned_end); the window is never shorter than one bucket
+        """
+        aligned_start = start_time - start_time % self.bucket_ms
+        aligned_end = end_time - end_time % self.bucket_ms
+        if aligned_end <= aligned_start:
+            aligned_end = aligned_start + self.bucket_ms
+        return aligned_start, aligned_end
+
+    def is_open_window(self, end_time: int, now_ms: Optional[int] = None) -> bool:
+        """Whether a window ending at end_time is still being aggregated upstream."""
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        return end_time > now_ms - self.bucket_ms
+
+    def get(self, base_url: str, domain: str, version: str, start_time: int, end_time: int) -> Optional[Any]:
+        """Look up metrics for an aligned window; returns None on a miss or a stale open window."""
+        key = (base_url, domain, version, start_time, end_time)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        metrics, size, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return metrics
+
+    def put(self, base_url: str, domain: str, version: str, start_time: int, end_time: int,
+            metrics: Any, size: int):
+        """
+        Store metrics for an aligned window, evicting older entries to stay within max_bytes.
+
+        Args:
+            size: Size of the upstream response in bytes, used as the entry's weight
+        """
+        if size > self.max_bytes:
+            return
+
+        key = (base_url, domain, version, start_time, end_time)
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = None
+        if self.is_open_window(end_time):
+            expires_at = time.monotonic() + self.open_window_ttl_seconds
+
+        self._entries[key] = (metrics, size, expires_at)
+        self.total_bytes += size
+
+        while self.total_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[str, str, str, int, int]):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def clear(self):
+        """Drop every cached metrics response."""
+        self._entries.clear()
+        self.total_bytes = 0
+
+
+class RenderedCache:
+    """
+    Cache of rendered tool responses (e.g. the systems directory), kept as lists of chunks.
+
+    An entry is only valid for the exact inputs it was rendered from: it stores the source
+    objects (e.g. the GraphSnapshot and MetricsIndex) and is a miss unless the caller passes
+    the same objects again, so it can never outlive the snapshot and metrics caches.
+    Entries are evicted least-recently-used beyond max_entries.
+
+    Not thread-safe: it is meant to be used from the server's event loop.
+    """
+
+    def __init__(self, max_entries: int = RENDERED_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        # key -> (source objects, chunks)
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[Any, ...], List[str]]]" = OrderedDict()
+        # Lookup outcomes since startup (exported on /metrics)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, sources: Tuple[Any, ...]) -> Optional[List[str]]:
+        """Look up the chunks rendered for key from exactly these source objects."""
+        entry = self._entries.get(key)
+        if entry is None or len(entry[0]) != len(sources) or any(a is not b for a, b in zip(entry[0], sources)):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, sources: Tuple[Any, ...], chunks: List[str]):
+        """Store the chunks rendered for key from the given source objects."""
+        self._entries[key] = (sources, chunks)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every rendered response."""
+        self._entries.clear()
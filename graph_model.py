@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Graph Model
+Compact, indexed in-memory representations of graph API responses.
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from graph_table import MetricsTable
+
+# Edge ID prefixes used by the graph APIs ("in_in:Source->Target", "ss_in:ss:X->Y", ...)
+EDGE_PREFIXES = ("in_in", "in_ss", "ss_in", "su_su", "ss_ss")
+_PREFIX_CODES = {prefix: code for code, prefix in enumerate(EDGE_PREFIXES)}
+UNKNOWN_PREFIX = -1
+
+# Sync flags precomputed from lookupData.edges[*].kind
+SYNC_UNKNOWN = 0
+SYNC = 1
+ASYNC = 2
+_SYNC_NAMES = ("UNKNOWN", "SYNC", "ASYNC")
+
+
+def _sync_flag(kind: Optional[str]) -> int:
+    """Map an edge kind such as "EDGE_SYNC" / "EDGE_ASYNC" to a sync flag."""
+    kind = (kind or "").upper()
+    if "ASYNC" in kind:
+        return ASYNC
+    if "SYNC" in kind:
+        return SYNC
+    return SYNC_UNKNOWN
+
+
+class GraphSnapshot:
+    """
+    Indexed view of one graph-paths/all (or details/pinned) response.
+
+    Built once per version so that analysis never re-walks the raw JSON:
+    - node IDs are interned and numbered; edges refer to nodes by index
+    - edges are numbered in baseTimelineGraph order and bucketed by prefix
+    - adjacency lists are kept in both directions, so per-node queries are O(degree)
+    - the sync/async kind of every edge is resolved from lookupData up front
+    """
+
+    __slots__ = (
+        "version", "system_units", "interfaces", "subsystems",
+        "node_ids", "node_index",
+        "edge_ids", "edge_index", "edge_prefix", "edge_source", "edge_target", "edge_sync",
+        "edges_by_prefix", "out_edges", "in_edges",
+    )
+
+    def __init__(self, version: str, system_units: List[str], interfaces: List[str], subsystems: List[str]):
+        self.version = version
+        self.system_units = system_units
+        self.interfaces = interfaces
+        self.subsystems = subsystems
+        self.node_ids: List[str] = []
+        self.node_index: Dict[str, int] = {}
+        self.edge_ids: List[str] = []
+        self.edge_index: Dict[str, int] = {}
+        self.edge_prefix = array("b")
+        self.edge_source = array("i")
+        self.edge_target = array("i")
+        self.edge_sync = array("b")
+        self.edges_by_prefix: Dict[str, array] = {prefix: array("i") for prefix in EDGE_PREFIXES}
+        self.out_edges: List[array] = []
+        self.in_edges: List[array] = []
+
+    @classmethod
+    def from_graph_data(cls, graph_data: Dict[str, Any]) -> "GraphSnapshot":
+        """Build a snapshot from a parsed graph-paths/all or details/pinned response."""
+        base_timeline_graph = graph_data.get("baseTimelineGraph", {})
+        edge_metadata = graph_data.get("lookupData", {}).get("edges", {})
+        return cls.from_sections(
+            graph_data.get("version", "unknown"),
+            base_timeline_graph.get("systemunits", []),
+            base_timeline_graph.get("interfaces", []),
+            base_timeline_graph.get("subsystems", []),
+            base_timeline_graph.get("edges", []),
+            edge_metadata,
+        )
+
+    @classmethod
+    def from_sections(cls, version: str, system_units: Iterable[str], interfaces: Iterable[str],
+                      subsystems: Iterable[str], edges: Iterable[str],
+                      edge_metadata: Optional[Dict[str, Dict[str, Any]]] = None) -> "GraphSnapshot":
+        """
+        Build a snapshot from the individual response sections.
+
+        Args:
+            version: Snapshot version (e.g. "demo--595")
+            system_units: baseTimelineGraph.systemunits
+            interfaces: baseTimelineGraph.interfaces
+            subsystems: baseTimelineGraph.subsystems
+            edges: baseTimelineGraph.edges (full edge IDs)
+            edge_metadata: lookupData.edges, used for sync/async kinds and explicit endpoints
+        """
+        intern = sys.intern
+        snapshot = cls(
+            version,
+            [intern(unit) for unit in system_units],
+            [intern(interface) for interface in interfaces],
+            [intern(subsystem) for subsystem in subsystems],
+        )
+        for node_id in snapshot.system_units:
+            snapshot._node(node_id)
+        for node_id in snapshot.interfaces:
+            snapshot._node(node_id)
+        for node_id in snapshot.subsystems:
+            snapshot._node(node_id)
+
+        edge_metadata = edge_metadata or {}
+        for edge_id in edges:
+            snapshot._add_edge(edge_id, edge_metadata.get(edge_id))
+        return snapshot
+
+    def _node(self, node_id: str) -> int:
+        index = self.node_index.get(node_id)
+        if index is None:
+            index = len(self.node_ids)
+            node_id = sys.intern(node_id)
+            self.node_ids.append(node_id)
+            self.node_index[node_id] = index
+            self.out_edges.append(array("i"))
+            self.in_edges.append(array("i"))
+        return index
+
+    def _add_edge(self, edge_id: str, metadata: Optional[Dict[str, Any]]):
+        if edge_id in self.edge_index:
+            return
+
+        prefix, _, body = edge_id.partition(":")
+        if metadata and metadata.get("sourceId") is not None and metadata.get("targetId") is not None:
+            source, target = metadata["sourceId"], metadata["targetId"]
+        else:
+            source, _, target = body.partition("->")
+
+        index = len(self.edge_ids)
+        source_index = self._node(source)
+        target_index = self._node(target)
+        prefix_code = _PREFIX_CODES.get(prefix, UNKNOWN_PREFIX)
+
+        edge_id = sys.intern(edge_id)
+        self.edge_ids.append(edge_id)
+        self.edge_index[edge_id] = index
+        self.edge_prefix.append(prefix_code)
+        self.edge_source.append(source_index)
+        self.edge_target.append(target_index)
+        self.edge_sync.append(_sync_flag(metadata.get("kind") if metadata else None))
+        if prefix_code != UNKNOWN_PREFIX:
+            self.edges_by_prefix[prefix].append(index)
+        self.out_edges[source_index].append(index)
+        self.in_edges[target_index].append(index)
+
+    # Node queries
+
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self.node_index
+
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    # Edge queries
+
+    def edge_count(self) -> int:
+        return len(self.edge_ids)
+
+    def edges_of_kind(self, prefix: str) -> array:
+        """Indices of every edge with the given prefix (e.g. "in_in"), in response order."""
+        return self.edges_by_prefix.get(prefix, array("i"))
+
+    def edge_display(self, edge: int) -> str:
+        """Edge ID without its prefix, e.g. "Source->Target"."""
+        edge_id = self.edge_ids[edge]
+        return edge_id.partition(":")[2] if self.edge_prefix[edge] != UNKNOWN_PREFIX else edge_id
+
+    def source_id(self, edge: int) -> str:
+        return self.node_ids[self.edge_source[edge]]
+
+    def target_id(self, edge: int) -> str:
+        return self.node_ids[self.edge_target[edge]]
+
+    def sync_type(self, edge: int) -> str:
+        """"SYNC", "ASYNC" or "UNKNOWN" for an edge."""
+        return _SYNC_NAMES[self.edge_sync[edge]]
+
+    def is_sync(self, edge: int) -> bool:
+        return self.edge_sync[edge] == SYNC
+
+    def downstream_edges(self, node_id: str, prefix: Optional[str] = "in_in") -> List[int]:
+        """Edges leaving node_id (calls it makes), optionally restricted to one prefix."""
+        return self._adjacent(self.out_edges, node_id, prefix)
+
+    def upstream_edges(self, node_id: str, prefix: Optional[str] = "in_in") -> List[int]:
+        """Edges entering node_id (calls it receives), optionally restricted to one prefix."""
+        return self._adjacent(self.in_edges, node_id, prefix)
+
+    def _adjacent(self, adjacency: List[array], node_id: str, prefix: Optional[str]) -> List[int]:
+        index = self.node_index.get(node_id)
+        if index is None:
+            return []
+        if prefix is None:
+            return list(adjacency[index])
+        code = _PREFIX_CODES.get(prefix, UNKNOWN_PREFIX)
+        edge_prefix = self.edge_prefix
+        return [edge for edge in adjacency[index] if edge_prefix[edge] == code]
+
+
+def aggregate_errors(errors: Dict[str, Any]) -> Tuple[int, int, int]:
+    """
+    Aggregate error codes from overlays v2 API into 4xx and 5xx buckets.
+    
+    Args:
+        errors: Error dictionary from metrics (e.g., {"400": 10, "401": 5, "500": 3, "total": 18})
+        
+    Returns:
+        Tuple of (total_errors, error_4xx, error_5xx)
+    """
+    # Check if pre-aggregated 4xx/5xx exist (backward compatibility)
+    # If keys exist, use them (even if 0, as that means no errors in that category)
+    has_4xx_pre = "4xx" in errors
+    has_5xx_pre = "5xx" in errors
+    
+    # Aggregate from individual error codes
+    error_4xx_agg = 0
+    error_5xx_agg = 0
+    
+    for error_code_str, error_count in errors.items():
+        # Skip non-numeric keys like "total", "4xx", "5xx"
+        if error_code_str in ("total", "4xx", "5xx"):
+            continue
+        try:
+            error_code = int(error_code_str)
+            # Aggregate 4xx errors (400-499)
+            if 400 <= error_code < 500:
+                error_4xx_agg += error_count
+            # Aggregate 5xx errors (500-599)
+            elif 500 <= error_code < 600:
+                error_5xx_agg += error_count
+        except (ValueError, TypeError):
+            # Skip non-numeric keys
+            continue
+    
+    # Use pre-aggregated values if available, otherwise use aggregated values
+    error_4xx = errors.get("4xx", 0) if has_4xx_pre else error_4xx_agg
+    error_5xx = errors.get("5xx", 0) if has_5xx_pre else error_5xx_agg
+    
+    # Calculate total errors
+    total_errors = errors.get("total", 0)
+    if total_errors == 0:
+        # If total not provided, sum all error counts (including aggregated 4xx/5xx if used)
+        total_errors = error_4xx + error_5xx
+        # Add any other error codes that aren't 4xx or 5xx
+        for error_code_str, error_count in errors.items():
+            if error_code_str in ("total", "4xx", "5xx"):
+                continue
+            try:
+                error_code = int(error_code_str)
+                if not (400 <= error_code < 600):
+                    total_errors += error_count
+            except (ValueError, TypeError):
+                continue
+    
+    return total_errors, error_4xx, error_5xx
+
+
+# Overlay categories as returned by overlays/v2 under tickResponse.<version>
+EDGES = "edges"
+INTERFACES = "interfaces"
+SYSTEM_UNITS = "system_units"
+OVERLAY_CATEGORIES = (EDGES, INTERFACES, SYSTEM_UNITS)
+
+# Spellings of the categories used elsewhere (the timeline graph says "systemunits")
+_CATEGORY_ALIASES = {"systemunits": SYSTEM_UNITS, "systemUnits": SYSTEM_UNITS}
+
+
+class MetricsRecord:
+    """
+    Flat metrics for one item of an overlays/v2 response.
+
+    Values are kept exactly as returned by the API (None when absent); errors are
+    aggregated into total/4xx/5xx once, when the record is built.
+    """
+
+    __slots__ = ("qpm", "errors_total", "errors_4xx", "errors_5xx", "p50", "p90", "p95", "p99")
+
+    def __init__(self, qpm: Any, errors_total: Any, errors_4xx: Any, errors_5xx: Any,
+                 p50: Any, p90: Any, p95: Any, p99: Any):
+        self.qpm = qpm
+        self.errors_total = errors_total
+        self.errors_4xx = errors_4xx
+        self.errors_5xx = errors_5xx
+        self.p50 = p50
+        self.p90 = p90
+        self.p95 = p95
+        self.p99 = p99
+
+    @classmethod
+    def from_metrics(cls, metrics: Dict[str, Any]) -> "MetricsRecord":
+        """Build a record from a raw metrics dict with "t", "e" and "l" keys."""
+        total_errors, error_4xx, error_5xx = aggregate_errors(metrics.get("e", {}))
+        latency = metrics.get("l", {})
+        return cls(
+            metrics.get("t", {}).get("qpm"),
+            total_errors,
+            error_4xx,
+            error_5xx,
+            latency.get("0.5"),
+            latency.get("0.9"),
+            latency.get("0.95"),
+            latency.get("0.99"),
+        )
+
+    def latency(self, percentile: str) -> Any:
+        """Latency for a percentile key as used by the API ("0.5", "0.9", "0.95", "0.99")."""
+        return getattr(self, _PERCENTILE_FIELDS[percentile], None) if percentile in _PERCENTILE_FIELDS else None
+
+
+_PERCENTILE_FIELDS = {"0.5": "p50", "0.9": "p90", "0.95": "p95", "0.99": "p99"}
+
+
+def value_or_na(value: Any) -> Any:
+    """Display helper: "N/A" for metrics the API did not report."""
+    return "N/A" if value is None else value
+
+
+class MetricsIndex:
+    """
+    O(1) metrics lookups over one overlays/v2 response.
+
+    Built once per response: the tickResponse for the version is flattened into one
+    MetricsRecord per item and category. Edge keys are normalized so that an in_in
+    edge can be looked up by its full ID ("in_in:A->B") or its display form ("A->B"), and
+    category names are normalized to the OVERLAY_CATEGORIES spelling.
+    """
+
+    __slots__ = ("version", "_categories", "_tables")
+
+    def __init__(self, version: str, categories: Dict[str, Dict[str, MetricsRecord]]):
+        self.version = version
+        self._categories = categories
+        # category -> MetricsTable, built on first use
+        self._tables: Dict[str, MetricsTable] = {}
+
+    def __getstate__(self):
+        # Tables are derived data; they are rebuilt on demand after unpickling
+        return self.version, self._categories
+
+    def __setstate__(self, state):
+        self.version, self._categories = state
+        self._tables = {}
+
+    @classmethod
+    def from_metrics_data(cls, metrics_data: Optional[Dict[str, Any]], version: str,
+                          request_version: Optional[str] = None) -> "MetricsIndex":
+        """
+        Build an index from a parsed overlays/v2 response for the given version.
+
+        Args:
+            request_version: Version sent upstream when it differs from version (a node-scoped
+                overlay such as "demo--595--<node>"); Nexus keys tickResponse by the base
+                version, but the scoped key is accepted as well
+        """
+        tick_response = (metrics_data or {}).get("tickResponse") or {}
+        version_data = tick_response.get(version)
+        if version_data is None and request_version is not None:
+            version_data = tick_response.get(request_version)
+        version_data = version_data or {}
+        categories = {}
+        for category, items in version_data.items():
+            if not isinstance(items, dict):
+                continue
+            category = _CATEGORY_ALIASES.get(category, category)
+            records = {}
+            for item_id, item in items.items():
+                if not isinstance(item, dict):
+                    continue
+                metrics = item.get("server_metrics", {}) if category == EDGES else item
+                if metrics:
+                    records[sys.intern(item_id)] = MetricsRecord.from_metrics(metrics)
+            if category == EDGES:
+                # Alias "in_in:A->B" as "A->B" unless that key exists in its own right
+                for item_id in list(records):
+                    if item_id.startswith("in_in:"):
+                        records.setdefault(item_id[6:], records[item_id])
+            categories.setdefault(category, {}).update(records)
+        return cls(version, categories)
+
+    def get(self, item_id: str, item_type: str) -> Optional[MetricsRecord]:
+        """
+        Get metrics for a system unit, interface or edge.
+
+        Args:
+            item_id: The ID of the item (edges may be given with or without the in_in: prefix)
+            item_type: Category as used by the API ('system_units', 'interfaces' or 'edges')
+        """
+        records = self._categories.get(item_type)
+        if records is None:
+            return None
+        return records.get(item_id)
+
+    def table(self, item_type: str) -> MetricsTable:
+        """
+        Columnar view of a category, for vectorized filtering and ranking (built once).
+
+        Edges are listed once, under their display form ("A->B"), even though they can
+        also be looked up by their in_in ID.
+        """
+        table = self._tables.get(item_type)
+        if table is None:
+            records = self._categories.get(item_type, {})
+            items = records.items()
+            if item_type == EDGES:
+                items = [(item_id, record) for item_id, record in items
+                         if not (item_id.startswith("in_in:") and records.get(item_id[6:]) is record)]
+            table = self._tables[item_type] = MetricsTable.from_records(items)
+        return table
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._categories.values())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Graph Refresher
+Background task that keeps recently active tenants warm.
+
+Every tool call marks its (graph-api base URL, ck-domain) pair as active. While the server
+runs, the refresher re-runs a warm-up callback for each active pair on a fixed interval, so
+the latest snapshot, its metrics overlay and the rendered directory are already cached
+when the next tool call arrives. Pairs nobody has used for idle_seconds stop being polled.
+
+The warm-up goes through the caches, so it only reaches upstream for entries that have
+expired. The default interval is the latest-snapshot TTL: a shorter one would find the
+snapshot still fresh on most rounds.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from graph_cache import SNAPSHOT_LATEST_TTL_SECONDS
+from graph_telemetry import REFRESH_SECONDS, REFRESH_TENANTS
+
+# Refresher configuration
+REFRESH_INTERVAL_SECONDS = float(os.getenv("CK_REFRESH_INTERVAL_SECONDS", str(SNAPSHOT_LATEST_TTL_SECONDS)))
+REFRESH_IDLE_SECONDS = float(os.getenv("CK_REFRESH_IDLE_SECONDS", "300"))
+REFRESH_MAX_TENANTS = int(os.getenv("CK_REFRESH_MAX_TENANTS", "32"))
+
+logger = logging.getLogger(__name__)
+
+Tenant = Tuple[str, Optional[str]]
+
+
+class BackgroundRefresher:
+    """
+    Periodically warms the caches of recently active tenants.
+
+    At most max_tenants pairs are tracked; touching one more drops the least recently used.
+    Not thread-safe: it is meant to be used from the server's event loop.
+    """
+
+    def __init__(self, warm: Callable[[str, Optional[str]], Awaitable[Any]],
+                 interval_seconds: float = REFRESH_INTERVAL_SECONDS,
+                 idle_seconds: float = REFRESH_IDLE_SECONDS, max_tenants: int = REFRESH_MAX_TENANTS):
+        """
+        Args:
+            warm: Coroutine function called with (base_url, domain) to refresh one tenant
+            interval_seconds: Delay between refresh rounds
+            idle_seconds: How long a tenant is refreshed after its last tool call
+            max_tenants: Maximum number of tenants tracked at once
+        """
+        self.warm = warm
+        self.interval_seconds = max(1.0, interval_seconds)
+        self.idle_seconds = idle_seconds
+        self.max_tenants = max(1, max_tenants)
+        # (base_url, domain) -> monotonic time of the last tool call, least recent first
+        self._last_used: "OrderedDict[Tenant, float]" = OrderedDict()
+        # (base_url, domain) -> outcome of its last refresh
+        self._last_refresh: Dict[Tenant, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, base_url: str, domain: Optional[str]):
+        """Mark a tenant as active."""
+        tenant = (base_url, domain)
+        self._last_used[tenant] = time.monotonic()
+        self._last_used.move_to_end(tenant)
+        while len(self._last_used) > self.max_tenants:
+            self._forget(next(iter(self._last_used)))
+
+    def _forget(self, tenant: Tenant):
+        self._last_used.pop(tenant, None)
+        self._last_refresh.pop(tenant, None)
+        logger.info(f"Stopped refreshing tenant {tenant[0]} / {tenant[1]}")
+
+    def evict_idle(self):
+        """Stop tracking tenants that have not been used for idle_seconds."""
+        cutoff = time.monotonic() - self.idle_seconds
+        for tenant, last_used in list(self._last_used.items()):
+            if last_used < cutoff:
+                self._forget(tenant)
+
+    async def refresh_all(self):
+        """Run one refresh round over every active tenant, concurrently."""
+        self.evict_idle()
+        REFRESH_TENANTS.set(len(self._last_used))
+        await asyncio.gather(*(self._refresh(*tenant) for tenant in list(self._last_used)))
+
+    async def _refresh(self, base_url: str, domain: Optional[str]):
+        started = time.perf_counter()
+        try:
+            await self.warm(base_url, domain)
+            result = "ok"
+        except Exception as e:
+            result = "error"
+            logger.warning(f"Background refresh of {base_url} / {domain} failed: {e}")
+        seconds = time.perf_counter() - started
+        REFRESH_SECONDS.observe(seconds, result=result)
+        if (base_url, domain) in self._last_used:
+            self._last_refresh[(base_url, domain)] = {"result": result, "at": datetime.now().isoformat(), "ms": round(seconds * 1000, 1)}
+
+    async def run(self):
+        """Refresh active tenants every interval_seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.refresh_all()
+
+    def start(self):
+        """Start the refresh loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        """Cancel the refresh loop and wait for it to finish."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Tracked tenants and their last refresh, for /health."""
+        now = time.monotonic()
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval_seconds,
+            "tenants": [
+                {
+                    "base_url": base_url, "domain": domain,
+                    "idle_seconds": round(now - last_used, 1),
+                    "last_refresh": self._last_refresh.get((base_url, domain))
+                }
+                for (base_url, domain), last_used in self._last_used.items()
+            ]
+        }
@@ -0,0 +1,826 @@
+#!/usr/bin/env python3
+"""
+Graph Render
+Markdown renderers for the graph analysis tool responses, shared by both MCP servers.
+
+Every renderer is a generator that yields the response in chunks (one per section or
+listed item), so rendering stays linear in the number of items and a transport can
+forward the chunks as they are produced. The render_* helpers join them into one string.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from graph_model import INTERFACES, SYSTEM_UNITS, MetricsIndex, MetricsRecord, value_or_na
+
+DEFAULT_TIME_RANGE_MINUTES = 30
+
+RELATIONSHIP_DISPLAY = {
+    "UPSTREAM": "📥 **UPSTREAM** (calls INTO this interface)",
+    "DOWNSTREAM": "📤 **DOWNSTREAM** (this interface calls OUT)",
+}
+RELATED_DISPLAY = "🔄 **RELATED** (part of this interface's call chain)"
+
+
+def format_aggregated_metrics(metrics_index: Optional[MetricsIndex], item_id: str, item_type: str) -> str:
+    """Format aggregated metrics for a system unit or interface."""
+    if not metrics_index:
+        return "No metrics available"
+
+    try:
+        metrics = metrics_index.get(item_id, item_type)
+        if not metrics:
+            return "No metrics available"
+
+        throughput = value_or_na(metrics.qpm)
+        p50 = value_or_na(metrics.p50)
+        p99 = value_or_na(metrics.p99)
+        return (f"QPM: {throughput}, Errors: {metrics.errors_total}% (4xx: {metrics.errors_4xx}%, "
+                f"5xx: {metrics.errors_5xx}%), Latency: p50={p50}ms, p99={p99}ms")
+    except Exception as e:
+        return f"Metrics error: {str(e)}"
+
+
+def format_edge_metrics(edge: Dict[str, Any], include_latency: bool, include_errors: bool) -> str:
+    """Format metrics for an edge of an interface analysis."""
+    try:
+        sync_type = edge["sync_type"]
+        metrics: Optional[MetricsRecord] = edge.get("metrics")
+
+        if not metrics:
+            return f"[{sync_type}] No metrics available"
+
+        # Format metrics based on what's requested; throughput is always included
+        parts = [f"[{sync_type}]", f"QPM: {value_or_na(metrics.qpm)}"]
+
+        if include_errors:
+            parts.append(f"Errors: {metrics.errors_total}% (4xx: {metrics.errors_4xx}%, 5xx: {metrics.errors_5xx}%)")
+
+        if include_latency:
+            p50 = value_or_na(metrics.p50)
+            p90 = value_or_na(metrics.p90)
+            p95 = value_or_na(metrics.p95)
+            p99 = value_or_na(metrics.p99)
+            parts.append(f"Latency: p50={p50}ms, p90={p90}ms, p95={p95}ms, p99={p99}ms")
+
+        return " | ".join(parts)
+
+    except Exception as e:
+        return f"[UNKNOWN] Metrics error: {str(e)}"
+
+
+def iter_systems_response(systems_data: Dict[str, Any], metrics_index: Optional[MetricsIndex] = None,
+                          window_minutes: int = DEFAULT_TIME_RANGE_MINUTES) -> Iterator[str]:
+    """
+    Render the systems overview for LLM interface selection with aggregated metrics.
+
+    Args:
+        systems_data: Result of get_systems_overview
+        metrics_index: Overlay metrics for the same version (None renders "No metrics available")
+        window_minutes: Metrics window shown in the header
+
+    Yields:
+        Markdown chunks
+    """
+    system_units = systems_data["system_units"]
+    interfaces = systems_data["interfaces"]
+    version = systems_data["version"]
+    timestamp = systems_data["timestamp"]
+
+    yield f"""
+# SYSTEM DIRECTORY WITH AGGREGATED METRICS
+
+## CRITICAL: Use Exact Names for Analysis
+
+- **Timestamp**: {timestamp}
+- **System Version**: `{version}` (REQUIRED for get_interface_details)
+- **Total System Units**: {len(system_units)}
+- **Total Interfaces**: {len(interfaces)}
+- **Metrics Time Window**: Last {window_minutes} minutes
+
+## UNDERSTANDING AGGREGATED METRICS
+
+**These are HIGH-LEVEL totals showing the BIG PICTURE:**
+
+- **Throughput (QPM)**: Total requests across ALL connections
+- **Latency**: Weighted average response time across ALL calls
+- **Errors**: Weighted average error rate across ALL interactions
+
+⚠️ **Important**: When you use get_interface_details, you'll see DIFFERENT numbers because that shows specific relationships only!
+
+## SYSTEM UNITS (Deployed Components)
+
+System units are actual deployed services, databases, and infrastructure. Metrics are aggregated across all interfaces in each system unit.
+
+"""
+
+    for i, unit in enumerate(system_units, 1):
+        yield f"{i:2d}. `{unit}`\n    📊 {format_aggregated_metrics(metrics_index, unit, SYSTEM_UNITS)}\n\n"
+
+    yield """
+## INTERFACES (APIs & Capabilities)
+
+**IMPORTANT**: Copy the exact interface name from this list for detailed analysis.
+Metrics show TOTAL performance across all callers and all calls to each interface.
+
+"""
+
+    for i, interface in enumerate(interfaces, 1):
+        yield f"{i:2d}. `{interface}`\n    📊 {format_aggregated_metrics(metrics_index, interface, INTERFACES)}\n\n"
+
+    yield f"""
+
+## NEXT STEP: SELECT AN INTERFACE FOR FOCUSED ANALYSIS
+
+To analyze specific relationships involving any interface:
+
+1. **Choose** any interface name from the list above
+2. **Copy** the exact name (case-sensitive)
+3. **Use** get_interface_details with:
+   - interface_id: `[exact name from list]`
+   - version: `{version}`
+
+Example:
+```
+get_interface_details(
+  interface_id="OrderService::POST::/orders",
+  version="{version}"
+)
+```
+
+This will show you the SPECIFIC relationships and how metrics break down by individual connections.
+Remember: The numbers in get_interface_details will be DIFFERENT because you're seeing focused data!
+    """
+
+
+def iter_interface_details_response(analysis_data: Dict[str, Any], include_latency: bool,
+                                    include_errors: bool) -> Iterator[str]:
+    """
+    Render the detailed interface analysis for LLM understanding.
+
+    Args:
+        analysis_data: Result of get_interface_analysis
+        include_latency: Include latency percentiles for each edge
+        include_errors: Include error rates for each edge
+
+    Yields:
+        Markdown chunks
+    """
+    interface_id = analysis_data["interface_id"]
+    version = analysis_data["version"]
+    time_range = analysis_data["time_range"]
+    edges = analysis_data["edges"]
+
+    yield f"""
+# FOCUSED INTERFACE ANALYSIS: {interface_id}
+
+⚠️ **CRITICAL UNDERSTANDING - PERSPECTIVE VIEW**:
+
+You are now looking at data FROM {interface_id}'S POINT OF VIEW. 
+
+**Why metrics here are DIFFERENT from get_systems_and_interfaces:**
+- **System Overview**: Showed TOTAL metrics across ALL relationships
+- **This Analysis**: Shows ONLY metrics for relationships involving {interface_id}
+
+**Example**: If Interface A gets 100 QPM from B and 200 QPM from C:
+- System overview showed: Interface A = 300 QPM total  
+- When analyzing Interface B: Shows Interface A = 100 QPM (only B→A portion)
+- When analyzing Interface C: Shows Interface A = 200 QPM (only C→A portion)
+
+**This is CORRECT and EXPECTED!** You're seeing focused relationship data, not system totals.
+
+## Analysis Parameters
+- **Focused Interface**: {interface_id}
+- **System Version**: {version}
+- **Time Range**: {time_range["start"]} to {time_range["end"]}
+- **Duration**: {time_range["duration_minutes"]:.0f} minutes
+- **Include Latency**: {include_latency}
+- **Include Errors**: {include_errors}
+
+## INTERFACE DEPENDENCIES & DATA FLOW FROM {interface_id}'S PERSPECTIVE
+
+This interface has **{len(edges)} direct relationships**. Each edge shows a specific communication path involving your chosen interface.
+
+### Understanding the Relationship Data:
+
+Each edge shows: `SourceInterface -> TargetInterface`
+- **[SYNC/ASYNC]**: Communication pattern for this specific connection
+- **Metrics**: Performance data for THIS relationship only (not system totals!)
+- **Direction**: Whether this is upstream (calls INTO {interface_id}) or downstream (calls FROM {interface_id})
+
+"""
+
+    if not edges:
+        yield """
+**No direct interface dependencies found.**
+
+This could mean:
+- This interface is a leaf node (doesn't call other interfaces)
+- This interface is an entry point (only receives calls)
+- The interface might be isolated or not currently active
+"""
+    else:
+        yield "### RELATIONSHIP EDGES WITH FOCUSED METRICS:\n\n"
+
+        for i, edge in enumerate(edges, 1):
+            relationship_display = RELATIONSHIP_DISPLAY.get(edge["relationship"], RELATED_DISPLAY)
+            edge_metrics = format_edge_metrics(edge, include_latency, include_errors)
+            yield f"""
+**{i}. {edge["edge_display"]}**
+   - Direction: {relationship_display}
+   - Performance: {edge_metrics}
+"""
+
+        yield """
+
+### PERFORMANCE ANALYSIS INSIGHTS:
+
+**How to Read These Metrics:**
+
+1. **[SYNC/ASYNC]**: Communication pattern
+   - SYNC: Request-response, blocking calls (REST, RPC)
+   - ASYNC: Event-driven, non-blocking (message queues, events)
+
+2. **QPM (Queries Per Minute)**: Volume of traffic on this communication path
+   - High QPM = Heavy usage, potential bottleneck
+   - Low QPM = Light usage or infrequent calls
+
+3. **Errors**: Failure rate for this specific communication
+   - 4xx errors: Client-side issues (bad requests, auth failures)
+   - 5xx errors: Server-side issues (crashes, timeouts)
+   - High errors indicate reliability problems
+
+4. **Latency Percentiles**: Response time distribution
+   - p50 (median): Typical response time
+   - p90/p95: Most users experience this or better
+   - p99: Worst-case performance (tail latency)
+   - Large gap between p50 and p99 indicates inconsistent performance
+
+**Debugging Workflow:**
+1. **High Latency Edges**: Look for p99 > 1000ms or large p50-p99 gaps
+2. **Error-Prone Edges**: Focus on edges with >1% error rates  
+3. **High Traffic Edges**: QPM > 1000 may be bottlenecks
+4. **Async vs Sync Issues**: ASYNC edges should have lower latency variance
+
+**System Health Indicators:**
+- ✅ Good: Low errors (<1%), consistent latency (p99 < 2x p50)
+- ⚠️  Warning: Moderate errors (1-5%), high tail latency (p99 > 5x p50)  
+- 🚨 Critical: High errors (>5%), extreme latency (p99 > 1000ms)
+"""
+
+    if "trend" in analysis_data:
+        yield from _iter_trend_section(analysis_data["trend"])
+
+    yield """
+
+## NEXT STEPS FOR DEEPER ANALYSIS
+
+To continue investigating:
+
+1. **Analyze Problematic Edges**: Pick any high-latency or error-prone edge and analyze its source/target interfaces
+2. **Historical Comparison**: Run this analysis with different time ranges to see trends
+3. **System-Wide Impact**: Check if this interface's issues affect other parts of the system
+4. **Root Cause Analysis**: Follow the dependency chain to find the ultimate source of problems
+
+Use `get_interface_details` on any interface mentioned in the edges above to continue your analysis.
+    """
+
+
+TREND_METRIC_DISPLAY = {"qpm": "QPM", "errors_total": "Errors", "p99": "p99 latency"}
+
+
+def _format_trend_value(value: Optional[float]) -> str:
+    return "N/A" if value is None else f"{value:g}"
+
+
+def _iter_trend_section(trend: Dict[str, Any]) -> Iterator[str]:
+    """Render the regression check of a trend-mode interface analysis."""
+    windows = trend["windows"]
+    flags = trend["flags"]
+    yield f"""
+## TREND: LATEST WINDOW VS THE {len(windows) - 1} BEFORE IT
+
+- **Windows**: {len(windows)} × {windows[-1]["duration_minutes"]:.0f} minutes, from {windows[0]["start"]} to {windows[-1]["end"]}
+- **Edges Compared**: {trend["edges_compared"]}
+- **Regressions Flagged**: {trend["flag_count"]}{f" (top {len(flags)} shown)" if len(flags) < trend["flag_count"] else ""}
+- **Rule**: latest value at |z| ≥ {trend["z_threshold"]:g} or ≥ {trend["ratio_threshold"]:g}× the mean of the earlier windows (QPM drops count too)
+
+"""
+    if not flags:
+        yield "**No edge deviates from its baseline in the latest window.**\n"
+        return
+
+    for i, flag in enumerate(flags, 1):
+        metric = TREND_METRIC_DISPLAY.get(flag["metric"], flag["metric"])
+        arrow = "▲" if flag["direction"] == "up" else "▼"
+        ratio = flag["ratio"]
+        if ratio is None:
+            ratio_text = ""
+        elif ratio == float("inf"):
+            ratio_text = ", new (baseline 0)"
+        else:
+            ratio_text = f", {ratio:.2f}×"
+        z_text = "" if flag["z_score"] is None else f", z = {flag['z_score']:.1f}"
+        since = flag["since_window"]
+        series = " → ".join(_format_trend_value(value) for value in flag["series"])
+        yield (f"{i}. `{flag['edge']}` {arrow} **{metric}**: {_format_trend_value(flag['baseline'])} → "
+               f"{_format_trend_value(flag['latest'])}{ratio_text}{z_text}\n"
+               f"   - Deviating since window {since + 1} of {len(windows)} (starting {windows[since]['start']})\n"
+               f"   - Per window, oldest first: {series}\n")
+
+
+def iter_interface_details_batch_response(batch_data: Dict[str, Any], include_latency: bool,
+                                          include_errors: bool) -> Iterator[str]:
+    """
+    Render a batch of interface analyses as one combined report.
+
+    Args:
+        batch_data: Result of AsyncGraphAPIClient.get_interfaces_analysis_batch
+        include_latency: Include latency percentiles for each edge
+        include_errors: Include error rates for each edge
+
+    Yields:
+        Markdown chunks
+    """
+    version = batch_data["version"]
+    time_range = batch_data["time_range"]
+    results = batch_data["results"]
+    failed = [result for result in results if result["error"] is not None]
+
+    yield f"""
+# BATCHED INTERFACE ANALYSIS ({len(results)} interfaces)
+
+⚠️ **PERSPECTIVE VIEW**: each section below shows ONLY the relationships involving that
+interface, so its metrics are a focused slice of the system totals from get_systems_and_interfaces.
+
+## Analysis Parameters
+- **System Version**: {version}
+- **Time Range**: {time_range["start"]} to {time_range["end"]}
+- **Duration**: {time_range["duration_minutes"]:.0f} minutes
+- **Include Latency**: {include_latency}
+- **Include Errors**: {include_errors}
+- **Analyzed**: {len(results) - len(failed)} succeeded, {len(failed)} failed
+
+## SUMMARY
+
+"""
+    for i, result in enumerate(results, 1):
+        analysis = result["analysis"]
+        if analysis is None:
+            yield f"{i}. `{result['interface_id']}`: ❌ failed (see below)\n"
+        else:
+            edges = analysis["edges"]
+            upstream = sum(1 for edge in edges if edge["relationship"] == "UPSTREAM")
+            downstream = sum(1 for edge in edges if edge["relationship"] == "DOWNSTREAM")
+            yield (f"{i}. `{result['interface_id']}`: {len(edges)} relationships "
+                   f"({upstream} upstream, {downstream} downstream)\n")
+
+    for i, result in enumerate(results, 1):
+        interface_id = result["interface_id"]
+        if result["analysis"] is None:
+            yield f"""
+
+## {i}. {interface_id}
+
+❌ **Error**: {result["error"]}
+
+Check that this is an interface ID (not a system unit) from get_systems_and_interfaces.
+"""
+            continue
+
+        edges = result["analysis"]["edges"]
+        yield f"\n\n## {i}. {interface_id}\n"
+        if not edges:
+            yield "\n**No direct interface dependencies found.**\n"
+        for j, edge in enumerate(edges, 1):
+            relationship_display = RELATIONSHIP_DISPLAY.get(edge["relationship"], RELATED_DISPLAY)
+            edge_metrics = format_edge_metrics(edge, include_latency, include_errors)
+            yield f"""
+**{i}.{j}. {edge["edge_display"]}**
+   - Direction: {relationship_display}
+   - Performance: {edge_metrics}
+"""
+
+    yield """
+
+## NEXT STEPS FOR DEEPER ANALYSIS
+
+- Use `get_interface_details` on a single interface for the full metric reading guide
+- Use `get_dependency_tree` or `get_critical_path` to follow a problematic edge beyond one hop
+    """
+
+
+def render_systems_response(systems_data: Dict[str, Any], metrics_index: Optional[MetricsIndex] = None,
+                            window_minutes: int = DEFAULT_TIME_RANGE_MINUTES) -> str:
+    """Render the systems overview into one string (see iter_systems_response)."""
+    return "".join(iter_systems_response(systems_data, metrics_index, window_minutes))
+
+
+def render_interface_details_response(analysis_data: Dict[str, Any], include_latency: bool,
+                                      include_errors: bool) -> str:
+    """Render the interface analysis into one string (see iter_interface_details_response)."""
+    return "".join(iter_interface_details_response(analysis_data, include_latency, include_errors))
+
+
+def render_interface_details_batch_response(batch_data: Dict[str, Any], include_latency: bool,
+                                            include_errors: bool) -> str:
+    """Render a batch of interface analyses into one string (see iter_interface_details_batch_response)."""
+    return "".join(iter_interface_details_batch_response(batch_data, include_latency, include_errors))
+
+
+def batch_chunks(chunks: Iterable[str], min_chars: int = 16 * 1024) -> Iterator[str]:
+    """
+    Coalesce small rendered chunks into pieces of at least min_chars characters.
+
+    Per-item chunks are tiny; a transport that writes one frame per chunk should batch them.
+    """
+    batch = []
+    size = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        size += len(chunk)
+        if size >= min_chars:
+            yield "".join(batch)
+            batch = []
+            size = 0
+    if batch:
+        yield "".join(batch)
+
+
+def _iter_tree_lines(tree_node: Dict[str, Any], indent: str) -> Iterator[str]:
+    for child in tree_node["children"]:
+        line = f"{indent}- `{child['node']}` — {format_edge_metrics(child, True, True)}"
+        if child["repeat"]:
+            line += " _(already expanded above)_"
+        yield line + "\n"
+        yield from _iter_tree_lines(child, indent + "  ")
+    if tree_node["unexpanded"]:
+        yield f"{indent}- … {tree_node['unexpanded']} more edge(s) not expanded\n"
+
+
+def iter_dependency_tree_response(tree_data: Dict[str, Any]) -> Iterator[str]:
+    """
+    Render k-hop dependency trees of an interface.
+
+    Args:
+        tree_data: Result of AsyncGraphAPIClient.get_dependency_tree
+
+    Yields:
+        Markdown chunks
+    """
+    interface_id = tree_data["interface_id"]
+    version = tree_data["version"]
+    requested_version = tree_data.get("requested_version")
+    time_range = tree_data["time_range"]
+
+    yield f"""
+# DEPENDENCY TREE: {interface_id}
+
+## Analysis Parameters
+- **Root Interface**: {interface_id}
+- **System Version**: {version}
+- **Direction**: {tree_data["direction"]}
+- **Depth**: {tree_data["depth"]} hops
+- **Time Range**: {time_range["start"]} to {time_range["end"]}
+"""
+    if requested_version and requested_version != version:
+        yield (f"\n⚠️ **Note**: Snapshot `{requested_version}` is no longer cached; "
+               f"the trees use the latest snapshot `{version}`.\n")
+
+    yield """
+Each line is one hop: the interface reached, then the metrics of the edge that leads to it
+from the line above (for UPSTREAM trees the edge points from the caller to the line above).
+Interfaces that appear more than once are expanded only at their first (shallowest) position.
+"""
+
+    for direction, root in tree_data["trees"].items():
+        if direction == "downstream":
+            title = f"DOWNSTREAM TREE (what {interface_id} calls)"
+        else:
+            title = f"UPSTREAM TREE (who calls {interface_id})"
+        yield f"\n## {title}\n\n**{root['node_count'] - 1} interfaces reached**\n\n- `{root['node']}`\n"
+        if not root["children"] and not root["unexpanded"]:
+            yield "  - _(no in_in edges in this direction)_\n"
+        yield from _iter_tree_lines(root, "  ")
+        if root["truncated"]:
+            yield "\n⚠️ The tree hit its node limit; some branches were not expanded.\n"
+
+    yield f"""
+
+## NEXT STEPS
+
+- Increase `depth` (up to 10) to follow longer call chains
+- Use `get_interface_details` with version `{version}` for a focused view of any interface above
+"""
+
+
+def render_dependency_tree_response(tree_data: Dict[str, Any]) -> str:
+    """Render dependency trees into one string (see iter_dependency_tree_response)."""
+    return "".join(iter_dependency_tree_response(tree_data))
+
+
+def _format_ms(value: float) -> str:
+    return f"{value:.1f}ms"
+
+
+def iter_critical_path_response(path_data: Dict[str, Any]) -> Iterator[str]:
+    """
+    Render critical-path (slowest call at every hop) call chains.
+
+    Args:
+        path_data: Result of AsyncGraphAPIClient.get_critical_path
+
+    Yields:
+        Markdown chunks
+    """
+    version = path_data["version"]
+    requested_version = path_data.get("requested_version")
+    percentile = path_data["percentile"]
+    time_range = path_data["time_range"]
+    paths = path_data["paths"]
+
+    if path_data["interface_id"]:
+        entry = f"`{path_data['interface_id']}`"
+    else:
+        entry = (f"all {path_data['entry_point_count']} External::INBOUND interfaces "
+                 f"(top {len(paths)} shown)")
+
+    yield f"""
+# CRITICAL PATH ANALYSIS ({percentile})
+
+## Analysis Parameters
+- **Entry Point**: {entry}
+- **System Version**: {version}
+- **Latency Percentile**: {percentile}
+- **Time Range**: {time_range["start"]} to {time_range["end"]}
+- **Graph Searched**: {path_data["nodes_visited"]} interfaces, {path_data["edges_considered"]} SYNC edges ({path_data["cycle_edges"]} cycle edges ignored)
+"""
+    if requested_version and requested_version != version:
+        yield (f"\n⚠️ **Note**: Snapshot `{requested_version}` is no longer cached; "
+               f"the paths use the latest snapshot `{version}`.\n")
+
+    yield f"""
+**How to read this**: each path follows SYNC in_in edges from the entry point and picks, at
+every hop, the slowest call by {percentile}. A hop's latency includes the calls nested below
+it, so the first hop's latency is the path's total, and "own" is the hop's latency minus the
+next hop's: the hop with the largest own latency is the most likely source of the slowness.
+"""
+
+    if not paths or not any(path["hops"] for path in paths):
+        yield "\n**No synchronous call chains found from the entry point(s).**\n"
+
+    for rank, path in enumerate(paths, 1):
+        hops = path["hops"]
+        if not hops:
+            continue
+        yield (f"\n## {rank}. `{path['root']}`\n\n**Total {percentile}: {_format_ms(path['total_latency'])}** "
+               f"over {len(hops)} hop(s)\n\n")
+
+        own = [hop["latency"] - (hops[i + 1]["latency"] if i + 1 < len(hops) else 0.0) for i, hop in enumerate(hops)]
+        bottleneck = max(range(len(hops)), key=lambda i: own[i])
+        for i, hop in enumerate(hops):
+            marker = " 🚨 **likely bottleneck**" if i == bottleneck and own[i] > 0 else ""
+            metrics_str = "no metrics" if hop["metrics"] is None else format_edge_metrics(hop, False, True)
+            yield (f"{i + 1}. `{hop['source']}` → `{hop['target']}`\n"
+                   f"   - {percentile}: {_format_ms(hop['latency'])} (own ≈ {_format_ms(max(own[i], 0.0))}){marker}\n"
+                   f"   - {metrics_str}\n")
+
+    yield f"""
+
+## NEXT STEPS
+
+- Use `get_interface_details` with version `{version}` on the bottleneck's target interface
+- Re-run with `percentile: "p50"` to compare typical latency against tail latency
+"""
+
+
+def render_critical_path_response(path_data: Dict[str, Any]) -> str:
+    """Render critical paths into one string (see iter_critical_path_response)."""
+    return "".join(iter_critical_path_response(path_data))
+
+
+def iter_blast_radius_response(blast_data: Dict[str, Any]) -> Iterator[str]:
+    """
+    Render the upstream impact of degraded interfaces.
+
+    Args:
+        blast_data: Result of AsyncGraphAPIClient.get_blast_radius
+
+    Yields:
+        Markdown chunks
+    """
+    version = blast_data["version"]
+    requested_version = blast_data.get("requested_version")
+    time_range = blast_data["time_range"]
+    targets = ", ".join(f"`{interface_id}`" for interface_id in blast_data["interface_ids"])
+    entry_points = blast_data["entry_points"]
+    direct_callers = blast_data["direct_callers"]
+
+    yield f"""
+# BLAST RADIUS ANALYSIS
+
+## Analysis Parameters
+- **Degraded Interface(s)**: {targets}
+- **System Version**: {version}
+- **Edges Followed**: {"SYNC in_in only" if blast_data["sync_only"] else "all in_in"}
+- **Time Range**: {time_range["start"]} to {time_range["end"]}
+
+## Impact Summary
+- **Affected Interfaces**: {blast_data["affected_count"]} (up to {blast_data["max_hops"]} hop(s) upstream)
+- **Affected Entry Points**: {blast_data["entry_point_count"]}
+- **Entry Traffic at Risk**: {blast_data["total_entry_qpm"]:.1f} QPM
+"""
+    if blast_data["missing_interface_ids"]:
+        missing = ", ".join(f"`{interface_id}`" for interface_id in blast_data["missing_interface_ids"])
+        yield f"\n⚠️ **Note**: {missing} not found in snapshot `{version}` and ignored.\n"
+    if requested_version and requested_version != version:
+        yield (f"\n⚠️ **Note**: Snapshot `{requested_version}` is no longer cached; "
+               f"the analysis uses the latest snapshot `{version}`.\n")
+
+    yield f"\n## AFFECTED ENTRY POINTS (top {len(entry_points)} by affected QPM)\n\n"
+    if not entry_points:
+        yield "**No External::INBOUND entry point reaches the degraded interface(s).**\n"
+    for rank, entry in enumerate(entry_points, 1):
+        yield (f"{rank}. `{entry['entry']}`\n"
+               f"   - Affected QPM: {entry['affected_qpm']:.1f} | Hops to target: {entry['hops']}\n")
+        for edge in entry["edges"]:
+            yield f"   - → `{edge['target']}` ({edge['sync_type']}, {edge['qpm']:.1f} QPM)\n"
+
+    yield (f"\n## DIRECT CALLERS (top {len(direct_callers)} of {blast_data['direct_caller_count']} "
+           f"by QPM)\n\n")
+    if not direct_callers:
+        yield "**No callers found.**\n"
+    for caller in direct_callers:
+        yield (f"- `{caller['caller']}` → `{caller['target']}` "
+               f"({caller['sync_type']}, {caller['qpm']:.1f} QPM)\n")
+
+    yield f"""
+
+## NEXT STEPS
+
+- Use `get_critical_path` on a top entry point to check whether the degraded interface is on its slowest chain
+- Use `get_interface_details` with version `{version}` on a direct caller for its full metrics
+"""
+
+
+def render_blast_radius_response(blast_data: Dict[str, Any]) -> str:
+    """Render a blast radius into one string (see iter_blast_radius_response)."""
+    return "".join(iter_blast_radius_response(blast_data))
+
+
+DIFF_METRIC_DISPLAY = {"qpm": "QPM", "errors_total": "Errors", "p99": "p99"}
+DIFF_SECTIONS = (("system_units", "System Units"), ("interfaces", "Interfaces"), ("edges", "in_in Edges"))
+
+
+def _format_metric_change(change: Dict[str, Optional[float]]) -> str:
+    before, after, delta = change["before"], change["after"], change["delta"]
+    text = f"{_format_trend_value(before)} → {_format_trend_value(after)}"
+    if delta:
+        text += f" ({delta:+g})"
+    return text
+
+
+def _format_diff_time(timestamp: Optional[str]) -> str:
+    return f"at {timestamp}" if timestamp else "(given by version; time unknown)"
+
+
+def iter_snapshot_diff_response(diff_data: Dict[str, Any]) -> Iterator[str]:
+    """
+    Render the changes between two snapshots.
+
+    Args:
+        diff_data: Result of AsyncGraphAPIClient.get_snapshot_diff
+
+    Yields:
+        Markdown chunks
+    """
+    before, after = diff_data["from"], diff_data["to"]
+    metrics_compared = diff_data["metrics_compared"]
+    if metrics_compared:
+        metrics_line = f"{diff_data['window_minutes']} minutes ending at each snapshot's time"
+    else:
+        metrics_line = "not compared (a snapshot given by version alone has no time to take a window at)"
+
+    yield f"""
+# SNAPSHOT DIFF
+
+## Compared Snapshots
+- **From**: `{before["version"]}` {_format_diff_time(before["timestamp"])}
+- **To**: `{after["version"]}` {_format_diff_time(after["timestamp"])}
+- **Metrics Window**: {metrics_line}
+
+## TOPOLOGY CHANGES
+"""
+    if before["version"] == after["version"]:
+        yield "\n⚠️ **Note**: Both times resolve to the same snapshot, so the topology is identical.\n\n"
+    for key, title in DIFF_SECTIONS:
+        section = diff_data[key]
+        yield (f"- **{title}**: +{section['added_count']} added, -{section['removed_count']} removed, "
+               f"{section['unchanged_count']} unchanged\n")
+
+    for key, title in DIFF_SECTIONS:
+        section = diff_data[key]
+        for change, label in (("added", "Added"), ("removed", "Removed")):
+            ids = section[change]
+            if not ids:
+                continue
+            total = section[f"{change}_count"]
+            yield f"\n### {label} {title} ({total})\n\n"
+            for item_id in ids:
+                yield f"- `{item_id}`\n"
+            if total > len(ids):
+                yield f"- … and {total - len(ids)} more\n"
+
+    changed_edges = diff_data["changed_edges"]
+    if not metrics_compared:
+        yield ("\n## METRIC CHANGES ON COMMON EDGES\n\n**Not compared**: pass a timestamp along with each "
+               "version (or timestamps instead of versions) to compare the metrics of the two snapshots.\n")
+    else:
+        yield (f"\n## METRIC CHANGES ON COMMON EDGES (top {len(changed_edges)} of "
+               f"{diff_data['changed_edge_count']}, largest relative change first)\n\n")
+        if not changed_edges:
+            yield "**No metric changed on the edges present in both snapshots.**\n"
+    for rank, change in enumerate(changed_edges, 1):
+        metrics = " | ".join(
+            f"{DIFF_METRIC_DISPLAY.get(field, field)} {_format_metric_change(values)}"
+            for field, values in change["metrics"].items()
+        )
+        yield f"{rank}. `{change['edge']}`\n   - {metrics}\n"
+
+    yield f"""
+
+## NEXT STEPS
+
+- Use `get_interface_details` with version `{after["version"]}` on an added or changed interface for its relationships
+- Use `get_blast_radius` on a removed or degraded interface to see which callers are affected
+"""
+
+
+def render_snapshot_diff_response(diff_data: Dict[str, Any]) -> str:
+    """Render a snapshot diff into one string (see iter_snapshot_diff_response)."""
+    return "".join(iter_snapshot_diff_response(diff_data))
+
+
+RANKING_COLUMNS = (("qpm", "QPM"), ("errors_total", "Err %"), ("errors_5xx", "5xx %"), ("p50", "p50"),
+                   ("p99", "p99"))
+
+
+def _format_filters(ranking_data: Dict[str, Any]) -> str:
+    filters = []
+    for name, bounds in (ranking_data.get("where") or {}).items():
+        if bounds.get("min") is not None:
+            filters.append(f"{name} ≥ {bounds['min']:g}")
+        if bounds.get("max") is not None:
+            filters.append(f"{name} ≤ {bounds['max']:g}")
+    if ranking_data.get("id_contains"):
+        filters.append(f"ID contains `{ranking_data['id_contains']}`")
+    return ", ".join(filters) or "none"
+
+
+def iter_metric_ranking_response(ranking_data: Dict[str, Any]) -> Iterator[str]:
+    """
+    Render an overlay ranked by one metric, as a table.
+
+    Args:
+        ranking_data: Result of AsyncGraphAPIClient.get_metric_ranking
+
+    Yields:
+        Markdown chunks
+    """
+    sort_by = ranking_data["sort_by"]
+    time_range = ranking_data["time_range"]
+    items = ranking_data["items"]
+    order = "highest" if ranking_data["descending"] else "lowest"
+
+    yield f"""
+# METRIC RANKING: {ranking_data["item_type"].upper()} BY {sort_by} ({order} first)
+
+## Analysis Parameters
+- **System Version**: {ranking_data["version"]}
+- **Time Range**: {time_range["start"]} to {time_range["end"]}
+- **Filters**: {_format_filters(ranking_data)}
+- **Matched**: {ranking_data["matched"]} of {ranking_data["total"]} {ranking_data["item_type"]} (top {len(items)} shown)
+
+"""
+    if not items:
+        yield "**No items match the filters.**\n"
+        return
+
+    columns = [(name, title) for name, title in RANKING_COLUMNS if name != sort_by]
+    yield f"| # | ID | **{sort_by}** | " + " | ".join(title for _, title in columns) + " |\n"
+    yield "|---|---|---|" + "---|" * len(columns) + "\n"
+    for rank, item in enumerate(items, 1):
+        values = " | ".join(_format_trend_value(item[name]) for name, _ in columns)
+        yield f"| {rank} | `{item['id']}` | **{_format_trend_value(item[sort_by])}** | {values} |\n"
+
+    yield f"""
+
+## NEXT STEPS
+
+- Use `get_interface_details` with version `{ranking_data["version"]}` on a ranked interface for its relationships
+- Narrow the ranking with `where` (e.g. {{"qpm": {{"min": 10}}}}) to skip low-traffic items
+"""
+
+
+def render_metric_ranking_response(ranking_data: Dict[str, Any]) -> str:
+    """Render a metric ranking into one string (see iter_metric_ranking_response)."""
+    return "".join(iter_metric_ranking_response(ranking_data))
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Graph Resilience
+Timeouts, retries and circuit breaking for the upstream graph API (Nexus).
+
+- Every endpoint class gets its own connect/read timeouts (graph-paths/all streams a much
+  larger body than a details/pinned lookup)
+- Idempotent GETs are retried a bounded number of times, with full-jitter exponential
+  backoff, on transport errors and 502/503/504
+- A circuit breaker per base URL fails calls fast once an upstream keeps failing, and
+  lets a single probe through after a cool-down
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import httpx
+
+# Timeouts (seconds); the read timeout bounds the wait for each chunk, not the whole body
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("CK_UPSTREAM_CONNECT_TIMEOUT_SECONDS", "5"))
+READ_TIMEOUT_SECONDS = {
+    "graph-paths/all": float(os.getenv("CK_GRAPH_READ_TIMEOUT_SECONDS", "60")),
+    "overlays/v2": float(os.getenv("CK_METRICS_READ_TIMEOUT_SECONDS", "30")),
+    "details/pinned": float(os.getenv("CK_DETAILS_READ_TIMEOUT_SECONDS", "30")),
+    "code-details-for-api": float(os.getenv("CK_CODE_DETAILS_READ_TIMEOUT_SECONDS", "15")),
+}
+DEFAULT_READ_TIMEOUT_SECONDS = 30.0
+
+# Retries of idempotent requests (attempts after the first one) and their backoff
+RETRY_ATTEMPTS = int(os.getenv("CK_UPSTREAM_RETRIES", "2"))
+RETRY_BACKOFF_SECONDS = float(os.getenv("CK_UPSTREAM_RETRY_BACKOFF_SECONDS", "0.2"))
+RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("CK_UPSTREAM_RETRY_BACKOFF_MAX_SECONDS", "2"))
+RETRYABLE_STATUS_CODES = frozenset({502, 503, 504})
+
+# Circuit breaker: consecutive failures that open it, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("CK_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("CK_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def timeout_for(endpoint: str) -> httpx.Timeout:
+    """httpx timeouts for an endpoint class (e.g. "overlays/v2")."""
+    read = READ_TIMEOUT_SECONDS.get(endpoint, DEFAULT_READ_TIMEOUT_SECONDS)
+    return httpx.Timeout(read, connect=CONNECT_TIMEOUT_SECONDS)
+
+
+def requests_timeout(endpoint: str) -> Tuple[float, float]:
+    """(connect, read) timeout tuple for the sync requests-based fetchers."""
+    return CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS.get(endpoint, DEFAULT_READ_TIMEOUT_SECONDS)
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error counts against the upstream's health (no response, or a 5xx)."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code >= 500
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an idempotent request that failed this way is worth another attempt."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number attempt + 1."""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_SECONDS * (2 ** attempt)))
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream base URL.
+
+    closed: calls go through; BREAKER_FAILURE_THRESHOLD consecutive failures open it
+    open: calls fail fast with CircuitOpenError until reset_seconds have passed
+    half_open: one probe call goes through (others still fail fast); its success closes
+        the breaker, its failure opens it again
+
+    Not thread-safe: it is meant to be used from the server's event loop.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    def before_call(self):
+        """
+        Claim permission for one call.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with its probe in flight
+        """
+        if self.state == OPEN:
+            remaining = self.opened_at + self.reset_seconds - self.clock()
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"Graph API at {self.name} is unavailable after {self.consecutive_failures} consecutive "
+                    f"failures; calls are paused for another {remaining:.0f}s"
+                )
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(f"Graph API at {self.name} is recovering; a probe request is in flight")
+            self._probing = True
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} consecutive failures")
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+    def release(self):
+        """Give up a claimed call without an outcome (e.g. it was cancelled)."""
+        self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State for /health."""
+        snapshot = {"state": self.state, "consecutive_failures": self.consecutive_failures}
+        if self.opened_at is not None:
+            opened_ago = self.clock() - self.opened_at
+            snapshot["opened_at"] = datetime.fromtimestamp(time.time() - opened_ago).isoformat()
+            if self.state == OPEN:
+                snapshot["retry_in_seconds"] = round(max(0.0, self.reset_seconds - opened_ago), 1)
+        return snapshot
+
+
+async def call_with_resilience(breaker: CircuitBreaker, endpoint: str, attempt: Callable[[], Awaitable[T]],
+                               idempotent: bool, sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep) -> T:
+    """
+    Run one upstream call through the breaker, retrying it if it is idempotent.
+
+    Args:
+        breaker: Breaker of the upstream's base URL
+        endpoint: Endpoint class, for logging
+        attempt: Zero-argument factory performing one attempt; it must raise for a failed
+            response (e.g. with raise_for_status) so the failure can be classified
+        idempotent: Whether the call may be retried (GETs)
+        sleep: Coroutine function waiting out the backoff delay
+
+    Raises:
+        CircuitOpenError: If the breaker refuses the call
+        Whatever the last attempt raised
+    """
+    attempts = 1 + (max(0, RETRY_ATTEMPTS) if idempotent else 0)
+    for number in range(attempts):
+        breaker.before_call()
+        try:
+            result = await attempt()
+        except Exception as e:
+            if is_upstream_failure(e):
+                breaker.record_failure()
+            else:
+                # The upstream answered (e.g. a 4xx or an unusable body), so it is reachable
+                breaker.record_success()
+            if number + 1 < attempts and is_retryable(e) and breaker.state != OPEN:
+                delay = backoff_delay(number)
+                logger.warning(f"{endpoint} request to {breaker.name} failed ({e!r}); retrying in {delay:.2f}s")
+                await sleep(delay)
+                continue
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Graph Scheduler
+Fair admission of upstream graph API calls across tenants.
+
+A tenant is one (graph-api base URL, ck-domain) pair. Every upstream call takes a slot
+before it is sent:
+- at most max_concurrency calls are in flight in total
+- at most per_tenant_limit of them belong to one tenant
+- when slots are short, freed slots go round-robin to the tenants that are waiting, so a
+  tenant bursting hundreds of calls only delays its own queue
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Hashable
+
+from graph_telemetry import UPSTREAM_QUEUE_SECONDS, UPSTREAM_QUEUED
+
+
+class TenantScheduler:
+    """
+    Round-robin scheduler of upstream call slots, with a per-tenant concurrency cap.
+
+    Calls of one tenant are admitted in arrival order. Not thread-safe: it is meant to be
+    used from the server's event loop.
+    """
+
+    def __init__(self, max_concurrency: int, per_tenant_limit: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_tenant_limit = max(1, per_tenant_limit)
+        self._in_flight = 0
+        self._active: Dict[Hashable, int] = {}
+        # Tenants with queued calls, in the order they are next served
+        self._waiting: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+
+    def _can_admit(self, tenant: Hashable) -> bool:
+        return self._in_flight < self.max_concurrency and self._active.get(tenant, 0) < self.per_tenant_limit
+
+    def _admit(self, tenant: Hashable):
+        self._in_flight += 1
+        self._active[tenant] = self._active.get(tenant, 0) + 1
+
+    @asynccontextmanager
+    async def slot(self, tenant: Hashable, domain: str = "") -> AsyncIterator[None]:
+        """
+        Hold one upstream call slot of a tenant for the duration of the with block.
+
+        Args:
+            tenant: Tenant key, e.g. (base_url, domain)
+            domain: Label for the queueing metrics
+        """
+        if tenant not in self._waiting and self._can_admit(tenant):
+            self._admit(tenant)
+        else:
+            await self._enqueue(tenant, domain)
+        try:
+            yield
+        finally:
+            self._release(tenant)
+
+    async def _enqueue(self, tenant: Hashable, domain: str):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(tenant, deque()).append(waiter)
+        UPSTREAM_QUEUED.inc(domain=domain)
+        started = time.perf_counter()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as the caller gave up; hand it on
+                self._release(tenant)
+            else:
+                self._discard(tenant, waiter)
+            raise
+        finally:
+            UPSTREAM_QUEUED.dec(domain=domain)
+            UPSTREAM_QUEUE_SECONDS.observe(time.perf_counter() - started, domain=domain)
+
+    def _discard(self, tenant: Hashable, waiter: asyncio.Future):
+        queue = self._waiting.get(tenant)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiting[tenant]
+
+    def _release(self, tenant: Hashable):
+        self._in_flight -= 1
+        remaining = self._active[tenant] - 1
+        if remaining:
+            self._active[tenant] = remaining
+        else:
+            del self._active[tenant]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to waiting tenants, one call per tenant per round."""
+        while self._in_flight < self.max_concurrency and self._waiting:
+            tenant = next((tenant for tenant in self._waiting if self._can_admit(tenant)), None)
+            if tenant is None:
+                return
+            queue = self._waiting[tenant]
+            waiter = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(tenant)
+            else:
+                del self._waiting[tenant]
+            if waiter.done():
+                continue
+            self._admit(tenant)
+            waiter.set_result(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """In-flight and queued calls per tenant, for /health."""
+        tenants = set(self._active) | set(self._waiting)
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "per_tenant_limit": self.per_tenant_limit,
+            "tenants": [
+                {
+                    "base_url": tenant[0], "domain": tenant[1],
+                    "in_flight": self._active.get(tenant, 0),
+                    "queued": len(self._waiting.get(tenant, ()))
+                }
+                for tenant in sorted(tenants)
+            ]
+        }
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Graph Store
+Persistent on-disk store for immutable graph API payloads.
+
+A snapshot version (e.g. "demo--595") never changes once Nexus has assigned it, and neither
+does the overlay of a closed metrics window, so both survive restarts here instead of being
+downloaded again:
+- parsed GraphSnapshot and MetricsIndex objects are pickled and zlib-compressed into one
+  SQLite database (WAL mode) under CK_SNAPSHOT_STORE_DIR
+- historical timestamps are mapped to versions through time-bucket pointers
+- entries are loaded lazily, on an in-memory cache miss
+- the total size of stored payloads is kept under a disk budget by evicting the least
+  recently used entries
+
+SQLite's file locking makes the store safe to share between uvicorn workers (and pods
+mounting the same volume): writes are single transactions, and a payload written twice by
+two workers is simply replaced by an identical one. The directory must only be writable by
+the server, since entries are unpickled when loaded.
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Optional, Set
+
+# Store configuration; the store is disabled unless a directory is configured
+SNAPSHOT_STORE_DIR = os.getenv("CK_SNAPSHOT_STORE_DIR", "")
+SNAPSHOT_STORE_MAX_BYTES = int(os.getenv("CK_SNAPSHOT_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+SNAPSHOT_STORE_BUSY_TIMEOUT_SECONDS = float(os.getenv("CK_SNAPSHOT_STORE_BUSY_TIMEOUT_SECONDS", "10"))
+
+STORE_FILENAME = "graph-store.sqlite3"
+# Bump when the pickled classes change incompatibly; entries of other formats are ignored
+STORE_FORMAT = 2
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    base_url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    version TEXT NOT NULL,
+    format INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (base_url, domain, version)
+);
+CREATE TABLE IF NOT EXISTS snapshot_pointers (
+    base_url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (base_url, domain, bucket)
+);
+CREATE TABLE IF NOT EXISTS overlays (
+    base_url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    version TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    format INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    response_size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (base_url, domain, version, start_time, end_time)
+);
+CREATE INDEX IF NOT EXISTS snapshots_last_used ON snapshots (last_used);
+CREATE INDEX IF NOT EXISTS overlays_last_used ON overlays (last_used);
+"""
+
+
+def _dumps(value: Any) -> bytes:
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def _loads(data: bytes) -> Any:
+    return pickle.loads(zlib.decompress(data))
+
+
+class SnapshotStore:
+    """
+    SQLite-backed store of snapshots and closed-window overlays.
+
+    The blocking methods run on a worker thread through the async wrappers (load_*, save_*),
+    so disk I/O, compression and pickling never block the event loop. A failing store only
+    logs: every caller falls back to the upstream API.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = SNAPSHOT_STORE_MAX_BYTES,
+                 busy_timeout_seconds: float = SNAPSHOT_STORE_BUSY_TIMEOUT_SECONDS):
+        """
+        Args:
+            directory: Directory holding the database (created, private to the user, if missing)
+            max_bytes: Budget for the stored (compressed) payloads
+            busy_timeout_seconds: How long to wait for another worker's write lock
+        """
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.path = os.path.join(directory, STORE_FILENAME)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=busy_timeout_seconds, check_same_thread=False,
+                                           isolation_level=None)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+        # Save tasks in flight, kept referenced until they finish
+        self._pending: Set[asyncio.Task] = set()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    # Blocking API
+
+    def get_snapshot(self, base_url: str, domain: str, version: str) -> Optional[Any]:
+        """Load a snapshot by version, or None if it is not stored."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM snapshots WHERE base_url = ? AND domain = ? AND version = ? AND format = ?",
+                (base_url, domain, version, STORE_FORMAT)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE snapshots SET last_used = ? WHERE base_url = ? AND domain = ? AND version = ?",
+                (time.time(), base_url, domain, version)
+            )
+        return _loads(row[0])
+
+    def get_snapshot_version(self, base_url: str, domain: str, bucket: int) -> Optional[str]:
+        """Version recorded for a historical time bucket, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT version FROM snapshot_pointers WHERE base_url = ? AND domain = ? AND bucket = ?",
+                (base_url, domain, bucket)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_snapshot(self, base_url: str, domain: str, version: str, snapshot: Any,
+                     bucket: Optional[int] = None):
+        """
+        Store a snapshot (unless its version is already stored) and, for a historical
+        timestamp, point its time bucket at the version.
+        """
+        with self._lock:
+            stored = self._connection.execute(
+                "SELECT 1 FROM snapshots WHERE base_url = ? AND domain = ? AND version = ? AND format = ?",
+                (base_url, domain, version, STORE_FORMAT)
+            ).fetchone()
+        data = None if stored else _dumps(snapshot)
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            if data is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (base_url, domain, version, STORE_FORMAT, data, len(data), time.time())
+                )
+            if bucket is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO snapshot_pointers VALUES (?, ?, ?, ?)",
+                    (base_url, domain, bucket, version)
+                )
+        if data is not None:
+            self.enforce_budget()
+
+    def get_overlay(self, base_url: str, domain: str, version: str, start_time: int,
+                    end_time: int) -> Optional[tuple]:
+        """Load a closed-window overlay as (metrics_index, response size), or None."""
+        key = (base_url, domain, version, start_time, end_time)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, response_size FROM overlays WHERE base_url = ? AND domain = ? AND version = ? "
+                "AND start_time = ? AND end_time = ? AND format = ?",
+                key + (STORE_FORMAT,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE overlays SET last_used = ? WHERE base_url = ? AND domain = ? AND version = ? "
+                "AND start_time = ? AND end_time = ?",
+                (time.time(),) + key
+            )
+        return _loads(row[0]), row[1]
+
+    def put_overlay(self, base_url: str, domain: str, version: str, start_time: int, end_time: int,
+                    metrics_index: Any, response_size: int):
+        """Store the overlay of a closed window."""
+        data = _dumps(metrics_index)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO overlays VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (base_url, domain, version, start_time, end_time, STORE_FORMAT, data, len(data), response_size,
+                 time.time())
+            )
+        self.enforce_budget()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT (SELECT COALESCE(SUM(size), 0) FROM snapshots) + (SELECT COALESCE(SUM(size), 0) FROM overlays)"
+            ).fetchone()[0]
+
+    def enforce_budget(self):
+        """Evict least recently used payloads (and dangling pointers) until within max_bytes."""
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            total = self._connection.execute(
+                "SELECT (SELECT COALESCE(SUM(size), 0) FROM snapshots) + (SELECT COALESCE(SUM(size), 0) FROM overlays)"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            entries = self._connection.execute(
+                "SELECT 'snapshots', rowid, size, last_used FROM snapshots "
+                "UNION ALL SELECT 'overlays', rowid, size, last_used FROM overlays ORDER BY last_used"
+            ).fetchall()
+            for table, rowid, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                self._connection.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+                total -= size
+            self._connection.execute(
+                "DELETE FROM snapshot_pointers WHERE NOT EXISTS (SELECT 1 FROM snapshots s WHERE "
+                "s.base_url = snapshot_pointers.base_url AND s.domain = snapshot_pointers.domain "
+                "AND s.version = snapshot_pointers.version)"
+            )
+        logger.info(f"Snapshot store evicted entries down to {total} bytes")
+
+    # Async API
+
+    async def load_snapshot(self, base_url: str, domain: str, version: Optional[str] = None,
+                            bucket: Optional[int] = None) -> Optional[Any]:
+        """Load a snapshot by version, or by historical time bucket; None on a miss or error."""
+        try:
+            if version is None:
+                version = await asyncio.to_thread(self.get_snapshot_version, base_url, domain, bucket)
+                if version is None:
+                    return None
+            return await asyncio.to_thread(self.get_snapshot, base_url, domain, version)
+        except Exception as e:
+            logger.warning(f"Snapshot store read failed: {e}")
+            return None
+
+    async def load_overlay(self, base_url: str, domain: str, version: str, start_time: int,
+                           end_time: int) -> Optional[tuple]:
+        """Load a closed-window overlay as (metrics_index, response size); None on a miss or error."""
+        try:
+            return await asyncio.to_thread(self.get_overlay, base_url, domain, version, start_time, end_time)
+        except Exception as e:
+            logger.warning(f"Snapshot store read failed: {e}")
+            return None
+
+    def save_snapshot(self, base_url: str, domain: str, version: str, snapshot: Any, bucket: Optional[int] = None):
+        """Store a snapshot in the background (see put_snapshot)."""
+        self._spawn(self.put_snapshot, base_url, domain, version, snapshot, bucket)
+
+    def save_overlay(self, base_url: str, domain: str, version: str, start_time: int, end_time: int,
+                     metrics_index: Any, response_size: int):
+        """Store a closed-window overlay in the background (see put_overlay)."""
+        self._spawn(self.put_overlay, base_url, domain, version, start_time, end_time, metrics_index,
+                    response_size)
+
+    def _spawn(self, function, *args):
+        async def run():
+            try:
+                await asyncio.to_thread(function, *args)
+            except Exception as e:
+                logger.warning(f"Snapshot store write failed: {e}")
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def flush(self):
+        """Wait for the background writes started so far."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+
+def open_default_store() -> Optional[SnapshotStore]:
+    """Open the store configured by CK_SNAPSHOT_STORE_DIR, or None if it is unset or unusable."""
+    if not SNAPSHOT_STORE_DIR:
+        return None
+    try:
+        return SnapshotStore(SNAPSHOT_STORE_DIR)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Snapshot store at {SNAPSHOT_STORE_DIR} is disabled: {e}")
+        return None
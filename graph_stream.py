@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Graph Stream
+Incremental parser that builds a GraphSnapshot from a streamed graph-paths/all response.
+
+response.json() keeps the raw body, its decoded text and the full nested dict tree alive
+at the same time. This parser consumes the body chunk by chunk instead, materializes only
+the sections a snapshot needs (version, baseTimelineGraph node/edge lists and the
+sourceId/targetId/kind of lookupData.edges) and skips everything else without building it.
+"""
+
+import codecs
+import json
+import re
+import sys
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional
+
+from graph_model import GraphSnapshot
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING_SPECIAL = re.compile(r'["\\]')
+# String contents that need validating (escapes, control characters), and valid contents
+_STRING_CHECK = re.compile(r"[\\\x00-\x1f]")
+_STRING_BODY = re.compile(r'(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*')
+_SCALAR_END = re.compile(r"[,\]} \t\n\r]")
+# Literals and numbers, as accepted by json.loads (NaN and Infinity included)
+_SCALAR = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?|true|false|null|NaN|-?Infinity")
+_MEMBER_KEY = re.compile(r'"((?:[^"\\]|\\.)*)"[ \t\n\r]*:[ \t\n\r]*', re.DOTALL)
+# The decoder's scanner reports an incomplete value with StopIteration, which (unlike
+# raw_decode's JSONDecodeError) does not count line numbers over the whole buffer
+_scan = json.JSONDecoder().scan_once
+
+# Consumed text is dropped from the buffer once this many characters have piled up
+_COMPACT_CHARS = 64 * 1024
+
+# baseTimelineGraph lists that make up a snapshot
+_TIMELINE_SECTIONS = ("systemunits", "interfaces", "subsystems", "edges")
+
+# lookupData.edges fields used by GraphSnapshot
+_EDGE_METADATA_FIELDS = ("kind", "sourceId", "targetId")
+
+# A parse step: a generator that yields whenever it needs more input
+Step = Generator[None, None, Any]
+
+
+class _Scanner:
+    """
+    Resumable JSON scanner over a growing text buffer.
+
+    Every reading method is a generator that yields when the buffer runs out and is resumed
+    once more text has been appended. Offsets are never held across a yield except through
+    pos and the anchors (starts of values being captured), which are rebased whenever
+    consumed text is dropped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.anchors: List[int] = []
+        self.eof = False
+
+    def append(self, text: str):
+        keep = min(self.pos, self.anchors[0]) if self.anchors else self.pos
+        if keep >= _COMPACT_CHARS:
+            self.buffer = self.buffer[keep:]
+            self.pos -= keep
+            self.anchors = [anchor - keep for anchor in self.anchors]
+        self.buffer += text
+
+    def _capture(self, step: Callable[[], Step]) -> Step:
+        # Run step and return the raw text it consumed
+        self.anchors.append(self.pos)
+        try:
+            yield from step()
+            return self.buffer[self.anchors[-1]:self.pos]
+        finally:
+            self.anchors.pop()
+
+    def _wait(self) -> Step:
+        if self.eof:
+            raise ValueError("Unexpected end of JSON input")
+        yield
+
+    def peek(self) -> Step:
+        """Skip whitespace and return the next character without consuming it."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            yield from self._wait()
+
+    def expect(self, char: str) -> Step:
+        found = yield from self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r}")
+        self.pos += 1
+
+    def _skip_string(self) -> Step:
+        # buffer[pos] is the opening quote; offset is relative to pos so it survives compaction
+        offset = 1
+        while True:
+            match = _STRING_SPECIAL.search(self.buffer, self.pos + offset)
+            if match is None:
+                offset = len(self.buffer) - self.pos
+                yield from self._wait()
+            elif match.group() == '"':
+                self._check_string(self.pos + 1, match.start())
+                self.pos = match.end()
+                return
+            elif match.end() < len(self.buffer):
+                # Step over the escaped character
+                offset = match.end() + 1 - self.pos
+            else:
+                offset = match.start() - self.pos
+                yield from self._wait()
+
+    def _check_string(self, start: int, end: int):
+        # Validate the contents of a skipped string, between its quotes
+        if _STRING_CHECK.search(self.buffer, start, end) and not _STRING_BODY.fullmatch(self.buffer, start, end):
+            raise ValueError(f"Invalid JSON string: {self.buffer[start:end][:40]!r}")
+
+    def _skip_scalar(self) -> Step:
+        # pos stays at the start of the scalar until its end is buffered
+        while True:
+            match = _SCALAR_END.search(self.buffer, self.pos)
+            if match is not None:
+                end = match.start()
+                break
+            if self.eof:
+                end = len(self.buffer)
+                break
+            yield
+        if not _SCALAR.fullmatch(self.buffer, self.pos, end):
+            raise ValueError(f"Invalid JSON value: {self.buffer[self.pos:end][:20]!r}")
+        self.pos = end
+
+    def _try_decode(self) -> Any:
+        # The C decoder steps over a container in one go when it is entirely buffered;
+        # it raises ValueError when the container is cut off by the end of the buffer
+        try:
+            value, self.pos = _scan(self.buffer, self.pos)
+        except StopIteration as e:
+            raise ValueError("Incomplete JSON value") from e
+        return value
+
+    def _skip_buffered_members(self, close: str) -> bool:
+        # Step over every container member that is entirely buffered, starting at pos (the
+        # start of a member). Returns True once the closing bracket has been consumed, False
+        # with pos at the first member that is cut off by the end of the buffer (or malformed).
+        buffer = self.buffer
+        pos = _WHITESPACE.match(buffer, self.pos).end()
+        while True:
+            try:
+                if close == "}":
+                    match = _MEMBER_KEY.match(buffer, pos)
+                    if match is None:
+                        return False
+                    self._check_string(*match.span(1))
+                    pos = match.end()
+                _, pos = _scan(buffer, pos)
+                pos = _WHITESPACE.match(buffer, pos).end()
+                char = buffer[pos]
+            except (StopIteration, ValueError, IndexError):
+                return False
+            if char == close:
+                self.pos = pos + 1
+                return True
+            if char != ",":
+                return False
+            pos = _WHITESPACE.match(buffer, pos + 1).end()
+            self.pos = pos
+
+    def _skip_container(self, close: str) -> Step:
+        # pos is at the opening bracket
+        self.pos += 1
+        if (yield from self.peek()) == close:
+            self.pos += 1
+            return
+        while True:
+            if self._skip_buffered_members(close):
+                return
+            if close == "}":
+                yield from self.string()
+                yield from self.expect(":")
+            yield from self.skip()
+            char = yield from self.peek()
+            self.pos += 1
+            if char == close:
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or {close!r} but found {char!r}")
+
+    def skip(self) -> Step:
+        """Consume the next value without materializing more than one buffered member at a time."""
+        char = yield from self.peek()
+        if char == '"':
+            yield from self._skip_string()
+        elif char in "{[":
+            try:
+                self._try_decode()
+            except ValueError:
+                yield from self._skip_container("}" if char == "{" else "]")
+        else:
+            yield from self._skip_scalar()
+
+    def value(self) -> Step:
+        """Consume and decode the next value."""
+        char = yield from self.peek()
+        if char in '"[{':
+            try:
+                return self._try_decode()
+            except ValueError:
+                pass
+        raw = yield from self._capture(self.skip)
+        return json.loads(raw)
+
+    def string(self) -> Step:
+        """Consume and decode the next value, which must be a string."""
+        char = yield from self.peek()
+        if char != '"':
+            raise ValueError(f"Expected a string but found {char!r}")
+        raw = yield from self._capture(self._skip_string)
+        return raw[1:-1] if "\\" not in raw else json.loads(raw)
+
+    def object(self, on_member: Callable[[str], Step]) -> Step:
+        """Consume an object, handing each key to on_member, which must consume its value."""
+        yield from self.expect("{")
+        if (yield from self.peek()) == "}":
+            self.pos += 1
+            return
+        while True:
+            key = yield from self.string()
+            yield from self.expect(":")
+            yield from on_member(key)
+            char = yield from self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or '}}' but found {char!r}")
+
+    def array(self, on_element: Callable[[], Step]) -> Step:
+        """Consume an array, calling on_element once per element to consume it."""
+        yield from self.expect("[")
+        if (yield from self.peek()) == "]":
+            self.pos += 1
+            return
+        while True:
+            yield from on_element()
+            char = yield from self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' but found {char!r}")
+
+    def end(self) -> Step:
+        """Consume trailing whitespace and fail on anything else."""
+        while not self.eof:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                break
+            yield
+        self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+        if self.pos < len(self.buffer):
+            raise ValueError(f"Extra data after JSON value: {self.buffer[self.pos:self.pos + 20]!r}")
+
+
+class GraphSnapshotParser:
+    """
+    Build a GraphSnapshot from a graph-paths/all body delivered in chunks.
+
+    Usage:
+        parser = GraphSnapshotParser()
+        for chunk in response.iter_bytes():
+            parser.feed(chunk)
+        graph = parser.close()
+
+    Raises ValueError (from feed or close) if the body is not valid JSON or not an object.
+    """
+
+    def __init__(self):
+        self.version = "unknown"
+        self.sections: Dict[str, List[str]] = {section: [] for section in _TIMELINE_SECTIONS}
+        self.edge_metadata: Dict[str, Dict[str, Any]] = {}
+        self.bytes_received = 0
+        self.empty = True
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._scanner = _Scanner()
+        self._steps = self._parse()
+        next(self._steps)
+
+    def feed(self, chunk: bytes):
+        """Parse as much of the response as the chunk allows."""
+        self.bytes_received += len(chunk)
+        self._push(self._decoder.decode(chunk))
+
+    def close(self) -> GraphSnapshot:
+        """Finish parsing and build the snapshot."""
+        self._scanner.eof = True
+        self._push(self._decoder.decode(b"", True))
+        if self._steps is not None:
+            raise ValueError("Unexpected end of JSON input")
+
+        return GraphSnapshot.from_sections(
+            self.version,
+            self.sections["systemunits"],
+            self.sections["interfaces"],
+            self.sections["subsystems"],
+            self.sections["edges"],
+            self.edge_metadata,
+        )
+
+    def _push(self, text: str):
+        if self.empty and text.strip():
+            self.empty = False
+        if self._steps is None:
+            if text.strip():
+                raise ValueError(f"Extra data after JSON value: {text.strip()[:20]!r}")
+            return
+        self._scanner.append(text)
+        try:
+            self._steps.send(None)
+        except StopIteration:
+            self._steps = None
+
+    def _parse(self) -> Step:
+        scanner = self._scanner
+        # Wait for the first chunk so an empty body is reported by the caller, not as a JSON error
+        yield
+        while not scanner.eof and not scanner.buffer.strip():
+            yield
+        if scanner.buffer.strip():
+            yield from scanner.object(self._top_level_member)
+            yield from scanner.end()
+
+    def _top_level_member(self, key: str) -> Step:
+        scanner = self._scanner
+        if key == "version":
+            self.version = yield from scanner.value()
+        elif key == "baseTimelineGraph":
+            yield from scanner.object(self._timeline_member)
+        elif key == "lookupData":
+            yield from scanner.object(self._lookup_member)
+        else:
+            yield from scanner.skip()
+
+    def _timeline_member(self, key: str) -> Step:
+        scanner = self._scanner
+        section = self.sections.get(key)
+        if section is None:
+            yield from scanner.skip()
+            return
+
+        def element() -> Step:
+            section.append(sys.intern((yield from scanner.string())))
+
+        yield from scanner.array(element)
+
+    def _lookup_member(self, key: str) -> Step:
+        scanner = self._scanner
+        if key != "edges":
+            yield from scanner.skip()
+            return
+
+        def edge(edge_id: str) -> Step:
+            metadata = yield from scanner.value()
+            if isinstance(metadata, dict):
+                self.edge_metadata[edge_id] = {
+                    field: metadata.get(field) for field in _EDGE_METADATA_FIELDS if field in metadata
+                }
+
+        yield from scanner.object(edge)
+
+
+def parse_graph_snapshot(chunks: Iterable[bytes]) -> Optional[GraphSnapshot]:
+    """
+    Build a GraphSnapshot from an iterable of response chunks.
+
+    Returns:
+        The snapshot, or None if the body was empty (or whitespace only)
+    """
+    parser = GraphSnapshotParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    graph = parser.close()
+    return None if parser.empty else graph
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Graph Telemetry
+Process-local counters, gauges and histograms exported in the Prometheus text format, and
+per-request phase timings.
+
+Only what the remote MCP server needs is implemented: label values are passed as keyword
+arguments, every series of a metric uses the same label names, and render() produces the
+text served on /metrics. Metrics are registered in REGISTRY when they are created.
+
+The phase timings of the request being served live in the request_timings context
+variable, so concurrent fetches started by a request add to that request's breakdown.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds of the default histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds of the size histogram buckets, in bytes (or characters)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """Base class: a named family of series keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _labels(self, key: LabelValues, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}\n"
+        yield f"# TYPE {self.name} {self.kind}\n"
+        yield from self.samples()
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Mirror a count that is kept elsewhere (it must never decrease)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._labels(key)} {_format_value(value)}\n"
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._labels(key)} {_format_value(value)}\n"
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional["Registry"] = None):
+        super().__init__(name, documentation, label_names, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts (not cumulative), sum]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * len(self.buckets), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock seconds spent in the with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{self._labels(key, le)} {cumulative}\n"
+            yield f"{self.name}_sum{self._labels(key)} {_format_value(total)}\n"
+            yield f"{self.name}_count{self._labels(key)} {cumulative}\n"
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text exposition format."""
+        return "".join(line for metric in self._metrics.values() for line in metric.render())
+
+
+REGISTRY = Registry()
+
+# Upstream Nexus calls, labelled by endpoint ("graph-paths/all", "details/pinned", "overlays/v2",
+# "code-details-for-api"), domain and HTTP status ("error" / "cancelled" when no response arrived)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "ck_upstream_request_seconds", "Upstream graph API request duration, including reading the body.",
+    ("endpoint", "domain", "status")
+)
+UPSTREAM_RESPONSE_BYTES = Histogram(
+    "ck_upstream_response_bytes", "Upstream graph API response body size.",
+    ("endpoint", "domain"), buckets=SIZE_BUCKETS
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "ck_upstream_requests_in_flight", "Upstream graph API requests waiting for a response.", ("endpoint",)
+)
+# Decoding and indexing of an upstream response. graph-paths/all is decoded while it streams;
+# that time is reported here and left out of its ck_upstream_request_seconds
+UPSTREAM_PARSE_SECONDS = Histogram(
+    "ck_upstream_parse_seconds", "Time spent decoding (JSON) and indexing an upstream response.",
+    ("endpoint", "stage")
+)
+# Waiting for a concurrency slot before an upstream call is sent (see graph_scheduler)
+UPSTREAM_QUEUE_SECONDS = Histogram(
+    "ck_upstream_queue_seconds", "Time an upstream call waited for a tenant concurrency slot.", ("domain",)
+)
+UPSTREAM_QUEUED = Gauge(
+    "ck_upstream_requests_queued", "Upstream calls waiting for a tenant concurrency slot.", ("domain",)
+)
+
+# MCP tool calls, labelled by tool name and outcome ("ok" or "error")
+TOOL_CALL_SECONDS = Histogram(
+    "ck_tool_call_seconds", "End-to-end tools/call duration.", ("tool", "status")
+)
+TOOL_RENDER_SECONDS = Histogram(
+    "ck_tool_render_seconds", "Time spent rendering a tool's markdown response.", ("tool",)
+)
+TOOL_RESPONSE_CHARS = Histogram(
+    "ck_tool_response_chars", "Size of a tool's markdown response in characters.", ("tool",), buckets=SIZE_BUCKETS
+)
+TOOL_CALLS_IN_FLIGHT = Gauge(
+    "ck_tool_calls_in_flight", "tools/call requests being served.", ()
+)
+
+# Cache state, refreshed from the caches when /metrics is scraped
+CACHE_LOOKUPS = Counter(
+    "ck_cache_lookups_total", "Cache lookups by outcome (hit or miss).", ("cache", "result")
+)
+CACHE_ENTRIES = Gauge(
+    "ck_cache_entries", "Entries held by a cache.", ("cache",)
+)
+CACHE_HIT_RATIO = Gauge(
+    "ck_cache_hit_ratio", "Hits over lookups since startup.", ("cache",)
+)
+
+
+# Background refresher (see graph_refresher), labelled by outcome ("ok" or "error")
+REFRESH_SECONDS = Histogram(
+    "ck_refresh_seconds", "Duration of one tenant's background cache refresh.", ("result",)
+)
+REFRESH_TENANTS = Gauge(
+    "ck_refresh_tenants", "Tenants kept warm by the background refresher.", ()
+)
+
+# Phases of a request's timing breakdown, in the order they are reported
+PHASES = ("upstream_wait", "decode", "index", "format", "serialize")
+
+
+class RequestTimings:
+    """
+    Timing breakdown of one request.
+
+    Phases are summed over everything the request did, so concurrent upstream calls can add
+    up to more upstream_wait than the request's wall-clock time. A child breakdown (e.g. one
+    tool call of a JSON-RPC batch) also adds everything it records to its parent.
+    """
+
+    def __init__(self, parent: Optional["RequestTimings"] = None):
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.bytes_received = 0
+        self.upstream_calls = 0
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        if self.parent is not None:
+            self.parent.add(phase, seconds)
+
+    def add_upstream(self, size: Optional[int]):
+        self.upstream_calls += 1
+        self.bytes_received += size or 0
+        if self.parent is not None:
+            self.parent.add_upstream(size)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Breakdown in milliseconds, e.g. for a response's _meta field or a log line."""
+        order = {phase: i for i, phase in enumerate(PHASES)}
+        phases = sorted(self.phases.items(), key=lambda item: order.get(item[0], len(PHASES)))
+        return {
+            "total_ms": round(self.elapsed() * 1000, 1),
+            "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in phases},
+            "bytes_received": self.bytes_received,
+            "upstream_calls": self.upstream_calls,
+        }
+
+    def server_timing(self) -> str:
+        """Breakdown as a Server-Timing header value."""
+        entries = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_phase(phase: str, seconds: float):
+    """Add time to a phase of the current request's breakdown, if one is being recorded."""
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+@contextmanager
+def span(phase: str, histogram: Optional[Histogram] = None, **labels) -> Iterator[None]:
+    """Time the with block as a phase of the current request (and in histogram, if given)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record_phase(phase, elapsed)
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+
+
+def record_parse(endpoint: str, stage: str, seconds: float):
+    """Record decode or index time measured by the caller (e.g. summed over streamed chunks)."""
+    UPSTREAM_PARSE_SECONDS.observe(seconds, endpoint=endpoint, stage=stage)
+    record_phase(stage, seconds)
+
+
+def parse_span(endpoint: str, stage: str):
+    """Time the with block as the decode or index stage of an upstream response."""
+    return span(stage, UPSTREAM_PARSE_SECONDS, endpoint=endpoint, stage=stage)
+
+
+class TrackedCall:
+    """Outcome of a tracked call, filled in by the code inside track_upstream / track_tool_call."""
+
+    __slots__ = ("status", "size", "local_seconds")
+
+    def __init__(self, status: Any = None):
+        self.status = status
+        self.size: Optional[int] = None
+        # Time spent on this side while the call was open (e.g. decoding streamed chunks)
+        self.local_seconds = 0.0
+
+
+@contextmanager
+def track_upstream(endpoint: str, domain: str) -> Iterator[TrackedCall]:
+    """
+    Time an upstream request.
+
+    Set call.status once the response arrives and call.size once its body has been read;
+    a request that fails before a status is known is recorded with status "error" (or
+    "cancelled" when a sibling request's failure or a client disconnect cancelled it).
+    Time added to call.local_seconds is not counted as waiting for the upstream.
+
+    Usage:
+        with track_upstream("overlays/v2", domain) as call:
+            response = await client.get(...)
+            call.status = response.status_code
+            call.size = len(response.content)
+    """
+    call = TrackedCall()
+    start = time.perf_counter()
+    UPSTREAM_IN_FLIGHT.inc(endpoint=endpoint)
+    try:
+        yield call
+    except asyncio.CancelledError:
+        if call.status is None:
+            call.status = "cancelled"
+        raise
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(endpoint=endpoint)
+        status = "error" if call.status is None else call.status
+        waited = time.perf_counter() - start - call.local_seconds
+        UPSTREAM_REQUEST_SECONDS.observe(waited, endpoint=endpoint, domain=domain, status=status)
+        if call.size is not None:
+            UPSTREAM_RESPONSE_BYTES.observe(call.size, endpoint=endpoint, domain=domain)
+        record_phase("upstream_wait", waited)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.add_upstream(call.size)
+
+
+@contextmanager
+def track_tool_call(tool: str) -> Iterator[TrackedCall]:
+    """
+    Time a tools/call request.
+
+    The call is recorded with status "ok" unless call.status is changed (or the block
+    raises); call.size, when set, is the size of the response text in characters.
+    """
+    call = TrackedCall("ok")
+    start = time.perf_counter()
+    TOOL_CALLS_IN_FLIGHT.inc()
+    try:
+        yield call
+    except BaseException:
+        call.status = "error"
+        raise
+    finally:
+        TOOL_CALLS_IN_FLIGHT.dec()
+        TOOL_CALL_SECONDS.observe(time.perf_counter() - start, tool=tool, status=call.status)
+        if call.size is not None:
+            TOOL_RESPONSE_CHARS.observe(call.size, tool=tool)
+
+
+def record_cache(cache: str, cache_obj: Any):
+    """Export the size and hit/miss counts of a SnapshotCache, MetricsCache or RenderedCache."""
+    hits, misses = cache_obj.hits, cache_obj.misses
+    CACHE_ENTRIES.set(len(cache_obj), cache=cache)
+    CACHE_LOOKUPS.set_total(hits, cache=cache, result="hit")
+    CACHE_LOOKUPS.set_total(misses, cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(hits / (hits + misses) if hits + misses else 0.0, cache=cache)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Graph Trend
+Regression detection over consecutive overlay windows of one version.
+
+Each edge's metrics are stacked into one NumPy array of shape (metrics, edges, windows);
+the latest window is compared with the baseline formed by the earlier ones for every edge
+and metric in a single vectorized pass.
+"""
+
+import math
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from graph_model import EDGES, MetricsIndex
+
+DEFAULT_TREND_WINDOWS = 6
+MAX_TREND_WINDOWS = int(os.getenv("CK_MAX_TREND_WINDOWS", "12"))
+DEFAULT_TREND_TOP = 20
+
+# A latest value is flagged when its z-score against the baseline reaches Z_THRESHOLD, or
+# when it is at least RATIO_THRESHOLD times the baseline mean (or 1 / RATIO_THRESHOLD of it
+# for a traffic drop), and it moved by at least the metric's minimum change
+TREND_Z_THRESHOLD = float(os.getenv("CK_TREND_Z_THRESHOLD", "3"))
+TREND_RATIO_THRESHOLD = float(os.getenv("CK_TREND_RATIO_THRESHOLD", "2"))
+
+# MetricsRecord field -> (minimum absolute change, whether a drop is also a regression)
+TREND_METRICS = {
+    "qpm": (1.0, True),
+    "errors_total": (1.0, False),
+    "p99": (5.0, False),
+}
+
+
+def _as_float(value: Any) -> float:
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def stack_metrics(edge_ids: Sequence[str], windows: Sequence[MetricsIndex],
+                  fields: Sequence[str] = tuple(TREND_METRICS)) -> np.ndarray:
+    """
+    Stack per-window edge metrics into an array of shape (fields, edges, windows).
+
+    Values the overlay did not report are NaN.
+    """
+    values = np.full((len(fields), len(edge_ids), len(windows)), np.nan)
+    for w, metrics_index in enumerate(windows):
+        for e, edge_id in enumerate(edge_ids):
+            record = metrics_index.get(edge_id, EDGES)
+            if record is not None:
+                for f, field in enumerate(fields):
+                    values[f, e, w] = _as_float(getattr(record, field))
+    return values
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if math.isnan(value) else round(float(value), 3)
+
+
+def detect_regressions(edge_ids: Sequence[str], windows: Sequence[MetricsIndex],
+                       z_threshold: float = TREND_Z_THRESHOLD, ratio_threshold: float = TREND_RATIO_THRESHOLD,
+                       top: int = DEFAULT_TREND_TOP) -> Dict[str, Any]:
+    """
+    Flag edges whose latest window deviates from their baseline.
+
+    Args:
+        edge_ids: Edges to compare (display or in_in IDs)
+        windows: Consecutive overlay windows, oldest first; the last one is compared with
+            the mean and standard deviation of the others
+        z_threshold: Minimum |z-score| (needs two baseline values and a non-zero deviation)
+        ratio_threshold: Minimum latest / baseline ratio (a traffic drop uses its inverse)
+        top: Maximum number of flags returned, most severe first
+
+    Returns:
+        Dict with:
+        - flags: One dict per flagged (edge, metric), with edge, metric, direction ("up" or
+          "down"), baseline, latest, z_score, ratio (inf when the baseline is 0), since_window
+          (index of the window the deviation has persisted since) and series (value per window)
+        - flag_count: Number of flags before the top cut
+        - edges_compared: Number of edges with a latest value for at least one metric
+        - z_threshold, ratio_threshold: The thresholds used
+    """
+    fields = tuple(TREND_METRICS)
+    values = stack_metrics(edge_ids, windows, fields)
+    window_count = values.shape[2]
+    if window_count < 2 or not len(edge_ids):
+        return {"flags": [], "flag_count": 0, "edges_compared": 0,
+                "z_threshold": z_threshold, "ratio_threshold": ratio_threshold}
+
+    min_change = np.array([TREND_METRICS[field][0] for field in fields])[:, None]
+    two_sided = np.array([TREND_METRICS[field][1] for field in fields])[:, None]
+
+    baseline = values[:, :, :-1]
+    latest = values[:, :, -1]
+    present = ~np.isnan(baseline)
+    count = present.sum(axis=2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(present, baseline, 0.0).sum(axis=2) / count
+        # Sample standard deviation: the baseline is only a handful of windows
+        std = np.sqrt(np.where(present, (baseline - mean[:, :, None]) ** 2, 0.0).sum(axis=2) / (count - 1))
+        usable_std = np.where((count >= 2) & (std > 0), std, np.nan)
+
+        # Deviation of every window (not only the latest) from the baseline, to find its onset
+        z = (values - mean[:, :, None]) / usable_std[:, :, None]
+        ratio = np.where(mean[:, :, None] > 0, values / mean[:, :, None],
+                         np.where(values > 0, np.inf, np.nan))
+        change = values - mean[:, :, None]
+        up = (z >= z_threshold) | (ratio >= ratio_threshold)
+        down = two_sided[:, :, None] & ((z <= -z_threshold) | (ratio <= 1 / ratio_threshold))
+        significant = np.abs(change) >= min_change[:, :, None]
+        deviates = significant & (up | down) & (count > 0)[:, :, None]
+
+        latest_z, latest_ratio = z[:, :, -1], ratio[:, :, -1]
+        severity = np.fmax(np.abs(latest_z) / z_threshold, np.abs(np.log(latest_ratio)) / math.log(ratio_threshold))
+
+    flagged = deviates[:, :, -1]
+    # Length of the run of deviating windows that ends with the latest one
+    run_length = np.cumprod(deviates[:, :, ::-1], axis=2).sum(axis=2)
+
+    f_index, e_index = np.nonzero(flagged)
+    order = np.argsort(-np.nan_to_num(severity[f_index, e_index], nan=0.0, posinf=np.inf), kind="stable")
+    flags = []
+    for i in order[:top]:
+        f, e = f_index[i], e_index[i]
+        flags.append({
+            "edge": edge_ids[e],
+            "metric": fields[f],
+            "direction": "up" if latest[f, e] > mean[f, e] else "down",
+            "baseline": _none_if_nan(mean[f, e]),
+            "latest": _none_if_nan(latest[f, e]),
+            "z_score": _none_if_nan(latest_z[f, e]),
+            "ratio": math.inf if math.isinf(latest_ratio[f, e]) else _none_if_nan(latest_ratio[f, e]),
+            "since_window": int(window_count - run_length[f, e]),
+            "series": [_none_if_nan(value) for value in values[f, e]],
+        })
+
+    return {
+        "flags": flags,
+        "flag_count": int(flagged.sum()),
+        "edges_compared": int((~np.isnan(latest)).any(axis=0).sum()),
+        "z_threshold": z_threshold,
+        "ratio_threshold": ratio_threshold,
+    }
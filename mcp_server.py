@@ -22,6 +22,8 @@ from mcp.server.stdio import stdio_server
 
 # Import our graph API client for all data operations
 import graph_api_client
+import graph_render
+from graph_model import MetricsIndex
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -265,8 +267,10 @@ DEBUGGING WORKFLOW:
                 self.base_url
             )
             
+            metrics_index = MetricsIndex.from_metrics_data(metrics_data, systems_data["version"])
+            
             # Format response for LLM using structured data with metrics
-            response_text = self._format_systems_response(systems_data, metrics_data)
+            response_text = self._format_systems_response(systems_data, metrics_index)
             
             return [types.TextContent(type="text", text=response_text)]
             
@@ -318,270 +322,14 @@ DEBUGGING WORKFLOW:
                 text=f"Error retrieving interface details: {str(e)}\n\nPlease verify the interface_id and version are correct."
             )]
 
-    def _format_systems_response(self, systems_data: Dict[str, Any], metrics_data: Optional[Dict[str, Any]] = None) -> str:
+    def _format_systems_response(self, systems_data: Dict[str, Any], metrics_index: Optional[MetricsIndex] = None) -> str:
         """Format the systems overview response for LLM interface selection with aggregated metrics."""
-        
-        system_units = systems_data["system_units"]
-        interfaces = systems_data["interfaces"]
-        version = systems_data["version"]
-        timestamp = systems_data["timestamp"]
-        
-        def format_aggregated_metrics(item_id: str, item_type: str) -> str:
-            """Format aggregated metrics for a system unit or interface."""
-            if not metrics_data:
-                return "No metrics available"
-                
-            try:
-                metrics = graph_api_client.get_metrics_for_item(item_id, metrics_data, version, item_type)
-                if not metrics:
-                    return "No metrics available"
-                
-                # Format aggregated metrics
-                throughput = metrics.get("t", {}).get("qpm", "N/A")
-                errors = metrics.get("e", {})
-                total_errors, error_4xx, error_5xx = graph_api_client.aggregate_errors(errors)
-                latency = metrics.get("l", {})
-                p50 = latency.get("0.5", "N/A")
-                p99 = latency.get("0.99", "N/A")
-                
-                return f"QPM: {throughput}, Errors: {total_errors}% (4xx: {error_4xx}%, 5xx: {error_5xx}%), Latency: p50={p50}ms, p99={p99}ms"
-            except Exception as e:
-                return f"Metrics error: {str(e)}"
-        
-        response = f"""
-# SYSTEM DIRECTORY WITH AGGREGATED METRICS
-
-## CRITICAL: Use Exact Names for Analysis
-
-- **Timestamp**: {timestamp}
-- **System Version**: `{version}` (REQUIRED for get_interface_details)
-- **Total System Units**: {len(system_units)}
-- **Total Interfaces**: {len(interfaces)}
-- **Metrics Time Window**: Last {DEFAULT_TIME_RANGE_MINUTES} minutes
-
-## UNDERSTANDING AGGREGATED METRICS
-
-**These are HIGH-LEVEL totals showing the BIG PICTURE:**
-
-- **Throughput (QPM)**: Total requests across ALL connections
-- **Latency**: Weighted average response time across ALL calls
-- **Errors**: Weighted average error rate across ALL interactions
-
-⚠️ **Important**: When you use get_interface_details, you'll see DIFFERENT numbers because that shows specific relationships only!
-
-## SYSTEM UNITS (Deployed Components)
-
-System units are actual deployed services, databases, and infrastructure. Metrics are aggregated across all interfaces in each system unit.
-
-"""
-
-        for i, unit in enumerate(system_units, 1):
-            metrics_str = format_aggregated_metrics(unit, "systemunits")
-            response += f"{i:2d}. `{unit}`\n    📊 {metrics_str}\n\n"
-
-        response += f"""
-## INTERFACES (APIs & Capabilities)
-
-**IMPORTANT**: Copy the exact interface name from this list for detailed analysis.
-Metrics show TOTAL performance across all callers and all calls to each interface.
-
-"""
-
-        for i, interface in enumerate(interfaces, 1):
-            metrics_str = format_aggregated_metrics(interface, "interfaces")
-            response += f"{i:2d}. `{interface}`\n    📊 {metrics_str}\n\n"
-
-        response += f"""
-
-## NEXT STEP: SELECT AN INTERFACE FOR FOCUSED ANALYSIS
-
-To analyze specific relationships involving any interface:
-
-1. **Choose** any interface name from the list above
-2. **Copy** the exact name (case-sensitive)
-3. **Use** get_interface_details with:
-   - interface_id: `[exact name from list]`
-   - version: `{version}`
-
-Example:
-```
-get_interface_details(
-  interface_id="OrderService::POST::/orders",
-  version="{version}"
-)
-```
-
-This will show you the SPECIFIC relationships and how metrics break down by individual connections.
-Remember: The numbers in get_interface_details will be DIFFERENT because you're seeing focused data!
-        """
-        
-        return response
+        return graph_render.render_systems_response(systems_data, metrics_index, DEFAULT_TIME_RANGE_MINUTES)
 
     def _format_interface_details_response(self, analysis_data: Dict[str, Any], 
                                          include_latency: bool, include_errors: bool) -> str:
         """Format the detailed interface analysis response for LLM understanding."""
-        
-        interface_id = analysis_data["interface_id"]
-        version = analysis_data["version"]
-        time_range = analysis_data["time_range"]
-        edges = analysis_data["edges"]
-        
-        def format_edge_metrics(edge: Dict[str, Any]) -> str:
-            """Format metrics for an edge."""
-            try:
-                sync_type = edge["sync_type"]
-                metrics = edge.get("metrics")
-                
-                if not metrics:
-                    return f"[{sync_type}] No metrics available"
-                
-                # Format metrics based on what's requested
-                parts = [f"[{sync_type}]"]
-                
-                # Always include throughput
-                throughput = metrics.get("t", {}).get("qpm", "N/A")
-                parts.append(f"QPM: {throughput}")
-                
-                if include_errors:
-                    errors = metrics.get("e", {})
-                    total_errors, error_4xx, error_5xx = graph_api_client.aggregate_errors(errors)
-                    parts.append(f"Errors: {total_errors}% (4xx: {error_4xx}%, 5xx: {error_5xx}%)")
-                
-                if include_latency:
-                    latency = metrics.get("l", {})
-                    p50 = latency.get("0.5", "N/A")
-                    p90 = latency.get("0.9", "N/A")
-                    p95 = latency.get("0.95", "N/A")
-                    p99 = latency.get("0.99", "N/A")
-                    parts.append(f"Latency: p50={p50}ms, p90={p90}ms, p95={p95}ms, p99={p99}ms")
-                
-                return " | ".join(parts)
-                
-            except Exception as e:
-                return f"[UNKNOWN] Metrics error: {str(e)}"
-        
-        response = f"""
-# FOCUSED INTERFACE ANALYSIS: {interface_id}
-
-⚠️ **CRITICAL UNDERSTANDING - PERSPECTIVE VIEW**:
-
-You are now looking at data FROM {interface_id}'S POINT OF VIEW. 
-
-**Why metrics here are DIFFERENT from get_systems_and_interfaces:**
-- **System Overview**: Showed TOTAL metrics across ALL relationships
-- **This Analysis**: Shows ONLY metrics for relationships involving {interface_id}
-
-**Example**: If Interface A gets 100 QPM from B and 200 QPM from C:
-- System overview showed: Interface A = 300 QPM total  
-- When analyzing Interface B: Shows Interface A = 100 QPM (only B→A portion)
-- When analyzing Interface C: Shows Interface A = 200 QPM (only C→A portion)
-
-**This is CORRECT and EXPECTED!** You're seeing focused relationship data, not system totals.
-
-## Analysis Parameters
-- **Focused Interface**: {interface_id}
-- **System Version**: {version}
-- **Time Range**: {time_range["start"]} to {time_range["end"]}
-- **Duration**: {time_range["duration_minutes"]:.0f} minutes
-- **Include Latency**: {include_latency}
-- **Include Errors**: {include_errors}
-
-## INTERFACE DEPENDENCIES & DATA FLOW FROM {interface_id}'S PERSPECTIVE
-
-This interface has **{len(edges)} direct relationships**. Each edge shows a specific communication path involving your chosen interface.
-
-### Understanding the Relationship Data:
-
-Each edge shows: `SourceInterface -> TargetInterface`
-- **[SYNC/ASYNC]**: Communication pattern for this specific connection
-- **Metrics**: Performance data for THIS relationship only (not system totals!)
-- **Direction**: Whether this is upstream (calls INTO {interface_id}) or downstream (calls FROM {interface_id})
-
-"""
-
-        if not edges:
-            response += """
-**No direct interface dependencies found.**
-
-This could mean:
-- This interface is a leaf node (doesn't call other interfaces)
-- This interface is an entry point (only receives calls)
-- The interface might be isolated or not currently active
-"""
-        else:
-            response += "### RELATIONSHIP EDGES WITH FOCUSED METRICS:\n\n"
-            
-            for i, edge in enumerate(edges, 1):
-                edge_display = edge["edge_display"]
-                relationship = edge["relationship"]
-                edge_metrics = format_edge_metrics(edge)
-                
-                # Convert relationship to display format
-                if relationship == "UPSTREAM":
-                    relationship_display = "📥 **UPSTREAM** (calls INTO this interface)"
-                elif relationship == "DOWNSTREAM":
-                    relationship_display = "📤 **DOWNSTREAM** (this interface calls OUT)"
-                else:
-                    relationship_display = "🔄 **RELATED** (part of this interface's call chain)"
-                
-                response += f"""
-**{i}. {edge_display}**
-   - Direction: {relationship_display}
-   - Performance: {edge_metrics}
-"""
-
-            response += f"""
-
-### PERFORMANCE ANALYSIS INSIGHTS:
-
-**How to Read These Metrics:**
-
-1. **[SYNC/ASYNC]**: Communication pattern
-   - SYNC: Request-response, blocking calls (REST, RPC)
-   - ASYNC: Event-driven, non-blocking (message queues, events)
-
-2. **QPM (Queries Per Minute)**: Volume of traffic on this communication path
-   - High QPM = Heavy usage, potential bottleneck
-   - Low QPM = Light usage or infrequent calls
-
-3. **Errors**: Failure rate for this specific communication
-   - 4xx errors: Client-side issues (bad requests, auth failures)
-   - 5xx errors: Server-side issues (crashes, timeouts)
-   - High errors indicate reliability problems
-
-4. **Latency Percentiles**: Response time distribution
-   - p50 (median): Typical response time
-   - p90/p95: Most users experience this or better
-   - p99: Worst-case performance (tail latency)
-   - Large gap between p50 and p99 indicates inconsistent performance
-
-**Debugging Workflow:**
-1. **High Latency Edges**: Look for p99 > 1000ms or large p50-p99 gaps
-2. **Error-Prone Edges**: Focus on edges with >1% error rates  
-3. **High Traffic Edges**: QPM > 1000 may be bottlenecks
-4. **Async vs Sync Issues**: ASYNC edges should have lower latency variance
-
-**System Health Indicators:**
-- ✅ Good: Low errors (<1%), consistent latency (p99 < 2x p50)
-- ⚠️  Warning: Moderate errors (1-5%), high tail latency (p99 > 5x p50)  
-- 🚨 Critical: High errors (>5%), extreme latency (p99 > 1000ms)
-"""
-
-        response += f"""
-
-## NEXT STEPS FOR DEEPER ANALYSIS
-
-To continue investigating:
-
-1. **Analyze Problematic Edges**: Pick any high-latency or error-prone edge and analyze its source/target interfaces
-2. **Historical Comparison**: Run this analysis with different time ranges to see trends
-3. **System-Wide Impact**: Check if this interface's issues affect other parts of the system
-4. **Root Cause Analysis**: Follow the dependency chain to find the ultimate source of problems
-
-Use `get_interface_details` on any interface mentioned in the edges above to continue your analysis.
-        """
-        
-        return response
+        return graph_render.render_interface_details_response(analysis_data, include_latency, include_errors)
 
     async def run(self):
         """Start the MCP server."""
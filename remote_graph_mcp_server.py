@@ -8,12 +8,13 @@ import asyncio
 import json
 import logging
 import os
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 import uvicorn
 
 from mcp.server.models import InitializationOptions
@@ -23,6 +24,12 @@ import mcp.types as types
 
 # Import the graph API client
 import graph_api_client
+import graph_render
+import graph_telemetry
+from graph_cache import RenderedCache
+from graph_model import OVERLAY_CATEGORIES
+from graph_refresher import BackgroundRefresher
+from graph_trend import DEFAULT_TREND_WINDOWS, MAX_TREND_WINDOWS
 
 # Configure logging
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -36,356 +43,243 @@ logger = logging.getLogger("graph-analysis-mcp-server")
 DEFAULT_BASE_URL = "http://ck-nexus-app.codekarma:8081"
 DEFAULT_TIME_RANGE_MINUTES = 30
 
-# Initialize the MCP server instance (we'll use this for handlers)
-mcp_server = Server("graph-analysis")
-
-# Tool implementation functions from the original server
-def format_systems_response(systems_data: Dict[str, Any], metrics_data: Optional[Dict[str, Any]] = None) -> str:
-    """Format the systems overview response for LLM interface selection with aggregated metrics."""
-    
-    system_units = systems_data["system_units"]
-    interfaces = systems_data["interfaces"]
-    version = systems_data["version"]
-    timestamp = systems_data["timestamp"]
-    
-    def format_aggregated_metrics(item_id: str, item_type: str) -> str:
-        """Format aggregated metrics for a system unit or interface."""
-        if not metrics_data:
-            return "No metrics available"
-            
-        try:
-            metrics = graph_api_client.get_metrics_for_item(item_id, metrics_data, version, item_type)
-            if not metrics:
-                return "No metrics available"
-            
-            # Format aggregated metrics
-            throughput = metrics.get("t", {}).get("qpm", "N/A")
-            errors = metrics.get("e", {})
-            total_errors, error_4xx, error_5xx = graph_api_client.aggregate_errors(errors)
-            latency = metrics.get("l", {})
-            p50 = latency.get("0.5", "N/A")
-            p99 = latency.get("0.99", "N/A")
-            
-            return f"QPM: {throughput}, Errors: {total_errors}% (4xx: {error_4xx}%, 5xx: {error_5xx}%), Latency: p50={p50}ms, p99={p99}ms"
-        except Exception as e:
-            return f"Metrics error: {str(e)}"
-    
-    response = f"""
-# SYSTEM DIRECTORY WITH AGGREGATED METRICS
-
-## CRITICAL: Use Exact Names for Analysis
+# Largest JSON-RPC batch array accepted on /gmcp (its calls run concurrently)
+MAX_RPC_BATCH_SIZE = int(os.getenv("CK_MAX_RPC_BATCH_SIZE", "50"))
 
-- **Timestamp**: {timestamp}
-- **System Version**: `{version}` (REQUIRED for get_interface_details)
-- **Total System Units**: {len(system_units)}
-- **Total Interfaces**: {len(interfaces)}
-- **Metrics Time Window**: Last {DEFAULT_TIME_RANGE_MINUTES} minutes
+# Requests slower than this log one slow_request line with their phase breakdown
+SLOW_REQUEST_MS = float(os.getenv("CK_SLOW_REQUEST_MS", "2000"))
+# Phase breakdown in a Server-Timing response header, and in tools/call results' _meta
+# (a client can also ask for the latter per call with params._meta.timings = true)
+TIMING_HEADER_ENABLED = os.getenv("CK_TIMING_HEADER", "true").lower() in ("1", "true", "yes")
+TIMING_META_ENABLED = os.getenv("CK_TIMING_META", "false").lower() in ("1", "true", "yes")
 
-## UNDERSTANDING AGGREGATED METRICS
+# Keep the latest snapshot, metrics and directory of recently active tenants warm in the background
+REFRESHER_ENABLED = os.getenv("CK_REFRESHER", "true").lower() in ("1", "true", "yes")
 
-**These are HIGH-LEVEL totals showing the BIG PICTURE:**
-
-- **Throughput (QPM)**: Total requests across ALL connections
-- **Latency**: Weighted average response time across ALL calls
-- **Errors**: Weighted average error rate across ALL interactions
-
-⚠️ **Important**: When you use get_interface_details, you'll see DIFFERENT numbers because that shows specific relationships only!
-
-## SYSTEM UNITS (Deployed Components)
-
-System units are actual deployed services, databases, and infrastructure. Metrics are aggregated across all interfaces in each system unit.
-
-"""
-
-    for i, unit in enumerate(system_units, 1):
-        metrics_str = format_aggregated_metrics(unit, "systemunits")
-        response += f"{i:2d}. `{unit}`\n    📊 {metrics_str}\n\n"
-
-    response += f"""
-## INTERFACES (APIs & Capabilities)
-
-**IMPORTANT**: Copy the exact interface name from this list for detailed analysis.
-Metrics show TOTAL performance across all callers and all calls to each interface.
-
-"""
-
-    for i, interface in enumerate(interfaces, 1):
-        metrics_str = format_aggregated_metrics(interface, "interfaces")
-        response += f"{i:2d}. `{interface}`\n    📊 {metrics_str}\n\n"
-
-    response += f"""
-
-## NEXT STEP: SELECT AN INTERFACE FOR FOCUSED ANALYSIS
+# Initialize the MCP server instance (we'll use this for handlers)
+mcp_server = Server("graph-analysis")
 
-To analyze specific relationships involving any interface:
+# Shared async upstream client (one keep-alive connection pool per graph-api-base-url)
+graph_client = graph_api_client.AsyncGraphAPIClient()
 
-1. **Choose** any interface name from the list above
-2. **Copy** the exact name (case-sensitive)
-3. **Use** get_interface_details with:
-   - interface_id: `[exact name from list]`
-   - version: `{version}`
+# Rendered get_systems_and_interfaces responses for the latest snapshot, per tenant
+directory_cache = RenderedCache()
 
-Example:
-```
-get_interface_details(
-  interface_id="OrderService::POST::/orders",
-  version="{version}"
-)
-```
 
-This will show you the SPECIFIC relationships and how metrics break down by individual connections.
-Remember: The numbers in get_interface_details will be DIFFERENT because you're seeing focused data!
+async def get_systems_and_interfaces_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
     """
+    Get complete system overview with system units, interfaces, and aggregated metrics.
     
-    return response
-
-
-def format_interface_details_response(analysis_data: Dict[str, Any], 
-                                     include_latency: bool, include_errors: bool) -> str:
-    """Format the detailed interface analysis response for LLM understanding."""
+    This provides the foundational view of the distributed system with high-level performance data.
+    """
+    # Parse timestamp or use current time
+    timestamp = arguments.get("timestamp")
     
-    interface_id = analysis_data["interface_id"]
-    version = analysis_data["version"]
-    time_range = analysis_data["time_range"]
-    edges = analysis_data["edges"]
+    # Use the pooled async graph client to get systems overview and metrics
+    # for the same time period (last 30 minutes)
+    systems_data, metrics_index = await graph_client.get_systems_overview_with_metrics(
+        timestamp,
+        DEFAULT_TIME_RANGE_MINUTES,
+        base_url,
+        domain
+    )
     
-    def format_edge_metrics(edge: Dict[str, Any]) -> str:
-        """Format metrics for an edge."""
-        try:
-            sync_type = edge["sync_type"]
-            metrics = edge.get("metrics")
-            
-            if not metrics:
-                return f"[{sync_type}] No metrics available"
-            
-            # Format metrics based on what's requested
-            parts = [f"[{sync_type}]"]
-            
-            # Always include throughput
-            throughput = metrics.get("t", {}).get("qpm", "N/A")
-            parts.append(f"QPM: {throughput}")
-            
-            if include_errors:
-                errors = metrics.get("e", {})
-                total_errors, error_4xx, error_5xx = graph_api_client.aggregate_errors(errors)
-                parts.append(f"Errors: {total_errors}% (4xx: {error_4xx}%, 5xx: {error_5xx}%)")
-            
-            if include_latency:
-                latency = metrics.get("l", {})
-                p50 = latency.get("0.5", "N/A")
-                p90 = latency.get("0.9", "N/A")
-                p95 = latency.get("0.95", "N/A")
-                p99 = latency.get("0.99", "N/A")
-                parts.append(f"Latency: p50={p50}ms, p90={p90}ms, p95={p95}ms, p99={p99}ms")
-            
-            return " | ".join(parts)
-            
-        except Exception as e:
-            return f"[UNKNOWN] Metrics error: {str(e)}"
+    # Render the response for LLM using structured data with metrics
+    if timestamp:
+        return graph_render.iter_systems_response(systems_data, metrics_index, DEFAULT_TIME_RANGE_MINUTES)
     
-    response = f"""
-# FOCUSED INTERFACE ANALYSIS: {interface_id}
-
-⚠️ **CRITICAL UNDERSTANDING - PERSPECTIVE VIEW**:
-
-You are now looking at data FROM {interface_id}'S POINT OF VIEW. 
-
-**Why metrics here are DIFFERENT from get_systems_and_interfaces:**
-- **System Overview**: Showed TOTAL metrics across ALL relationships
-- **This Analysis**: Shows ONLY metrics for relationships involving {interface_id}
-
-**Example**: If Interface A gets 100 QPM from B and 200 QPM from C:
-- System overview showed: Interface A = 300 QPM total  
-- When analyzing Interface B: Shows Interface A = 100 QPM (only B→A portion)
-- When analyzing Interface C: Shows Interface A = 200 QPM (only C→A portion)
-
-**This is CORRECT and EXPECTED!** You're seeing focused relationship data, not system totals.
-
-## Analysis Parameters
-- **Focused Interface**: {interface_id}
-- **System Version**: {version}
-- **Time Range**: {time_range["start"]} to {time_range["end"]}
-- **Duration**: {time_range["duration_minutes"]:.0f} minutes
-- **Include Latency**: {include_latency}
-- **Include Errors**: {include_errors}
-
-## INTERFACE DEPENDENCIES & DATA FLOW FROM {interface_id}'S PERSPECTIVE
-
-This interface has **{len(edges)} direct relationships**. Each edge shows a specific communication path involving your chosen interface.
+    # The latest directory is rendered once per (snapshot, metrics window); while both are
+    # cached the stored rendering is served, timestamped when it was rendered. Keyed on the
+    # resolved domain, so a call without one shares the default domain's entry
+    key = (base_url, graph_api_client._resolve_domain(domain, None), systems_data["version"])
+    sources = (systems_data["system_units"], systems_data["interfaces"], metrics_index)
+    chunks = directory_cache.get(key, sources)
+    if chunks is None:
+        with graph_telemetry.span("format"):
+            chunks = list(graph_render.iter_systems_response(systems_data, metrics_index, DEFAULT_TIME_RANGE_MINUTES))
+        directory_cache.put(key, sources, chunks)
+    return iter(chunks)
+
+
+async def warm_tenant(base_url: str, domain: Optional[str] = None):
+    """
+    Pre-build a tenant's latest directory, with its snapshot and metrics.
+    
+    Goes through the caches: the snapshot is only downloaded again once its latest pointer
+    has expired, so a round right after a tool call re-fetched it costs nothing upstream.
+    """
+    await get_systems_and_interfaces_chunks({}, base_url, domain)
 
-### Understanding the Relationship Data:
 
-Each edge shows: `SourceInterface -> TargetInterface`
-- **[SYNC/ASYNC]**: Communication pattern for this specific connection
-- **Metrics**: Performance data for THIS relationship only (not system totals!)
-- **Direction**: Whether this is upstream (calls INTO {interface_id}) or downstream (calls FROM {interface_id})
+# Background refresher of the tenants that recently made tool calls (started with the app)
+refresher = BackgroundRefresher(warm_tenant)
 
-"""
 
-    if not edges:
-        response += """
-**No direct interface dependencies found.**
-
-This could mean:
-- This interface is a leaf node (doesn't call other interfaces)
-- This interface is an entry point (only receives calls)
-- The interface might be isolated or not currently active
-"""
+async def get_interface_details_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
+    """
+    Get detailed analysis of specific interface including edges and dependencies.
+    
+    This provides deep insights into how a specific interface behaves and connects.
+    """
+    interface_id = arguments["interface_id"]
+    version = arguments["version"]
+    start_time_str = arguments.get("start_time")
+    end_time_str = arguments.get("end_time")
+    include_latency = arguments.get("include_latency", True)
+    include_errors = arguments.get("include_errors", True)
+    trend_windows = arguments.get("trend_windows")
+    
+    # Use the pooled async graph client to get interface analysis
+    if trend_windows:
+        # Trend mode: the same analysis plus a regression check against the preceding windows
+        analysis_data = await graph_client.get_interface_trend(
+            interface_id,
+            version,
+            trend_windows,
+            start_time_str,
+            end_time_str,
+            base_url,
+            domain
+        )
     else:
-        response += "### RELATIONSHIP EDGES WITH FOCUSED METRICS:\n\n"
-        
-        for i, edge in enumerate(edges, 1):
-            edge_display = edge["edge_display"]
-            relationship = edge["relationship"]
-            edge_metrics = format_edge_metrics(edge)
-            
-            # Convert relationship to display format
-            if relationship == "UPSTREAM":
-                relationship_display = "📥 **UPSTREAM** (calls INTO this interface)"
-            elif relationship == "DOWNSTREAM":
-                relationship_display = "📤 **DOWNSTREAM** (this interface calls OUT)"
-            else:
-                relationship_display = "🔄 **RELATED** (part of this interface's call chain)"
-            
-            response += f"""
-**{i}. {edge_display}**
-   - Direction: {relationship_display}
-   - Performance: {edge_metrics}
-"""
-
-        response += f"""
-
-### PERFORMANCE ANALYSIS INSIGHTS:
-
-**How to Read These Metrics:**
-
-1. **[SYNC/ASYNC]**: Communication pattern
-   - SYNC: Request-response, blocking calls (REST, RPC)
-   - ASYNC: Event-driven, non-blocking (message queues, events)
-
-2. **QPM (Queries Per Minute)**: Volume of traffic on this communication path
-   - High QPM = Heavy usage, potential bottleneck
-   - Low QPM = Light usage or infrequent calls
-
-3. **Errors**: Failure rate for this specific communication
-   - 4xx errors: Client-side issues (bad requests, auth failures)
-   - 5xx errors: Server-side issues (crashes, timeouts)
-   - High errors indicate reliability problems
-
-4. **Latency Percentiles**: Response time distribution
-   - p50 (median): Typical response time
-   - p90/p95: Most users experience this or better
-   - p99: Worst-case performance (tail latency)
-   - Large gap between p50 and p99 indicates inconsistent performance
-
-**Debugging Workflow:**
-1. **High Latency Edges**: Look for p99 > 1000ms or large p50-p99 gaps
-2. **Error-Prone Edges**: Focus on edges with >1% error rates  
-3. **High Traffic Edges**: QPM > 1000 may be bottlenecks
-4. **Async vs Sync Issues**: ASYNC edges should have lower latency variance
+        analysis_data = await graph_client.get_interface_analysis(
+            interface_id,
+            version,
+            start_time_str,
+            end_time_str,
+            base_url,
+            domain
+        )
+    
+    # Render detailed response for LLM using structured data
+    return graph_render.iter_interface_details_response(analysis_data, include_latency, include_errors)
 
-**System Health Indicators:**
-- ✅ Good: Low errors (<1%), consistent latency (p99 < 2x p50)
-- ⚠️  Warning: Moderate errors (1-5%), high tail latency (p99 > 5x p50)  
-- 🚨 Critical: High errors (>5%), extreme latency (p99 > 1000ms)
-"""
 
-    response += f"""
+async def get_interfaces_details_batch_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
+    """
+    Get detailed analysis of several interfaces of one version in a single call.
+    
+    The overlay metrics are fetched once and shared; interfaces that fail are reported inline.
+    """
+    batch_data = await graph_client.get_interfaces_analysis_batch(
+        arguments["interface_ids"],
+        arguments["version"],
+        arguments.get("start_time"),
+        arguments.get("end_time"),
+        base_url,
+        domain
+    )
+    
+    return graph_render.iter_interface_details_batch_response(
+        batch_data, arguments.get("include_latency", True), arguments.get("include_errors", True)
+    )
 
-## NEXT STEPS FOR DEEPER ANALYSIS
 
-To continue investigating:
+async def get_dependency_tree_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
+    """
+    Get k-hop upstream/downstream dependency trees of an interface.
+    
+    Computed locally from the cached graph snapshot with one overlay fetch for edge metrics.
+    """
+    tree_data = await graph_client.get_dependency_tree(
+        arguments["interface_id"],
+        arguments.get("version"),
+        arguments.get("direction", "both"),
+        arguments.get("depth", graph_api_client.DEFAULT_TREE_DEPTH),
+        arguments.get("start_time"),
+        arguments.get("end_time"),
+        base_url,
+        domain
+    )
+    
+    return graph_render.iter_dependency_tree_response(tree_data)
 
-1. **Analyze Problematic Edges**: Pick any high-latency or error-prone edge and analyze its source/target interfaces
-2. **Historical Comparison**: Run this analysis with different time ranges to see trends
-3. **System-Wide Impact**: Check if this interface's issues affect other parts of the system
-4. **Root Cause Analysis**: Follow the dependency chain to find the ultimate source of problems
 
-Use `get_interface_details` on any interface mentioned in the edges above to continue your analysis.
+async def get_critical_path_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
     """
+    Find the synchronous call chain(s) behind the highest latency.
     
-    return response
+    Computed locally from the cached graph snapshot with one overlay fetch for edge latencies.
+    """
+    path_data = await graph_client.get_critical_path(
+        arguments.get("interface_id"),
+        arguments.get("version"),
+        arguments.get("percentile", graph_api_client.DEFAULT_CRITICAL_PATH_PERCENTILE),
+        arguments.get("start_time"),
+        arguments.get("end_time"),
+        base_url,
+        domain,
+        top=arguments.get("top", graph_api_client.DEFAULT_CRITICAL_PATH_TOP)
+    )
+    
+    return graph_render.iter_critical_path_response(path_data)
 
 
-async def get_systems_and_interfaces_impl(arguments: dict, base_url: str, domain: Optional[str] = None) -> str:
+async def get_blast_radius_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
     """
-    Get complete system overview with system units, interfaces, and aggregated metrics.
+    Find every caller affected by a degradation of the given interfaces, ranked by traffic.
     
-    This provides the foundational view of the distributed system with high-level performance data.
+    Computed locally from the cached graph snapshot with one overlay fetch for edge QPM.
     """
-    # Parse timestamp or use current time
-    timestamp = arguments.get("timestamp")
+    interface_ids = arguments.get("interface_ids") or []
+    if arguments.get("interface_id"):
+        interface_ids = [arguments["interface_id"], *interface_ids]
     
-    # Use graph_api_client to get systems overview and metrics
-    # Run sync function in async context
-    loop = asyncio.get_event_loop()
-    systems_data = await loop.run_in_executor(
-        None, 
-        graph_api_client.get_systems_overview,
-        timestamp,
+    blast_data = await graph_client.get_blast_radius(
+        interface_ids,
+        arguments.get("version"),
+        arguments.get("start_time"),
+        arguments.get("end_time"),
         base_url,
-        domain
+        domain,
+        sync_only=arguments.get("sync_only", False),
+        top=arguments.get("top", graph_api_client.DEFAULT_BLAST_RADIUS_TOP)
     )
     
-    # Get metrics for the same time period (last 30 minutes)
-    if timestamp:
-        end_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-    else:
-        end_time = datetime.now()
-    start_time = end_time - timedelta(minutes=DEFAULT_TIME_RANGE_MINUTES)
-    
-    start_epoch = int(start_time.timestamp() * 1000)  # Convert to milliseconds
-    end_epoch = int(end_time.timestamp() * 1000)  # Convert to milliseconds
-    
-    metrics_data = await loop.run_in_executor(
-        None,
-        graph_api_client.fetch_metrics_data,
-        systems_data["version"],
-        start_epoch,
-        end_epoch,
+    return graph_render.iter_blast_radius_response(blast_data)
+
+
+async def diff_snapshots_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
+    """
+    Compare two snapshots: added/removed system units, interfaces and edges, and metric deltas.
+    
+    Both snapshots and overlays are loaded through the caches and diffed locally.
+    """
+    diff_data = await graph_client.get_snapshot_diff(
+        arguments.get("from_timestamp"),
+        arguments.get("to_timestamp"),
+        arguments.get("from_version"),
+        arguments.get("to_version"),
+        arguments.get("window_minutes", DEFAULT_TIME_RANGE_MINUTES),
         base_url,
-        domain
+        domain,
+        top=arguments.get("top", graph_api_client.DEFAULT_DIFF_TOP)
     )
     
-    # Format response for LLM using structured data with metrics
-    response_text = format_systems_response(systems_data, metrics_data)
-    
-    return response_text
+    return graph_render.iter_snapshot_diff_response(diff_data)
 
 
-async def get_interface_details_impl(arguments: dict, base_url: str, domain: Optional[str] = None) -> str:
+async def rank_metrics_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
     """
-    Get detailed analysis of specific interface including edges and dependencies.
+    Rank the edges, interfaces or system units of an overlay by one metric, with filters.
     
-    This provides deep insights into how a specific interface behaves and connects.
+    Filtering and top-K run vectorized over the cached overlay's columnar table.
     """
-    interface_id = arguments["interface_id"]
-    version = arguments["version"]
-    start_time_str = arguments.get("start_time")
-    end_time_str = arguments.get("end_time")
-    include_latency = arguments.get("include_latency", True)
-    include_errors = arguments.get("include_errors", True)
-    
-    # Use graph_api_client to get interface analysis
-    # Run sync function in async context
-    loop = asyncio.get_event_loop()
-    analysis_data = await loop.run_in_executor(
-        None,
-        graph_api_client.get_interface_analysis,
-        interface_id,
-        version,
-        start_time_str,
-        end_time_str,
+    ranking_data = await graph_client.get_metric_ranking(
+        arguments.get("item_type", "edges"),
+        arguments.get("sort_by", "p99"),
+        arguments.get("descending", True),
+        arguments.get("where"),
+        arguments.get("id_contains"),
+        arguments.get("version"),
+        arguments.get("start_time"),
+        arguments.get("end_time"),
         base_url,
-        domain
+        domain,
+        top=arguments.get("top", graph_api_client.DEFAULT_RANKING_TOP)
     )
     
-    # Format detailed response for LLM using structured data
-    response_text = format_interface_details_response(
-        analysis_data, include_latency, include_errors
-    )
-    
-    return response_text
+    return graph_render.iter_metric_ranking_response(ranking_data)
 
 
 def format_code_details_response(code_details: List[Dict[str, Any]], service_name: str, 
@@ -445,7 +339,7 @@ You can use this information to:
     return response
 
 
-async def get_code_details_for_api_impl(arguments: dict, base_url: str, domain: Optional[str] = None) -> str:
+async def get_code_details_for_api_chunks(arguments: dict, base_url: str, domain: Optional[str] = None) -> Iterator[str]:
     """
     Get code details (className and methodName) by HTTP method and API signature.
     
@@ -456,12 +350,8 @@ async def get_code_details_for_api_impl(arguments: dict, base_url: str, domain:
     http_api_signature = arguments["http_api_signature"]
     domain_name = arguments.get("domain_name", domain)
     
-    # Use graph_api_client to get code details
-    # Run sync function in async context
-    loop = asyncio.get_event_loop()
-    code_details = await loop.run_in_executor(
-        None,
-        graph_api_client.fetch_code_details_for_api,
+    # Use the pooled async graph client to get code details
+    code_details = await graph_client.fetch_code_details_for_api(
         domain_name,
         service_name,
         http_method,
@@ -471,11 +361,7 @@ async def get_code_details_for_api_impl(arguments: dict, base_url: str, domain:
     )
     
     # Format response for LLM
-    response_text = format_code_details_response(
-        code_details, service_name, http_method, http_api_signature
-    )
-    
-    return response_text
+    return iter([format_code_details_response(code_details, service_name, http_method, http_api_signature)])
 
 
 # MCP server handlers
@@ -603,6 +489,9 @@ TIME RANGE ANALYSIS:
 - Metrics are averaged over the specified time window
 - Default: last 30 minutes for current issue analysis
 - Use historical analysis to identify when relationship problems started
+- Set trend_windows (e.g. 6) to compare the window with the ones before it in one call:
+  edges whose QPM, errors or p99 deviate from their baseline are flagged, with the window
+  the deviation started in
 
 DEBUGGING WORKFLOW:
 1. Find high-latency or error-prone relationships involving your interface
@@ -636,12 +525,70 @@ DEBUGGING WORKFLOW:
                     "include_errors": {
                         "type": "boolean", 
                         "description": "Include error metrics in response (default: true). Set false to focus only on throughput and latency."
+                    },
+                    "trend_windows": {
+                        "type": "integer",
+                        "minimum": 2,
+                        "maximum": MAX_TREND_WINDOWS,
+                        "description": f"Trend mode: number of consecutive windows of the same length, ending with the requested one (e.g. {DEFAULT_TREND_WINDOWS}). Flags edges whose latest QPM, errors or p99 deviate from the earlier windows. Omit for a single window."
                     }
                 },
                 "required": ["interface_id", "version"]
             }
         ),
         
+        Tool(
+            name="get_interfaces_details_batch",
+            description="""
+Get the focused relationship analysis of SEVERAL interfaces (same as get_interface_details) in ONE call.
+
+PURPOSE:
+Use this instead of calling get_interface_details repeatedly when you already know which
+interfaces you want to inspect (e.g., every interface of a suspicious service, or all the
+targets of a high-latency interface).
+
+HOW IT WORKS:
+- All interfaces are analyzed against the same version and time window
+- Relationship details are fetched concurrently; the metrics are fetched once and shared
+- An interface that cannot be analyzed (e.g., a system unit ID given by mistake) is reported
+  inline with its error; the other interfaces are still analyzed
+
+Each interface section uses the same PERSPECTIVE VIEW as get_interface_details: metrics are
+for the relationships involving that interface only, not system totals.
+            """,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "interface_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Interface IDs from the systems list (e.g., ['OrderService::POST::/orders', 'PaymentService::POST::/charge'])."
+                    },
+                    "version": {
+                        "type": "string",
+                        "description": "Version ID returned from get_systems_and_interfaces."
+                    },
+                    "start_time": {
+                        "type": "string",
+                        "description": "ISO 8601 start timestamp for metrics analysis (default: 30 minutes ago)."
+                    },
+                    "end_time": {
+                        "type": "string",
+                        "description": "ISO 8601 end timestamp for metrics analysis (default: current time)."
+                    },
+                    "include_latency": {
+                        "type": "boolean",
+                        "description": "Include latency percentiles in response (default: true)."
+                    },
+                    "include_errors": {
+                        "type": "boolean",
+                        "description": "Include error metrics in response (default: true)."
+                    }
+                },
+                "required": ["interface_ids", "version"]
+            }
+        ),
+        
         Tool(
             name="get_code_details_for_api",
             description="""
@@ -717,6 +664,297 @@ Interface names from get_systems_and_interfaces follow these formats:
                 },
                 "required": ["service_name", "http_method", "http_api_signature"]
             }
+        ),
+        
+        Tool(
+            name="get_dependency_tree",
+            description="""
+Get the multi-hop dependency tree of an interface in ONE call: who it calls (downstream), who calls it (upstream), and so on for several hops, with metrics for every edge.
+
+PURPOSE:
+Trace call chains without calling get_interface_details once per hop. The tree is computed from the cached system graph, so it is fast even for deep chains.
+
+WHEN TO USE:
+- "What does this API depend on, all the way down?" → direction="downstream"
+- "Which entry points and services end up calling this interface?" → direction="upstream"
+- Following a latency or error problem along a call chain
+- Getting the neighborhood of an interface before drilling into specific edges
+
+HOW TO READ THE RESULT:
+- Each nested line is one hop; the metrics on a line belong to the edge that leads to it
+- Metrics are RELATIONSHIP-SPECIFIC (same meaning as in get_interface_details)
+- Interfaces reachable through several paths are expanded only once ("already expanded above")
+- "more edge(s) not expanded" means the tree was cut at the requested depth; raise depth to see more
+
+Use get_interface_details afterwards for a focused view of any interface in the tree.
+            """,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "interface_id": {
+                        "type": "string",
+                        "description": "Interface ID from the systems list (e.g., 'OrderService::POST::/orders'). Root of the tree."
+                    },
+                    "version": {
+                        "type": "string",
+                        "description": "Version ID returned from get_systems_and_interfaces (default: latest snapshot)."
+                    },
+                    "direction": {
+                        "type": "string",
+                        "enum": ["downstream", "upstream", "both"],
+                        "description": "Which tree(s) to build: 'downstream' (calls made), 'upstream' (callers) or 'both' (default)."
+                    },
+                    "depth": {
+                        "type": "integer",
+                        "description": "Number of hops to expand (default: 3, max: 10)."
+                    },
+                    "start_time": {
+                        "type": "string",
+                        "description": "ISO 8601 start timestamp for edge metrics (default: 30 minutes before end_time)."
+                    },
+                    "end_time": {
+                        "type": "string",
+                        "description": "ISO 8601 end timestamp for edge metrics (default: current time)."
+                    }
+                },
+                "required": ["interface_id"]
+            }
+        ),
+        
+        Tool(
+            name="get_critical_path",
+            description="""
+Find the chain of SYNCHRONOUS calls behind the highest latency, starting from an entry interface (typically `External::INBOUND::*`).
+
+PURPOSE:
+Answers "where does the time go?" for a user-facing request in ONE call, instead of following the dependency chain hop by hop with get_interface_details.
+
+HOW IT WORKS:
+- Follows only SYNC in_in edges (async hops do not add to the caller's latency)
+- Weights every edge by its p99 (default) or p50/p90/p95 latency for the time window
+- A call's latency already includes the calls nested below it, so the path starts with the entry point's slowest call and, at every hop, descends into the slowest call made from there
+- The path's total is its first hop's latency
+- Cycles in the call graph are detected and ignored
+
+HOW TO READ THE RESULT:
+- Each hop shows its latency and "own" latency (its latency minus the next hop's)
+- The hop with the largest own latency is flagged as the likely bottleneck
+- Without interface_id, the worst paths across all External::INBOUND entry points are listed
+
+Use get_interface_details on the bottleneck's target interface to dig further.
+            """,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "interface_id": {
+                        "type": "string",
+                        "description": "Entry interface to start from (e.g., 'External::INBOUND::APP_ANDROID_USER'). Default: every External::INBOUND interface."
+                    },
+                    "version": {
+                        "type": "string",
+                        "description": "Version ID returned from get_systems_and_interfaces (default: latest snapshot)."
+                    },
+                    "percentile": {
+                        "type": "string",
+                        "enum": ["p50", "p90", "p95", "p99"],
+                        "description": "Latency percentile to follow along the path (default: p99)."
+                    },
+                    "top": {
+                        "type": "integer",
+                        "description": "Number of entry points to report when interface_id is not given (default: 5)."
+                    },
+                    "start_time": {
+                        "type": "string",
+                        "description": "ISO 8601 start timestamp for edge latencies (default: 30 minutes before end_time)."
+                    },
+                    "end_time": {
+                        "type": "string",
+                        "description": "ISO 8601 end timestamp for edge latencies (default: current time)."
+                    }
+                },
+                "required": []
+            }
+        ),
+        
+        Tool(
+            name="get_blast_radius",
+            description="""
+Find everything that depends on one or more interfaces, and how much user traffic is at stake if they degrade.
+
+PURPOSE:
+Answers "if X is slow or down, who is affected?" (e.g., X = `Tix-Tyrion::Mongo::find`) in ONE call, instead of walking upstream with get_interface_details hop by hop.
+
+HOW IT WORKS:
+- Walks in_in edges BACKWARDS from the target interface(s): callers, their callers, and so on
+- Every External::INBOUND entry point reached is weighted by the QPM it sends into the affected region
+- Entry points are ranked by that affected QPM, so the most user-visible impact comes first
+- With sync_only, only SYNC edges are followed (callers that block on the target)
+
+HOW TO READ THE RESULT:
+- Affected entry points: who your users are, and how much of their traffic touches the degraded interfaces
+- Direct callers: the first hop upstream, highest QPM first
+- Hops: how far upstream an entry point is from the nearest target
+
+Use get_critical_path on a top entry point to see whether the target sits on its slowest chain.
+            """,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "interface_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Degraded interfaces (e.g., ['Tix-Tyrion::Mongo::find'])."
+                    },
+                    "interface_id": {
+                        "type": "string",
+                        "description": "A single degraded interface (alternative to interface_ids)."
+                    },
+                    "version": {
+                        "type": "string",
+                        "description": "Version ID returned from get_systems_and_interfaces (default: latest snapshot)."
+                    },
+                    "sync_only": {
+                        "type": "boolean",
+                        "description": "Follow only SYNC edges (default: false)."
+                    },
+                    "top": {
+                        "type": "integer",
+                        "description": "Number of entry points and direct callers to list (default: 10)."
+                    },
+                    "start_time": {
+                        "type": "string",
+                        "description": "ISO 8601 start timestamp for edge QPM (default: 30 minutes before end_time)."
+                    },
+                    "end_time": {
+                        "type": "string",
+                        "description": "ISO 8601 end timestamp for edge QPM (default: current time)."
+                    }
+                },
+                "required": []
+            }
+        ),
+        
+        Tool(
+            name="diff_snapshots",
+            description="""
+Show what changed in the system between two points in time (or two snapshot versions), as one compact delta.
+
+PURPOSE:
+Answers "what changed between 10:00 and 11:00?" without fetching two full directories with get_systems_and_interfaces and comparing them yourself.
+
+WHAT YOU GET:
+- Added and removed system units, interfaces and in_in edges (with counts)
+- For edges present in BOTH snapshots: QPM, error and p99 before → after, largest relative change first
+- Metrics for each side come from the window (default 30 minutes) ending at that side's time
+
+TIPS:
+- Pass from_timestamp (and optionally to_timestamp; default: now / latest snapshot)
+- Versions (e.g. from get_systems_and_interfaces) can be used instead of timestamps while they are still cached; metric deltas are only computed when each version also comes with its timestamp
+- Follow up with get_interface_details on added or changed interfaces, or get_blast_radius on removed ones
+            """,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "from_timestamp": {
+                        "type": "string",
+                        "description": "ISO 8601 time of the older snapshot (e.g., '2025-09-20T10:00:00Z')."
+                    },
+                    "to_timestamp": {
+                        "type": "string",
+                        "description": "ISO 8601 time of the newer snapshot (default: latest snapshot, metrics ending now)."
+                    },
+                    "from_version": {
+                        "type": "string",
+                        "description": "Version ID of the older snapshot (must have been loaded recently). Without from_timestamp, metrics are not compared."
+                    },
+                    "to_version": {
+                        "type": "string",
+                        "description": "Version ID of the newer snapshot (must have been loaded recently). Without to_timestamp, metrics are not compared."
+                    },
+                    "window_minutes": {
+                        "type": "integer",
+                        "description": "Length of the metrics window ending at each snapshot's time (default: 30)."
+                    },
+                    "top": {
+                        "type": "integer",
+                        "description": "Maximum IDs listed per added/removed section and changed edges listed (default: 25)."
+                    }
+                },
+                "required": []
+            }
+        ),
+        
+        Tool(
+            name="rank_metrics",
+            description="""
+Rank edges, interfaces or system units by one metric, with optional filters: a "top N" over the whole domain in one call.
+
+PURPOSE:
+Answers "which 20 edges have the worst p99?" or "which interfaces with real traffic have the highest error rate?" without scanning get_systems_and_interfaces output by hand. Scales to domains with 100k+ edges.
+
+METRICS (for sort_by and where):
+- qpm: Queries per minute
+- errors_total, errors_4xx, errors_5xx: Error rates in %
+- p50, p90, p95, p99: Latency percentiles in ms
+
+EXAMPLES:
+- Slowest edges: {"sort_by": "p99"}
+- Most failing interfaces with traffic: {"item_type": "interfaces", "sort_by": "errors_5xx", "where": {"qpm": {"min": 10}}}
+- Busiest edges into one system: {"sort_by": "qpm", "id_contains": "->Tix-Tyrion::"}
+
+Items without a value for sort_by are left out. Follow up with get_interface_details or get_blast_radius on the top entries.
+            """,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "item_type": {
+                        "type": "string",
+                        "enum": list(OVERLAY_CATEGORIES),
+                        "description": "What to rank (default: edges). Edges of every kind are ranked: in_in edges are shown as 'A->B', the others keep their prefix (e.g., 'ss_in:ss:KAFKA::topic->X', 'su_su:su:A->su:B'); use id_contains to narrow them."
+                    },
+                    "sort_by": {
+                        "type": "string",
+                        "enum": ["qpm", "errors_total", "errors_4xx", "errors_5xx", "p50", "p90", "p95", "p99"],
+                        "description": "Metric to rank by (default: p99)."
+                    },
+                    "descending": {
+                        "type": "boolean",
+                        "description": "Highest values first (default: true); false ranks the lowest first."
+                    },
+                    "where": {
+                        "type": "object",
+                        "description": "Filters as metric -> {\"min\": value, \"max\": value}, both inclusive (e.g., {\"qpm\": {\"min\": 10}}).",
+                        "additionalProperties": {
+                            "type": "object",
+                            "properties": {
+                                "min": {"type": "number"},
+                                "max": {"type": "number"}
+                            }
+                        }
+                    },
+                    "id_contains": {
+                        "type": "string",
+                        "description": "Only items whose ID contains this text (e.g., a system unit name)."
+                    },
+                    "top": {
+                        "type": "integer",
+                        "description": "Number of items to list (default: 20, max: 500)."
+                    },
+                    "version": {
+                        "type": "string",
+                        "description": "Version ID returned from get_systems_and_interfaces (default: latest snapshot)."
+                    },
+                    "start_time": {
+                        "type": "string",
+                        "description": "ISO 8601 start timestamp for metrics (default: 30 minutes before end_time)."
+                    },
+                    "end_time": {
+                        "type": "string",
+                        "description": "ISO 8601 end timestamp for metrics (default: current time)."
+                    }
+                },
+                "required": []
+            }
         )
     ]
 
@@ -728,56 +966,32 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.T
     base_url = os.getenv("CK_NEXUS_ENDPOINT", DEFAULT_BASE_URL)
     
     try:
-        if name == "get_systems_and_interfaces":
-            result_text = await get_systems_and_interfaces_impl(arguments, base_url)
-            return [types.TextContent(type="text", text=result_text)]
-        
-        elif name == "get_interface_details":
-            result_text = await get_interface_details_impl(arguments, base_url)
-            return [types.TextContent(type="text", text=result_text)]
-        
-        elif name == "get_code_details_for_api":
-            result_text = await get_code_details_for_api_impl(arguments, base_url)
-            return [types.TextContent(type="text", text=result_text)]
-        
-        else:
+        tool_chunks = TOOL_CHUNKS.get(name)
+        if tool_chunks is None:
             raise ValueError(f"Unknown tool: {name}")
-            
+        result_text = "".join(await tool_chunks(arguments, base_url))
     except Exception as e:
-        logger.error(f"Error handling tool {name}: {str(e)}")
-        error_msg = str(e)
-        
-        # Provide helpful context for common errors
-        if "empty response" in error_msg.lower() or "system unit" in error_msg.lower():
-            error_msg = f"""
-❌ **Error analyzing interface**: {error_msg}
-
-**How to fix this:**
-1. Use `get_systems_and_interfaces` first to get the list of interfaces
-2. Look in the **INTERFACES** section (not SYSTEM UNITS)
-3. Copy an interface name that does NOT start with "su:" (system unit prefix)
-4. Use that interface name with `get_interface_details`
-
-**Example of valid interface names:**
-- `Tix-Winterfell::App::POST::/review/edit`
-- `KAFKA::review_moderation`
-- `External::INBOUND::APP_ANDROID_USER`
+        result_text = format_tool_error(name, e)
+    
+    return [types.TextContent(type="text", text=result_text)]
 
-**Invalid (these are system units):**
-- ❌ `su:Tix-Eyrie-V2::App`
-- ❌ `su:Tix-Raven::App`
 
-Call `get_systems_and_interfaces` again to see the complete list of valid interfaces.
-"""
-        
-        return [types.TextContent(type="text", text=error_msg)]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the background refresher, and release pooled upstream connections on shutdown"""
+    if REFRESHER_ENABLED:
+        refresher.start()
+    yield
+    await refresher.stop()
+    await graph_client.aclose()
 
 
 # FastAPI app for HTTP transport
 app = FastAPI(
     title="Graph Analysis MCP Server",
     description="Remote MCP server for distributed system graph analysis over HTTP",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -837,12 +1051,18 @@ class MCPJSONRPCHandler:
                 ]}
             
             elif method == "tools/call":
-                tool_result = await self.handle_tool_call(
-                    params.get("name"), 
-                    params.get("arguments", {}),
-                    base_url,
-                    domain
-                )
+                # Breakdown of this call alone (it also adds to the whole request's, if any)
+                call_timings = graph_telemetry.RequestTimings(parent=graph_telemetry.request_timings.get())
+                timings_token = graph_telemetry.request_timings.set(call_timings)
+                try:
+                    tool_result = await self.handle_tool_call(
+                        params.get("name"), 
+                        params.get("arguments", {}),
+                        base_url,
+                        domain
+                    )
+                finally:
+                    graph_telemetry.request_timings.reset(timings_token)
                 result = {"content": [
                     {
                         "type": content.type,
@@ -850,6 +1070,12 @@ class MCPJSONRPCHandler:
                     }
                     for content in tool_result
                 ]}
+                if _timings_requested(params):
+                    result["_meta"] = {"timings": call_timings.as_dict()}
+            
+            elif method == "notifications/initialized":
+                # Client acknowledgement after initialize; nothing to do
+                result = {}
             
             elif method == "resources/list":
                 # We don't have resources, return empty list
@@ -870,40 +1096,156 @@ class MCPJSONRPCHandler:
             
         except Exception as e:
             logger.error(f"Error handling request: {str(e)}")
-            return {
-                "jsonrpc": "2.0",
-                "id": request_data.get("id"),
-                "error": {
-                    "code": -1,
-                    "message": str(e)
-                }
-            }
+            return _rpc_error(request_data.get("id"), -1, str(e))
+    
+    async def handle_batch(self, batch: List[Any], base_url: str = DEFAULT_BASE_URL,
+                           domain: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Handle a JSON-RPC batch array.
+        
+        The calls do not depend on each other, so they run concurrently. Responses come back in
+        the order of the requests; notifications (requests without an id) are executed but get
+        no response, so an all-notification batch returns an empty list.
+        
+        The caller validates the array itself (non-empty, at most MAX_RPC_BATCH_SIZE entries).
+        """
+        async def handle_one(request_data: Any) -> Optional[Dict[str, Any]]:
+            if not isinstance(request_data, dict):
+                return _rpc_error(None, -32600, "Invalid Request: batch entries must be objects")
+            response = await self.handle_request(request_data, base_url, domain)
+            return response if "id" in request_data else None
+        
+        responses = await asyncio.gather(*(handle_one(request_data) for request_data in batch))
+        return [response for response in responses if response is not None]
     
     async def handle_tool_call(self, name: str, arguments: Dict[str, Any], base_url: str, domain: Optional[str] = None) -> List[types.TextContent]:
         """Handle tool calls with base_url and domain parameters"""
-        try:
-            if name == "get_systems_and_interfaces":
-                result_text = await get_systems_and_interfaces_impl(arguments, base_url, domain)
-                return [types.TextContent(type="text", text=result_text)]
-            
-            elif name == "get_interface_details":
-                result_text = await get_interface_details_impl(arguments, base_url, domain)
-                return [types.TextContent(type="text", text=result_text)]
-            
-            elif name == "get_code_details_for_api":
-                result_text = await get_code_details_for_api_impl(arguments, base_url, domain)
-                return [types.TextContent(type="text", text=result_text)]
-            
-            else:
-                raise ValueError(f"Unknown tool: {name}")
+        tool = _tool_label(name)
+        with graph_telemetry.track_tool_call(tool) as call:
+            try:
+                chunks = await self.tool_call_chunks(name, arguments, base_url, domain)
+                with graph_telemetry.span("format", graph_telemetry.TOOL_RENDER_SECONDS, tool=tool):
+                    result_text = "".join(chunks)
+            except Exception as e:
+                call.status = "error"
+                result_text = format_tool_error(name, e)
+            call.size = len(result_text)
+        
+        return [types.TextContent(type="text", text=result_text)]
+    
+    async def tool_call_chunks(self, name: str, arguments: Dict[str, Any], base_url: str,
+                               domain: Optional[str] = None) -> Iterator[str]:
+        """
+        Run a tool's upstream fetches and return its response as lazily rendered chunks.
+        
+        Raises:
+            ValueError: If the tool is unknown
+            Exception: Whatever the tool raises, while fetching or while its chunks are rendered
+        """
+        tool_chunks = TOOL_CHUNKS.get(name)
+        if tool_chunks is None:
+            raise ValueError(f"Unknown tool: {name}")
+        refresher.touch(base_url, graph_api_client._resolve_domain(domain, None))
+        return await tool_chunks(arguments, base_url, domain)
+    
+    async def stream_tool_call(self, request_data: Dict[str, Any], base_url: str = DEFAULT_BASE_URL,
+                               domain: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Handle a tools/call request as a server-sent event stream.
+        
+        While the upstream fetches run, every finished step is sent as a notifications/progress
+        event (when the request carries params._meta.progressToken). The JSON-RPC response is
+        then sent as the final event, written out while the report is still being rendered, so
+        the client receives the first bytes of a large report long before it is complete.
+        
+        Yields:
+            SSE-formatted text
+        """
+        params = request_data.get("params") or {}
+        name = params.get("name")
+        progress_token = (params.get("_meta") or {}).get("progressToken")
+        timings = graph_telemetry.RequestTimings()
+        events: asyncio.Queue = asyncio.Queue()
+        step = 0
+        
+        def on_progress(message: str):
+            nonlocal step
+            step += 1
+            if progress_token is not None:
+                events.put_nowait(_sse_event({
+                    "jsonrpc": "2.0",
+                    "method": "notifications/progress",
+                    "params": {"progressToken": progress_token, "progress": step, "message": message}
+                }))
+        
+        async def fetch() -> Iterator[str]:
+            graph_api_client.progress_listener.set(on_progress)
+            graph_telemetry.request_timings.set(timings)
+            return await self.tool_call_chunks(name, params.get("arguments", {}), base_url, domain)
+        
+        with graph_telemetry.track_tool_call(_tool_label(name)) as call:
+            task = asyncio.ensure_future(fetch())
+            task.add_done_callback(lambda _: events.put_nowait(None))
+            try:
+                while (event := await events.get()) is not None:
+                    yield event
+                try:
+                    chunks = task.result()
+                except Exception as e:
+                    call.status = "error"
+                    chunks = iter([format_tool_error(name, e)])
                 
-        except Exception as e:
-            logger.error(f"Error handling tool {name}: {str(e)}")
-            error_msg = str(e)
-            
-            # Provide helpful context for common errors
-            if "empty response" in error_msg.lower() or "system unit" in error_msg.lower():
-                error_msg = f"""
+                # The response is one JSON-RPC message; its text is emitted piece by piece as
+                # JSON string contents (json.dumps escapes newlines, keeping the event on one line)
+                yield (f'event: message\ndata: {{"jsonrpc": "2.0", "id": {json.dumps(request_data.get("id"))}, '
+                       f'"result": {{"content": [{{"type": "text", "text": "')
+                call.size = 0
+                try:
+                    pieces = graph_render.batch_chunks(chunks)
+                    while True:
+                        # Only rendering counts as formatting, not the time the client takes to read
+                        started = time.perf_counter()
+                        piece = next(pieces, None)
+                        timings.add("format", time.perf_counter() - started)
+                        if piece is None:
+                            break
+                        call.size += len(piece)
+                        yield json.dumps(piece)[1:-1]
+                except Exception as e:
+                    call.status = "error"
+                    yield json.dumps("\n\n" + format_tool_error(name, e))[1:-1]
+                
+                meta = f', "_meta": {json.dumps({"timings": timings.as_dict()})}' if _timings_requested(params) else ""
+                yield f'"}}]{meta}}}}}\n\n'
+                _log_slow_request(timings, f"tools/call {name}", domain)
+            finally:
+                task.cancel()
+
+
+# Chunked implementation of each tool served over /gmcp. Tool calls are timed around these
+# (track_tool_call and the fetch/format spans in handle_tool_call and the streaming path),
+# so the functions themselves carry no instrumentation.
+TOOL_CHUNKS: Dict[str, Callable[[dict, str, Optional[str]], Awaitable[Iterator[str]]]] = {
+    "get_systems_and_interfaces": get_systems_and_interfaces_chunks,
+    "get_interface_details": get_interface_details_chunks,
+    "get_interfaces_details_batch": get_interfaces_details_batch_chunks,
+    "get_code_details_for_api": get_code_details_for_api_chunks,
+    "get_dependency_tree": get_dependency_tree_chunks,
+    "get_critical_path": get_critical_path_chunks,
+    "get_blast_radius": get_blast_radius_chunks,
+    "diff_snapshots": diff_snapshots_chunks,
+    "rank_metrics": rank_metrics_chunks,
+}
+
+
+def format_tool_error(name: str, e: Exception) -> str:
+    """Log a failed tool call and turn the error into the tool's response text."""
+    logger.error(f"Error handling tool {name}: {str(e)}")
+    error_msg = str(e)
+    
+    # Provide helpful context for common errors
+    if "empty response" in error_msg.lower() or "system unit" in error_msg.lower():
+        error_msg = f"""
 ❌ **Error analyzing interface**: {error_msg}
 
 **How to fix this:**
@@ -923,8 +1265,51 @@ class MCPJSONRPCHandler:
 
 Call `get_systems_and_interfaces` again to see the complete list of valid interfaces.
 """
-            
-            return [types.TextContent(type="text", text=error_msg)]
+    
+    return error_msg
+
+
+def _tool_label(name: Optional[str]) -> str:
+    """Tool name as a metric label (unknown names are grouped so clients cannot add series)."""
+    return name if name in TOOL_CHUNKS else "unknown"
+
+
+def _timings_requested(params: Dict[str, Any]) -> bool:
+    """Whether a tools/call result should carry its phase breakdown in _meta."""
+    return TIMING_META_ENABLED or bool((params.get("_meta") or {}).get("timings"))
+
+
+def _log_slow_request(timings: graph_telemetry.RequestTimings, label: str, domain: Optional[str]):
+    """Log one structured slow_request line if the request took longer than SLOW_REQUEST_MS."""
+    if timings.elapsed() * 1000 < SLOW_REQUEST_MS:
+        return
+    logger.warning(f"slow_request {json.dumps({'request': label, 'domain': domain, **timings.as_dict()})}")
+
+
+def _timed_response(response: Response, timings: graph_telemetry.RequestTimings, label: str,
+                    domain: Optional[str]) -> Response:
+    """Attach the Server-Timing header (if enabled) and log the request if it was slow."""
+    if TIMING_HEADER_ENABLED:
+        response.headers["Server-Timing"] = timings.server_timing()
+    _log_slow_request(timings, label, domain)
+    return response
+
+
+def _sse_event(message: Dict[str, Any]) -> str:
+    """Format a JSON-RPC message as a server-sent event."""
+    return f"event: message\ndata: {json.dumps(message)}\n\n"
+
+
+def _rpc_error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    """JSON-RPC error response."""
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {
+            "code": code,
+            "message": message
+        }
+    }
 
 
 # Global handler instance
@@ -933,34 +1318,84 @@ rpc_handler = MCPJSONRPCHandler()
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; "degraded" while any upstream circuit breaker is open"""
     # Get base_url from environment or use default
     graph_api_url = os.getenv("CK_NEXUS_ENDPOINT", DEFAULT_BASE_URL)
+    upstreams = graph_client.breaker_states()
+    degraded = any(upstream["state"] == "open" for upstream in upstreams.values())
     
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded else "healthy",
         "server": "graph-analysis-mcp-server",
         "version": "1.0.0",
         "protocol": "MCP over HTTP JSON-RPC",
-        "graph_api_url": graph_api_url
+        "graph_api_url": graph_api_url,
+        "upstreams": upstreams,
+        "upstream_scheduler": graph_client.scheduler.snapshot(),
+        "refresher": refresher.snapshot()
     }
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics: upstream and tool latency histograms, payload sizes and cache state"""
+    graph_telemetry.record_cache("snapshot", graph_client.snapshot_cache)
+    graph_telemetry.record_cache("metrics", graph_client.metrics_cache)
+    graph_telemetry.record_cache("directory", directory_cache)
+    return PlainTextResponse(graph_telemetry.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/gmcp")
 async def mcp_endpoint(request: Request):
     """Main MCP JSON-RPC endpoint"""
     # Get base_url and domain from headers (nginx upstream or MCP client can add these)
     base_url, domain = get_base_url_and_domain_from_headers(request)
+    timings = graph_telemetry.RequestTimings()
+    graph_telemetry.request_timings.set(timings)
     
     try:
         # Parse JSON-RPC request
         request_data = await request.json()
+        
+        if isinstance(request_data, list):
+            methods = [item.get("method", "unknown") if isinstance(item, dict) else "invalid" for item in request_data]
+            logger.info(f"Received MCP batch request: {methods}")
+            # An invalid batch as a whole gets a single error response, not an array
+            if not request_data:
+                return JSONResponse(content=_rpc_error(None, -32600, "Invalid Request: empty batch"))
+            if len(request_data) > MAX_RPC_BATCH_SIZE:
+                return JSONResponse(content=_rpc_error(
+                    None, -32600,
+                    f"Invalid Request: batch of {len(request_data)} exceeds the limit of {MAX_RPC_BATCH_SIZE}"
+                ))
+            responses = await rpc_handler.handle_batch(request_data, base_url, domain)
+            # A batch of notifications only gets no response body
+            if not responses:
+                return Response(status_code=202)
+            with graph_telemetry.span("serialize"):
+                http_response = JSONResponse(content=responses)
+            return _timed_response(http_response, timings, f"batch {methods}", domain)
+        
         logger.info(f"Received MCP request: {request_data.get('method', 'unknown')}")
         
+        # Streamable HTTP: tool calls from clients that accept an event stream get progress
+        # notifications and a progressively written response
+        if request_data.get("method") == "tools/call" and "text/event-stream" in request.headers.get("accept", ""):
+            return StreamingResponse(
+                rpc_handler.stream_tool_call(request_data, base_url, domain),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"}
+            )
+        
         # Handle the request with base_url and domain
         response = await rpc_handler.handle_request(request_data, base_url, domain)
         
-        return JSONResponse(content=response)
+        with graph_telemetry.span("serialize"):
+            http_response = JSONResponse(content=response)
+        label = request_data.get("method", "unknown")
+        if label == "tools/call":
+            label = f"tools/call {(request_data.get('params') or {}).get('name')}"
+        return _timed_response(http_response, timings, label, domain)
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON")
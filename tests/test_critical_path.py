@@ -0,0 +1,39 @@
+"""Tests for graph_analysis.critical_paths."""
+
+from graph_analysis import critical_paths
+from graph_model import GraphSnapshot, MetricsIndex, MetricsRecord
+
+# edge -> p99; the A->C chain is deeper but its first call is faster than A->B
+P99 = {
+    "A->B": 100.0, "B->D": 90.0, "D->A": 80.0,
+    "A->C": 60.0, "C->E": 55.0, "E->F": 50.0, "F->G": 45.0,
+}
+
+
+def _snapshot() -> GraphSnapshot:
+    edges = [f"in_in:{edge}" for edge in P99]
+    metadata = {edge: {"kind": "EDGE_SYNC"} for edge in edges}
+    return GraphSnapshot.from_sections("v", [], list("ABCDEFG"), [], edges, metadata)
+
+
+def _metrics() -> MetricsIndex:
+    records = {edge: MetricsRecord(1, 0, 0, 0, 1, 1, 1, p99) for edge, p99 in P99.items()}
+    return MetricsIndex("v", {"edges": records})
+
+
+def test_follows_the_slowest_call_and_reports_the_first_hop_as_total():
+    result = critical_paths(_snapshot(), ["A"], _metrics(), "p99")
+
+    path = result["paths"][0]
+    assert [hop["edge_display"] for hop in path["hops"]] == ["A->B", "B->D"]
+    # Inclusive latencies: nested time is not added up
+    assert path["total_latency"] == 100.0
+    # D->A leads back into the chain
+    assert result["cycle_edges"] == 1
+
+
+def test_edges_without_latency_are_not_followed():
+    result = critical_paths(_snapshot(), ["A", "missing"], None, "p99")
+
+    assert all(not path["hops"] and path["total_latency"] == 0.0 for path in result["paths"])
+    assert not result["paths"][1]["found"]
@@ -0,0 +1,134 @@
+"""Chunk-boundary fuzz tests for graph_stream.GraphSnapshotParser."""
+
+import json
+import random
+
+import pytest
+
+from graph_model import GraphSnapshot
+from graph_stream import GraphSnapshotParser, parse_graph_snapshot
+
+NAMES = ["Tix-Tyrion::App", "KAFKA::topic", "External::INBOUND::WEB", "ünïcödé::svc", 'quo"te\\slash', "tab\tnew\nline"]
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(NAMES)}{rng.randrange(50)}"
+
+
+def _junk(rng: random.Random, depth: int = 0):
+    """A random JSON value the parser has to skip."""
+    kind = rng.randrange(8 if depth < 3 else 5)
+    if kind == 0:
+        return rng.choice([True, False, None])
+    if kind == 1:
+        return rng.randrange(-10 ** 6, 10 ** 6)
+    if kind == 2:
+        return rng.uniform(-1e6, 1e6)
+    if kind == 3:
+        return _name(rng) * rng.randrange(1, 4)
+    if kind == 4:
+        return ""
+    if kind == 5:
+        return [_junk(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {_name(rng): _junk(rng, depth + 1) for _ in range(rng.randrange(4))}
+
+
+def _graph_data(rng: random.Random, edge_count: int) -> dict:
+    interfaces = sorted({_name(rng) for _ in range(edge_count)})
+    edges, lookup = [], {}
+    for _ in range(edge_count):
+        source, target = rng.choice(interfaces), rng.choice(interfaces)
+        edge_id = f"{rng.choice(['in_in', 'ss_in', 'su_su'])}:{source}->{target}"
+        edges.append(edge_id)
+        if rng.random() < 0.8:
+            metadata = {"kind": rng.choice(["EDGE_SYNC", "EDGE_ASYNC"]), "extra": _junk(rng)}
+            if rng.random() < 0.3:
+                metadata.update(sourceId=source, targetId=target)
+            lookup[edge_id] = metadata
+    data = {
+        "domainName": _junk(rng),
+        "lookupData": {"subsytems": _junk(rng), "edges": lookup, "nodes": _junk(rng)},
+        "baseTimelineGraph": {
+            "systemunits": [f"su:{_name(rng)}" for _ in range(rng.randrange(5))],
+            "interfaces": interfaces,
+            "subsystems": [f"ss:{_name(rng)}" for _ in range(rng.randrange(3))],
+            "edges": edges,
+            "other": _junk(rng),
+        },
+        "version": f"demo--{rng.randrange(1000)}",
+        "trailer": _junk(rng),
+    }
+    keys = list(data)
+    rng.shuffle(keys)
+    return {key: data[key] for key in keys}
+
+
+def _chunks(rng: random.Random, body: bytes, max_size: int):
+    """Split a body at random byte offsets (including inside multi-byte characters)."""
+    position = 0
+    while position < len(body):
+        size = rng.randrange(1, max_size + 1)
+        yield body[position:position + size]
+        position += size
+
+
+def _signature(graph: GraphSnapshot) -> tuple:
+    return (graph.version, graph.system_units, graph.interfaces, graph.subsystems, graph.node_ids, graph.edge_ids,
+            list(graph.edge_source), list(graph.edge_target), list(graph.edge_sync))
+
+
+def _parse(chunks) -> GraphSnapshot:
+    parser = GraphSnapshotParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_json_loads_at_any_chunk_boundary(seed):
+    rng = random.Random(seed)
+    body = json.dumps(_graph_data(rng, rng.randrange(1, 40)), ensure_ascii=rng.random() < 0.5,
+                      indent=rng.choice([None, 1])).encode()
+    expected = _signature(GraphSnapshot.from_graph_data(json.loads(body)))
+
+    for max_size in (1, 7, 64, len(body)):
+        assert _signature(_parse(_chunks(rng, body, max_size))) == expected
+
+
+def test_large_body_survives_buffer_compaction():
+    rng = random.Random(1)
+    body = json.dumps(_graph_data(rng, 3000)).encode()
+    assert len(body) > 4 * 64 * 1024
+    expected = _signature(GraphSnapshot.from_graph_data(json.loads(body)))
+
+    assert _signature(_parse(_chunks(rng, body, 4096))) == expected
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_rejects_what_json_loads_rejects(seed):
+    rng = random.Random(seed)
+    body = json.dumps(_graph_data(rng, rng.randrange(1, 10)))
+    # Delete or replace one character, or cut the body short (an empty body is not an error)
+    position = rng.randrange(1, len(body))
+    mutation = rng.randrange(3)
+    if mutation == 0:
+        body = body[:position] + body[position + 1:]
+    elif mutation == 1:
+        body = body[:position] + rng.choice(',:]}"x0 ') + body[position + 1:]
+    else:
+        body = body[:position]
+    try:
+        json.loads(body)
+    except ValueError:
+        with pytest.raises(ValueError):
+            _parse(_chunks(rng, body.encode(), rng.choice([1, 16, 1024])))
+
+
+@pytest.mark.parametrize("body", [b'{"a":}', b'{"a":1,"b":}', b'{"a":[1,]}', b'{"a":tru}', b'{"a":01}'])
+def test_rejects_invalid_scalars(body):
+    with pytest.raises(ValueError):
+        parse_graph_snapshot([body])
+
+
+def test_empty_body_is_reported_as_empty():
+    assert parse_graph_snapshot([b"", b"  \n"]) is None
@@ -0,0 +1,47 @@
+"""Tests for the overlay category names shared by the directory renderer and the ranking tool."""
+
+import asyncio
+
+import pytest
+
+import graph_render
+from graph_api_client import AsyncGraphAPIClient
+from graph_model import INTERFACES, SYSTEM_UNITS, MetricsIndex
+
+UNIT = "Orders::App"
+INTERFACE = "Orders::App::GET::/orders"
+METRICS = {"t": {"qpm": 120}, "l": {"0.5": 12, "0.9": 30, "0.95": 40, "0.99": 87}}
+
+
+def _overlay(unit_category: str) -> dict:
+    return {"tickResponse": {"v": {unit_category: {UNIT: METRICS}, "interfaces": {INTERFACE: METRICS}}}}
+
+
+def _rank(index: MetricsIndex, item_type: str) -> dict:
+    client = AsyncGraphAPIClient()
+
+    async def get_metrics_index(*args, **kwargs):
+        return index
+
+    client.get_metrics_index = get_metrics_index
+    return asyncio.run(client.get_metric_ranking(item_type, version="v", base_url="http://nexus", domain="d"))
+
+
+@pytest.mark.parametrize("unit_category", ["system_units", "systemunits"])
+def test_directory_and_ranking_read_the_same_system_unit_metrics(unit_category):
+    index = MetricsIndex.from_metrics_data(_overlay(unit_category), "v")
+    systems_data = {"version": "v", "timestamp": "2025-09-20T12:00:00",
+                    "system_units": [UNIT], "interfaces": [INTERFACE]}
+
+    rendered = graph_render.render_systems_response(systems_data, index)
+    ranking = _rank(index, SYSTEM_UNITS)
+
+    assert f"`{UNIT}`\n    📊 QPM: 120," in rendered
+    assert f"`{INTERFACE}`\n    📊 QPM: 120," in rendered
+    assert [(row["id"], row["p99"]) for row in ranking["items"]] == [(UNIT, 87.0)]
+    assert len(index.table(INTERFACES)) == 1
+
+
+def test_ranking_rejects_an_unknown_category():
+    with pytest.raises(ValueError, match="Valid types: edges, interfaces, system_units"):
+        _rank(MetricsIndex("v", {}), "systemunits")
@@ -0,0 +1,201 @@
+"""Tests for graph_resilience: circuit breaker states and retries."""
+
+import asyncio
+
+import httpx
+import pytest
+
+import graph_resilience
+from graph_resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, call_with_resilience
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "http://nexus.test/demo/ui/graph-paths/all")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+def _run(breaker: CircuitBreaker, outcomes, idempotent: bool = True):
+    """Run call_with_resilience over attempts that raise or return the given outcomes in order."""
+    outcomes = list(outcomes)
+    calls, delays = [], []
+
+    async def attempt():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    async def sleep(delay: float):
+        delays.append(delay)
+
+    async def main():
+        return await call_with_resilience(breaker, "graph-paths/all", attempt, idempotent, sleep=sleep)
+
+    try:
+        result = asyncio.run(main())
+    except BaseException as e:
+        result = e
+    return result, len(calls), delays
+
+
+@pytest.fixture(autouse=True)
+def two_retries(monkeypatch):
+    monkeypatch.setattr(graph_resilience, "RETRY_ATTEMPTS", 2)
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    clock = FakeClock()
+    breaker = CircuitBreaker("nexus", failure_threshold=3, reset_seconds=30, clock=clock)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.snapshot()["retry_in_seconds"] == 1.0
+
+
+def test_half_open_probe_success_closes_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("nexus", failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+    breaker.before_call()
+
+
+def test_half_open_probe_failure_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("nexus", failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.opened_at == clock.now
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_released_probe_lets_the_next_call_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker("nexus", failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+@pytest.mark.parametrize("status", [502, 503, 504])
+def test_idempotent_call_is_retried_on_gateway_errors(status):
+    breaker = CircuitBreaker("nexus", failure_threshold=10)
+    result, calls, delays = _run(breaker, [_status_error(status), _status_error(status), "ok"])
+
+    assert result == "ok"
+    assert calls == 3
+    assert len(delays) == 2
+    assert breaker.state == CLOSED and breaker.consecutive_failures == 0
+
+
+def test_idempotent_call_is_retried_on_transport_errors():
+    breaker = CircuitBreaker("nexus", failure_threshold=10)
+    result, calls, _ = _run(breaker, [httpx.ConnectError("refused"), httpx.ReadTimeout("slow"), "ok"])
+
+    assert result == "ok"
+    assert calls == 3
+
+
+def test_retries_are_bounded():
+    breaker = CircuitBreaker("nexus", failure_threshold=10)
+    result, calls, _ = _run(breaker, [_status_error(503)] * 5)
+
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert calls == 3
+    assert breaker.consecutive_failures == 3
+
+
+def test_non_idempotent_call_is_not_retried():
+    breaker = CircuitBreaker("nexus", failure_threshold=10)
+    result, calls, delays = _run(breaker, [_status_error(503), "ok"], idempotent=False)
+
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert calls == 1
+    assert delays == []
+
+
+@pytest.mark.parametrize("status", [500, 501])
+def test_other_5xx_count_as_failures_but_are_not_retried(status):
+    breaker = CircuitBreaker("nexus", failure_threshold=10)
+    result, calls, _ = _run(breaker, [_status_error(status), "ok"])
+
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert calls == 1
+    assert breaker.consecutive_failures == 1
+
+
+@pytest.mark.parametrize("status", [400, 404, 429])
+def test_4xx_counts_as_success_and_is_not_retried(status):
+    breaker = CircuitBreaker("nexus", failure_threshold=2)
+    breaker.before_call()
+    breaker.record_failure()
+
+    result, calls, _ = _run(breaker, [_status_error(status), "ok"])
+
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert calls == 1
+    assert breaker.state == CLOSED and breaker.consecutive_failures == 0
+
+
+def test_retries_stop_once_the_breaker_opens():
+    breaker = CircuitBreaker("nexus", failure_threshold=2)
+    result, calls, _ = _run(breaker, [_status_error(503)] * 3)
+
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert calls == 2
+    assert breaker.state == OPEN
+
+
+def test_cancelled_probe_is_released():
+    clock = FakeClock()
+    breaker = CircuitBreaker("nexus", failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 30
+
+    result, calls, _ = _run(breaker, [asyncio.CancelledError()])
+
+    assert isinstance(result, asyncio.CancelledError)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
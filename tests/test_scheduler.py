@@ -0,0 +1,118 @@
+"""Tests for graph_scheduler.TenantScheduler."""
+
+import asyncio
+
+import pytest
+
+from graph_scheduler import TenantScheduler
+
+A = ("http://nexus.test", "a")
+B = ("http://nexus.test", "b")
+
+
+async def _hold(scheduler: TenantScheduler, tenant, release: asyncio.Event, log: list, name: str):
+    async with scheduler.slot(tenant):
+        log.append(name)
+        await release.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_per_tenant_limit_caps_one_tenant():
+    async def main():
+        scheduler = TenantScheduler(max_concurrency=10, per_tenant_limit=2)
+        release = asyncio.Event()
+        admitted = []
+        tasks = [asyncio.ensure_future(_hold(scheduler, A, release, admitted, f"a{i}")) for i in range(5)]
+        tasks.append(asyncio.ensure_future(_hold(scheduler, B, release, admitted, "b0")))
+        await _settle()
+
+        # A is capped at 2 while B still gets a slot
+        assert sorted(admitted) == ["a0", "a1", "b0"]
+        assert scheduler.snapshot()["in_flight"] == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(admitted) == 6
+        assert scheduler.snapshot() == {"in_flight": 0, "max_concurrency": 10, "per_tenant_limit": 2, "tenants": []}
+
+    asyncio.run(main())
+
+
+def test_freed_slots_go_round_robin_to_waiting_tenants():
+    async def main():
+        scheduler = TenantScheduler(max_concurrency=1, per_tenant_limit=10)
+        order = []
+
+        async def call(tenant, name: str):
+            async with scheduler.slot(tenant):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        holder_release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(scheduler, A, holder_release, order, "holder"))
+        await _settle()
+        # A bursts four calls before B queues two
+        tasks = [asyncio.ensure_future(call(A, f"a{i}")) for i in range(4)]
+        await _settle()
+        tasks += [asyncio.ensure_future(call(B, f"b{i}")) for i in range(2)]
+        await _settle()
+
+        holder_release.set()
+        await asyncio.gather(holder, *tasks)
+        assert order == ["holder", "a0", "b0", "a1", "b1", "a2", "a3"]
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        scheduler = TenantScheduler(max_concurrency=1, per_tenant_limit=1)
+        release = asyncio.Event()
+        admitted = []
+        holder = asyncio.ensure_future(_hold(scheduler, A, release, admitted, "holder"))
+        await _settle()
+        waiter = asyncio.ensure_future(_hold(scheduler, B, release, admitted, "waiter"))
+        await _settle()
+        assert scheduler.snapshot()["tenants"][1]["queued"] == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert [tenant["queued"] for tenant in scheduler.snapshot()["tenants"]] == [0]
+
+        release.set()
+        await holder
+        assert scheduler.snapshot()["in_flight"] == 0
+        assert admitted == ["holder"]
+
+    asyncio.run(main())
+
+
+def test_waiter_cancelled_after_being_granted_hands_the_slot_on():
+    async def main():
+        scheduler = TenantScheduler(max_concurrency=1, per_tenant_limit=1)
+        admitted = []
+        holder = scheduler.slot(A)
+        await holder.__aenter__()
+        granted = asyncio.ensure_future(_hold(scheduler, B, asyncio.Event(), admitted, "granted"))
+        later_release = asyncio.Event()
+        later = asyncio.ensure_future(_hold(scheduler, B, later_release, admitted, "later"))
+        await _settle()
+
+        # Releasing grants the slot to the first waiter, which is cancelled before it runs
+        await holder.__aexit__(None, None, None)
+        granted.cancel()
+        await _settle()
+
+        assert granted.cancelled()
+        assert admitted == ["later"]
+        assert scheduler.snapshot()["in_flight"] == 1
+        later_release.set()
+        await later
+        assert scheduler.snapshot()["in_flight"] == 0
+
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Tests for graph_api_client.SingleFlight."""
+
+import asyncio
+
+import pytest
+
+from graph_api_client import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def main():
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return object()
+
+        results = await asyncio.gather(*(single_flight.do("k", work) for _ in range(5)))
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert single_flight.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_cancelling_one_waiter_keeps_the_call_for_the_others():
+    async def main():
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return 42
+
+        first = asyncio.ensure_future(single_flight.do("k", work))
+        second = asyncio.ensure_future(single_flight.do("k", work))
+        await asyncio.sleep(0)
+        assert single_flight.waiters("k") == 2
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert single_flight.waiters("k") == 1
+
+        release.set()
+        assert await second == 42
+
+    asyncio.run(main())
+
+
+def test_caller_joining_after_last_waiter_cancelled_starts_a_fresh_call():
+    async def main():
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                # Finish cancelling only after the next caller has arrived
+                await asyncio.sleep(0.01)
+                raise
+            return 42
+
+        first = asyncio.ensure_future(single_flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        async def joiner():
+            await asyncio.sleep(0)
+            return await single_flight.do("k", work)
+
+        second = asyncio.ensure_future(joiner())
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == 42
+        assert calls == 2
+
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""Tests for graph_analysis.snapshot_diff and AsyncGraphAPIClient.get_snapshot_diff."""
+
+import asyncio
+
+from graph_analysis import snapshot_diff
+from graph_api_client import AsyncGraphAPIClient
+from graph_model import GraphSnapshot, MetricsIndex, MetricsRecord
+
+
+def _snapshot(version: str, units, interfaces, edges) -> GraphSnapshot:
+    edge_ids = [f"in_in:{edge}" for edge in edges]
+    metadata = {edge: {"kind": "EDGE_SYNC"} for edge in edge_ids}
+    return GraphSnapshot.from_sections(version, units, interfaces, [], edge_ids, metadata)
+
+
+BEFORE = _snapshot("v1", ["S1", "S2"], ["A", "B", "C"], ["A->B", "B->C"])
+AFTER = _snapshot("v2", ["S2", "S3", "S4"], ["A", "B", "D"], ["A->B", "B->D"])
+
+
+def _record(qpm=None, p99=None) -> MetricsRecord:
+    return MetricsRecord(qpm, 0, 0, 0, None, None, None, p99)
+
+
+def test_topology_counts():
+    diff = snapshot_diff(BEFORE, AFTER)
+
+    assert diff["system_units"] == {"added": ["S3", "S4"], "removed": ["S1"],
+                                    "added_count": 2, "removed_count": 1, "unchanged_count": 1}
+    assert (diff["interfaces"]["added"], diff["interfaces"]["removed"]) == (["D"], ["C"])
+    assert diff["interfaces"]["unchanged_count"] == 2
+    assert diff["edges"] == {"added": ["B->D"], "removed": ["B->C"],
+                             "added_count": 1, "removed_count": 1, "unchanged_count": 1}
+    # No overlays: no metric comparison
+    assert diff["changed_edges"] == [] and diff["changed_edge_count"] == 0
+
+
+def test_lists_are_cut_to_top_but_counts_are_not():
+    diff = snapshot_diff(BEFORE, AFTER, top=1)
+
+    assert diff["system_units"]["added"] == ["S3"]
+    assert diff["system_units"]["added_count"] == 2
+
+
+def test_metric_reported_on_one_side_only_scores_one():
+    before_metrics = MetricsIndex("v1", {"edges": {"A->B": _record(qpm=10)}})
+    after_metrics = MetricsIndex("v2", {"edges": {"A->B": _record(qpm=10, p99=250)}})
+
+    diff = snapshot_diff(BEFORE, AFTER, before_metrics, after_metrics)
+    change = diff["changed_edges"][0]
+    assert change["edge"] == "A->B"
+    assert change["score"] == 1.0
+    assert change["metrics"]["p99"] == {"before": None, "after": 250, "delta": None}
+    assert change["metrics"]["qpm"]["delta"] == 0
+    assert diff["changed_edge_count"] == 1
+
+
+class _DiffClient(AsyncGraphAPIClient):
+    """Serves the two snapshots without an upstream and records overlay requests."""
+
+    def __init__(self):
+        super().__init__()
+        self.overlay_versions = []
+
+    async def _cached_version(self, base_url, domain, version):
+        return {"v1": BEFORE, "v2": AFTER}.get(version)
+
+    async def get_graph_snapshot(self, base_url=None, domain=None, time_epoch=None, headers=None):
+        return AFTER
+
+    async def get_metrics_index(self, version, start_time=None, end_time=None, base_url=None, domain=None,
+                                headers=None, node_id=None):
+        self.overlay_versions.append(version)
+        return MetricsIndex(version, {})
+
+
+def test_version_only_side_skips_the_metric_comparison():
+    client = _DiffClient()
+
+    result = asyncio.run(client.get_snapshot_diff(from_version="v1", to_timestamp="2025-09-20T12:00:00",
+                                                  base_url="http://nexus", domain="d"))
+
+    assert result["metrics_compared"] is False
+    assert result["from"] == {"version": "v1", "timestamp": None}
+    assert result["to"]["version"] == "v2"
+    assert client.overlay_versions == []
+    assert result["edges"]["added"] == ["B->D"]
+
+
+def test_timestamps_on_both_sides_compare_metrics():
+    client = _DiffClient()
+
+    result = asyncio.run(client.get_snapshot_diff(from_version="v1", from_timestamp="2025-09-20T11:00:00",
+                                                  to_timestamp="2025-09-20T12:00:00",
+                                                  base_url="http://nexus", domain="d"))
+
+    assert result["metrics_compared"] is True
+    assert result["from"]["timestamp"].startswith("2025-09-20T11:00:00")
+    assert sorted(client.overlay_versions) == ["v1", "v2"]
@@ -0,0 +1,139 @@
+"""Tests for graph_store.SnapshotStore."""
+
+import asyncio
+import itertools
+import sqlite3
+import threading
+
+import pytest
+
+import graph_store
+from graph_model import GraphSnapshot, MetricsIndex, MetricsRecord
+from graph_store import SnapshotStore
+
+URL = "http://nexus.test"
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch):
+    # Strictly increasing last_used stamps, so LRU order does not depend on clock resolution
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(graph_store.time, "time", lambda: float(next(ticks)))
+
+
+def _snapshot(version: str, size: int = 3) -> GraphSnapshot:
+    interfaces = [f"{version}::svc{i}" for i in range(size)]
+    edges = [f"in_in:{a}->{b}" for a, b in zip(interfaces, interfaces[1:])]
+    return GraphSnapshot.from_sections(version, ["su:x"], interfaces, [], edges,
+                                       {edge: {"kind": "EDGE_SYNC"} for edge in edges})
+
+
+def _metrics(version: str) -> MetricsIndex:
+    return MetricsIndex(version, {"edges": {"A->B": MetricsRecord(5, 1, 0, 1, 10, 20, 30, 40)}})
+
+
+def _count(store: SnapshotStore, table: str) -> int:
+    with sqlite3.connect(store.path) as connection:
+        return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_snapshot_round_trip_by_version_and_bucket(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.put_snapshot(URL, "demo", "demo--1", _snapshot("demo--1"), bucket=42)
+
+    loaded = store.get_snapshot(URL, "demo", "demo--1")
+    assert loaded.version == "demo--1"
+    assert loaded.interfaces == _snapshot("demo--1").interfaces
+    assert loaded.edge_ids == _snapshot("demo--1").edge_ids
+    assert store.get_snapshot_version(URL, "demo", 42) == "demo--1"
+    assert store.get_snapshot_version(URL, "demo", 43) is None
+    assert store.get_snapshot(URL, "other", "demo--1") is None
+
+
+def test_overlay_round_trip(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    metrics = _metrics("demo--1")
+    metrics.table("edges")
+    store.put_overlay(URL, "demo", "demo--1", 0, 60000, metrics, 1234)
+
+    loaded, size = store.get_overlay(URL, "demo", "demo--1", 0, 60000)
+    assert size == 1234
+    assert loaded.get("A->B", "edges").p99 == 40
+    # Derived tables are not stored, and are rebuilt on demand
+    assert len(loaded.table("edges")) == 1
+    assert store.get_overlay(URL, "demo", "demo--1", 0, 120000) is None
+
+
+def test_async_save_and_load(tmp_path):
+    async def main():
+        store = SnapshotStore(str(tmp_path))
+        store.save_snapshot(URL, "demo", "demo--1", _snapshot("demo--1"), 7)
+        store.save_overlay(URL, "demo", "demo--1", 0, 60000, _metrics("demo--1"), 10)
+        await store.flush()
+
+        assert (await store.load_snapshot(URL, "demo", bucket=7)).version == "demo--1"
+        assert (await store.load_overlay(URL, "demo", "demo--1", 0, 60000))[1] == 10
+        assert await store.load_snapshot(URL, "demo", bucket=8) is None
+
+    asyncio.run(main())
+
+
+def test_entries_of_another_format_are_ignored(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path))
+    store.put_snapshot(URL, "demo", "demo--1", _snapshot("demo--1"))
+    store.put_overlay(URL, "demo", "demo--1", 0, 60000, _metrics("demo--1"), 10)
+
+    monkeypatch.setattr(graph_store, "STORE_FORMAT", graph_store.STORE_FORMAT + 1)
+    assert store.get_snapshot(URL, "demo", "demo--1") is None
+    assert store.get_overlay(URL, "demo", "demo--1", 0, 60000) is None
+
+    # Storing the version again replaces the stale entry
+    store.put_snapshot(URL, "demo", "demo--1", _snapshot("demo--1"))
+    assert store.get_snapshot(URL, "demo", "demo--1").version == "demo--1"
+    assert _count(store, "snapshots") == 1
+
+
+def test_budget_evicts_least_recently_used_and_dangling_pointers(tmp_path):
+    store = SnapshotStore(str(tmp_path), max_bytes=10 ** 9)
+    for number in range(1, 4):
+        store.put_snapshot(URL, "demo", f"demo--{number}", _snapshot(f"demo--{number}", 50), bucket=number)
+    entry_size = store.total_bytes() // 3
+
+    # demo--1 becomes the most recently used, so demo--2 is now the oldest
+    store.get_snapshot(URL, "demo", "demo--1")
+    store.max_bytes = entry_size * 3 + entry_size // 2
+    store.put_snapshot(URL, "demo", "demo--4", _snapshot("demo--4", 50), bucket=4)
+
+    assert store.get_snapshot(URL, "demo", "demo--2") is None
+    assert store.get_snapshot_version(URL, "demo", 2) is None
+    for number in (1, 3, 4):
+        assert store.get_snapshot(URL, "demo", f"demo--{number}") is not None
+        assert store.get_snapshot_version(URL, "demo", number) == f"demo--{number}"
+    assert store.total_bytes() <= store.max_bytes
+
+
+def test_two_connections_writing_the_same_key(tmp_path):
+    first, second = SnapshotStore(str(tmp_path)), SnapshotStore(str(tmp_path))
+    errors = []
+
+    def write(store: SnapshotStore):
+        try:
+            for _ in range(20):
+                store.put_snapshot(URL, "demo", "demo--1", _snapshot("demo--1"), bucket=1)
+                store.put_overlay(URL, "demo", "demo--1", 0, 60000, _metrics("demo--1"), 10)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(store,)) for store in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert _count(first, "snapshots") == 1
+    assert _count(first, "overlays") == 1
+    assert _count(first, "snapshot_pointers") == 1
+    for store in (first, second):
+        assert store.get_snapshot(URL, "demo", "demo--1").version == "demo--1"
+        assert store.get_overlay(URL, "demo", "demo--1", 0, 60000)[1] == 10
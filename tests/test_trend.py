@@ -0,0 +1,73 @@
+"""Tests for graph_trend.detect_regressions."""
+
+import math
+
+from graph_model import MetricsIndex, MetricsRecord
+from graph_trend import detect_regressions
+
+
+def _windows(series: dict) -> list:
+    """One MetricsIndex per window from edge -> [(qpm, errors_total, p99), ...]."""
+    window_count = len(next(iter(series.values())))
+    return [
+        MetricsIndex(f"v{w}", {"edges": {
+            edge: MetricsRecord(values[w][0], values[w][1], 0, 0, 1, 1, 1, values[w][2])
+            for edge, values in series.items()
+        }})
+        for w in range(window_count)
+    ]
+
+
+def _flags(result: dict) -> dict:
+    return {(flag["edge"], flag["metric"]): flag for flag in result["flags"]}
+
+
+def test_p99_spike_is_flagged_since_the_window_it_started():
+    windows = _windows({
+        "A->B": [(10, 0, 100), (10, 0, 102), (10, 0, 98), (10, 0, 100), (10, 0, 300), (10, 0, 310)],
+        "B->C": [(10, 0, 40), (10, 0, 41), (10, 0, 39), (10, 0, 40), (10, 0, 40), (10, 0, 41)],
+    })
+
+    result = detect_regressions(["A->B", "B->C"], windows)
+
+    flag = _flags(result)[("A->B", "p99")]
+    assert flag["direction"] == "up"
+    assert flag["latest"] == 310.0
+    assert flag["since_window"] == 4
+    assert flag["series"] == [100.0, 102.0, 98.0, 100.0, 300.0, 310.0]
+    assert set(_flags(result)) == {("A->B", "p99")}
+    assert result["flag_count"] == 1
+    assert result["edges_compared"] == 2
+
+
+def test_qpm_drop_is_flagged_down():
+    windows = _windows({"A->B": [(100, 0, 50), (101, 0, 50), (99, 0, 50), (100, 0, 50), (40, 0, 50)]})
+
+    flag = _flags(detect_regressions(["A->B"], windows))[("A->B", "qpm")]
+
+    assert flag["direction"] == "down"
+    assert flag["baseline"] == 100.0
+    assert flag["z_score"] < -3
+    assert flag["ratio"] == 0.4
+    assert flag["since_window"] == 4
+
+
+def test_single_window_baseline_uses_the_ratio_only():
+    windows = _windows({"A->B": [(10, 0, 50), (10, 0, 120)]})
+
+    flag = _flags(detect_regressions(["A->B"], windows))[("A->B", "p99")]
+
+    assert flag["z_score"] is None
+    assert flag["ratio"] == 2.4
+    assert flag["since_window"] == 1
+
+
+def test_zero_baseline_gives_an_infinite_ratio():
+    windows = _windows({"A->B": [(10, 0, 50), (10, 0, 50), (10, 5, 50)]})
+
+    flag = _flags(detect_regressions(["A->B"], windows))[("A->B", "errors_total")]
+
+    assert flag["baseline"] == 0.0
+    assert flag["ratio"] == math.inf
+    assert flag["z_score"] is None
+    assert flag["direction"] == "up"